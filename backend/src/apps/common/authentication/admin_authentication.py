@@ -8,11 +8,13 @@ from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
 from ..utils.request import get_header
+from ..utils.timing import Timing
 from ..constants.authentication_constants import AuthenticationConstants
 
 
 class AdminAuthentication(BaseAuthentication):
-    
+
+    @Timing.timed("auth")
     def authenticate(self, request: Request):
         # Check for the existence of the required headers
         auth_admin_username = get_header(request, AuthenticationConstants.AUTHENTICATION_ADMIN_AUTH_USERNAME_HEADER)
@@ -1,3 +1,9 @@
+import time
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.exceptions import AuthenticationFailed
@@ -5,13 +11,63 @@ from rest_framework.authentication import BaseAuthentication
 
 from gotrue.errors import AuthApiError
 
-from ..supabase.supabase import client
+from ..supabase.supabase import get_client
+from ..supabase.supabase_user import SupabaseUser
+from ..supabase.supabase_jwt import SupabaseJWT, SupabaseJWTError, SupabaseJWTUnverifiableError
 from ..utils.request import get_header
+from ..utils.timing import Timing
 from ..constants import AuthenticationConstants
 
 
 class SupabaseAuthentication(BaseAuthentication):
-    
+    """Authenticates a request by its Supabase access token.
+
+    The token is verified locally when it is signed with the project's JWT secret,
+    and by Supabase Auth otherwise. A verified user is cached until the token expires,
+    so repeated requests with the same token skip the verification.
+    """
+
+    CACHE_KEY_PREFIX = "supabase-auth"
+
+    jwt = SupabaseJWT
+
+    def _get_cache_key(self, auth_token: str) -> str:
+        return f"{self.CACHE_KEY_PREFIX}:{hashlib.sha256(auth_token.encode()).hexdigest()}"
+
+    def _get_remote_user(self, auth_token: str):
+        try:
+            user_response = get_client().auth.get_user(auth_token)
+            if user_response is None:
+                raise AuthenticationFailed(
+                    detail={"error": AuthenticationConstants.AUTHENTICATION_INVALID_CREDENTIALS_MESSAGE},
+                    code=status.HTTP_401_UNAUTHORIZED
+                )
+        except AuthApiError as api_error:
+            raise AuthenticationFailed(
+                detail={"error": api_error.message},
+                code=status.HTTP_400_BAD_REQUEST
+            )
+
+        return user_response.user
+
+    def _verify_token(self, auth_token: str):
+        verifier = self.jwt()
+
+        try:
+            claims = verifier.verify(auth_token)
+            return SupabaseUser.from_claims(claims), claims["exp"]
+        except SupabaseJWTUnverifiableError:
+            # The token was signed with a key that is only known to Supabase Auth
+            user = self._get_remote_user(auth_token)
+            _, claims = verifier.decode_unverified(auth_token)
+            return user, claims.get("exp")
+        except SupabaseJWTError as jwt_error:
+            raise AuthenticationFailed(
+                detail={"error": f"{AuthenticationConstants.AUTHENTICATION_INVALID_CREDENTIALS_MESSAGE} {jwt_error}"},
+                code=status.HTTP_401_UNAUTHORIZED
+            )
+
+    @Timing.timed("auth")
     def authenticate(self, request: Request):
         auth_header = get_header(request, "Authorization")
 
@@ -30,17 +86,16 @@ class SupabaseAuthentication(BaseAuthentication):
                 code=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            user_response = client.auth.get_user(auth_token)
-            if user_response is None:
-                raise AuthenticationFailed(
-                    detail={"error": AuthenticationConstants.AUTHENTICATION_INVALID_CREDENTIALS_MESSAGE},
-                    code=status.HTTP_401_UNAUTHORIZED
-                )
-        except AuthApiError as api_error:
-            raise AuthenticationFailed(
-                detail={"error": api_error.message},
-                code=status.HTTP_400_BAD_REQUEST
-            )
+        cache = caches[settings.SUPABASE_AUTH_CACHE_ALIAS]
+        cache_key = self._get_cache_key(auth_token)
+
+        user = cache.get(cache_key)
+        if user is not None:
+            return (user, None)
+
+        user, expires_at = self._verify_token(auth_token)
+
+        if isinstance(expires_at, (int, float)) and expires_at > time.time():
+            cache.set(cache_key, user, timeout=expires_at - time.time())
 
-        return (user_response.user, None)
+        return (user, None)
@@ -0,0 +1 @@
+from .server_timing import ServerTimingMiddleware
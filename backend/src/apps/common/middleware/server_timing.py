@@ -0,0 +1,99 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import FileResponse
+
+from ..utils.timing import Timing, TimingRecorder
+
+
+class ServerTimingMiddleware:
+    """Records the timing spans of each request. They are sent in the
+    `Server-Timing` response header, and the request is logged as a
+    structured record with the total of each span.
+
+    The header is built before the body of a streaming response is sent, so the
+    spans that finish while the stream is consumed (e.g. the rendering of a batch
+    ZIP) are not in it. They are logged in a separate `request.stream` record once
+    the stream ends.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    logger = Timing.logger
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header_enabled = settings.SERVER_TIMING_HEADER
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        with Timing.record() as recorder:
+            response = self.get_response(request)
+
+        return self._finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with Timing.record() as recorder:
+            response = await self.get_response(request)
+
+        return self._finish(request, response, recorder, start)
+
+    def _finish(self, request, response, recorder: TimingRecorder, start: float):
+        duration = 1000 * (time.perf_counter() - start)
+        recorder.add("total", duration)
+
+        if self.header_enabled:
+            response["Server-Timing"] = recorder.server_timing()
+
+        self._log("request", request, response, recorder, duration)
+
+        # A file is sent as is, the body of other streaming responses is produced while it is sent
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = self._record_stream(request, response)
+
+        return response
+
+    def _log(self, message: str, request, response, recorder: TimingRecorder, duration: float):
+        self.logger.info(message, extra={"fields": {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration, 3),
+            "spans": {
+                name: {"duration_ms": round(total, 3), "count": count}
+                for name, (total, count) in recorder.totals().items()
+                if name != "total"
+            },
+        }})
+
+    def _record_stream(self, request, response):
+        content = response.streaming_content
+
+        if response.is_async:
+            async def stream():
+                start = time.perf_counter()
+                with Timing.record() as recorder:
+                    try:
+                        async for chunk in content:
+                            yield chunk
+                    finally:
+                        self._log("request.stream", request, response, recorder, 1000 * (time.perf_counter() - start))
+        else:
+            def stream():
+                start = time.perf_counter()
+                with Timing.record() as recorder:
+                    try:
+                        yield from content
+                    finally:
+                        self._log("request.stream", request, response, recorder, 1000 * (time.perf_counter() - start))
+
+        return stream()
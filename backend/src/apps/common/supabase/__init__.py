@@ -1,2 +1,3 @@
-from .supabase import client
+from .supabase import SupabaseClientProvider, get_client, get_async_client
 from .supabase_user import SupabaseUser
+from .supabase_jwt import SupabaseJWT, SupabaseJWTError, SupabaseJWTUnverifiableError
@@ -0,0 +1,163 @@
+import threading
+from typing import Callable, Dict, List
+
+import httpx
+from django.conf import settings
+
+
+class ConnectionStats:
+    """Counts the requests sent to Supabase and the connections that were opened for them.
+    A request that did not open a connection reused a pooled one.
+
+    Attributes
+    ----------
+    requests: int
+        The number of requests sent
+    connections: int
+        The number of TCP connections opened
+    tls_handshakes: int
+        The number of TLS handshakes
+    errors: int
+        The number of requests that failed without a response
+    """
+
+    EVENTS = ("requests", "connections", "tls_handshakes", "errors")
+
+    def __init__(self, listeners: List[Callable[[str], None]] = None):
+        self._lock = threading.Lock()
+        self._listeners = listeners if listeners is not None else []
+
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.errors = 0
+
+    def add(self, event: str):
+        with self._lock:
+            setattr(self, event, getattr(self, event) + 1)
+
+        for listener in self._listeners:
+            listener(event)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Get the counts, and the share of the requests that reused a connection
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        Dict[str, float]
+            The counts of `EVENTS`, the number of requests sent on a reused connection
+            and the reuse ratio, between 0 and 1
+        """
+        with self._lock:
+            counts = {event: getattr(self, event) for event in self.EVENTS}
+
+        counts["reused"] = max(counts["requests"] - counts["connections"], 0)
+        counts["reuse_ratio"] = counts["reused"] / counts["requests"] if counts["requests"] else 0
+        return counts
+
+
+def _create_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY
+    )
+
+
+def create_timeout() -> httpx.Timeout:
+    """Create the timeouts of the requests to Supabase, from the settings
+
+    Params
+    ------
+    None
+
+    Returns
+    -------
+    httpx.Timeout
+        The connect, read, write and pool timeouts
+    """
+    return httpx.Timeout(
+        connect=settings.SUPABASE_CONNECT_TIMEOUT,
+        read=settings.SUPABASE_READ_TIMEOUT,
+        write=settings.SUPABASE_READ_TIMEOUT,
+        pool=settings.SUPABASE_POOL_TIMEOUT
+    )
+
+
+def _count_connections(stats: ConnectionStats, event_name: str):
+    if event_name == "connection.connect_tcp.complete":
+        stats.add("connections")
+    elif event_name == "connection.start_tls.complete":
+        stats.add("tls_handshakes")
+
+
+class PooledTransport(httpx.BaseTransport):
+    """A connection pool that is shared by the HTTP clients of the Supabase services,
+    since they are served by the same host. httpx's pool is thread-safe, so a single
+    transport is used by every thread of the process.
+
+    The clients do not own the pool, closing a client leaves it open.
+
+    Attributes
+    ----------
+    stats: ConnectionStats
+        The requests and connections of the pool
+    """
+
+    def __init__(self, stats: ConnectionStats):
+        self.stats = stats
+        self._transport = httpx.HTTPTransport(
+            limits=_create_limits(),
+            http2=settings.SUPABASE_HTTP2,
+            retries=settings.SUPABASE_CONNECT_RETRIES
+        )
+
+    def _trace(self, event_name: str, info: dict):
+        _count_connections(self.stats, event_name)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self._trace
+        self.stats.add("requests")
+
+        try:
+            return self._transport.handle_request(request)
+        except httpx.TransportError:
+            self.stats.add("errors")
+            raise
+
+    def close(self):
+        pass
+
+
+class AsyncPooledTransport(httpx.AsyncBaseTransport):
+    """The asynchronous counterpart of `PooledTransport`. Its connections are bound
+    to the event loop that opened them, so there is one transport per event loop.
+    """
+
+    def __init__(self, stats: ConnectionStats):
+        self.stats = stats
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=_create_limits(),
+            http2=settings.SUPABASE_HTTP2,
+            retries=settings.SUPABASE_CONNECT_RETRIES
+        )
+
+    async def _trace(self, event_name: str, info: dict):
+        _count_connections(self.stats, event_name)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self._trace
+        self.stats.add("requests")
+
+        try:
+            return await self._transport.handle_async_request(request)
+        except httpx.TransportError:
+            self.stats.add("errors")
+            raise
+
+    async def aclose(self):
+        pass
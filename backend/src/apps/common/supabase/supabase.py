@@ -1,7 +1,217 @@
-from supabase import create_client, Client
+import os
+import asyncio
+import weakref
+import threading
+from typing import Callable, List
+
+from supabase import Client, AClient, ClientOptions, AClientOptions
+from supabase._sync.auth_client import SyncSupabaseAuthClient
+from supabase._async.auth_client import AsyncSupabaseAuthClient
+from postgrest import SyncPostgrestClient, AsyncPostgrestClient
+from postgrest.utils import SyncClient
+from gotrue import SyncMemoryStorage, AsyncMemoryStorage
+from httpx import AsyncClient
 from django.conf import settings
 
+from .pool import ConnectionStats, PooledTransport, AsyncPooledTransport, create_timeout
+
 supabase_key = settings.SUPABASE_KEY
 supabase_url = settings.SUPABASE_URL
 
-client: Client = create_client(supabase_url, supabase_key)
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+
+    def __init__(self, base_url: str, *, transport: PooledTransport, **kwargs):
+        self._transport = transport
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True) -> SyncClient:
+        return SyncClient(base_url=base_url, headers=headers, timeout=timeout, follow_redirects=True, transport=self._transport)
+
+
+class _AsyncPooledPostgrestClient(AsyncPostgrestClient):
+
+    def __init__(self, base_url: str, *, transport: AsyncPooledTransport, **kwargs):
+        self._transport = transport
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True) -> AsyncClient:
+        return AsyncClient(base_url=base_url, headers=headers, timeout=timeout, follow_redirects=True, transport=self._transport)
+
+
+class PooledClient(Client):
+    """A Supabase client whose auth and PostgREST requests share a `PooledTransport`"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, transport: PooledTransport):
+        self._transport = transport
+        super().__init__(
+            supabase_url,
+            supabase_key,
+            ClientOptions(storage=SyncMemoryStorage(), postgrest_client_timeout=create_timeout())
+        )
+
+        # Created ahead of time, so threads never race to create the lazy PostgREST client
+        self.postgrest
+
+    def _init_supabase_auth_client(self, auth_url: str, client_options: ClientOptions) -> SyncSupabaseAuthClient:
+        return SyncSupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=SyncClient(timeout=create_timeout(), follow_redirects=True, transport=self._transport)
+        )
+
+    def _init_postgrest_client(self, rest_url: str, headers: dict, schema: str, timeout, verify: bool = True) -> SyncPostgrestClient:
+        return _PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout, transport=self._transport)
+
+
+class AsyncPooledClient(AClient):
+    """The asynchronous counterpart of `PooledClient`"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, transport: AsyncPooledTransport):
+        self._transport = transport
+        super().__init__(
+            supabase_url,
+            supabase_key,
+            AClientOptions(storage=AsyncMemoryStorage(), postgrest_client_timeout=create_timeout())
+        )
+        self.postgrest
+
+    def _init_supabase_auth_client(self, auth_url: str, client_options: AClientOptions) -> AsyncSupabaseAuthClient:
+        return AsyncSupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=AsyncClient(timeout=create_timeout(), follow_redirects=True, transport=self._transport)
+        )
+
+    def _init_postgrest_client(self, rest_url: str, headers: dict, schema: str, timeout, verify: bool = True) -> AsyncPostgrestClient:
+        return _AsyncPooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout, transport=self._transport)
+
+
+class SupabaseClientProvider:
+    """Provides the Supabase clients of the current process.
+
+    The blocking client is shared by every thread of the process, and its requests
+    go through a single pool of keep-alive connections. The asynchronous clients are
+    created per event loop, since their connections are bound to the loop. The pools
+    are sized and timed out by the `SUPABASE_POOL_*` and `SUPABASE_*_TIMEOUT` settings.
+
+    A forked process, such as a worker of a preloaded gunicorn or a process pool,
+    gets its own provider, so connections are never shared between processes.
+
+    Attributes
+    ----------
+    stats: ConnectionStats
+        The requests and connections of every client of the process
+    """
+
+    _instance: "SupabaseClientProvider" = None
+    _lock = threading.Lock()
+    _listeners: List[Callable[[str], None]] = []
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.stats = ConnectionStats(self._listeners)
+
+        self._client_lock = threading.Lock()
+        self._transport: PooledTransport = None
+        self._client: PooledClient = None
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def get(cls) -> "SupabaseClientProvider":
+        """Get the provider of the current process
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        SupabaseClientProvider
+            The provider, created on the first call in each process
+        """
+        provider = cls._instance
+        if provider is None or provider.pid != os.getpid():
+            with cls._lock:
+                provider = cls._instance
+                if provider is None or provider.pid != os.getpid():
+                    provider = cls._instance = cls()
+
+        return provider
+
+    @classmethod
+    def add_listener(cls, listener: Callable[[str], None]):
+        """Call a function with every event of the connection pools, one of
+        `ConnectionStats.EVENTS`. It must not raise.
+
+        Params
+        ------
+        listener: Callable[[str], None]
+            Called with the name of the event
+
+        Returns
+        -------
+        None
+        """
+        if listener not in cls._listeners:
+            cls._listeners.append(listener)
+
+    def client(self) -> Client:
+        """Get the blocking Supabase client, initialized with admin privileges
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        Client
+            The client shared by every thread of the process
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._transport = PooledTransport(self.stats)
+                    self._client = PooledClient(supabase_url, supabase_key, self._transport)
+
+        return self._client
+
+    def async_client(self) -> AClient:
+        """Get the asynchronous Supabase client of the running event loop
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        AClient
+            An asynchronous client, initialized with admin privileges.
+            One client is created and reused per event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        async_client = self._async_clients.get(loop)
+        if async_client is None:
+            async_client = AsyncPooledClient(supabase_url, supabase_key, AsyncPooledTransport(self.stats))
+            self._async_clients[loop] = async_client
+
+        return async_client
+
+
+def get_client() -> Client:
+    """Get the blocking Supabase client of the current process, see `SupabaseClientProvider.client`"""
+    return SupabaseClientProvider.get().client()
+
+
+def get_async_client() -> AClient:
+    """Get the asynchronous Supabase client of the running event loop, see `SupabaseClientProvider.async_client`"""
+    return SupabaseClientProvider.get().async_client()
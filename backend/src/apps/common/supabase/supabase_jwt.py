@@ -0,0 +1,137 @@
+import json
+import hmac
+import time
+import base64
+import hashlib
+
+from django.conf import settings
+
+
+class SupabaseJWTError(Exception):
+    """Raised when an access token is malformed, has an invalid signature or is expired"""
+
+
+class SupabaseJWTUnverifiableError(SupabaseJWTError):
+    """Raised when an access token cannot be verified locally, e.g. it is signed with
+    an algorithm that has no local key. The token should be verified remotely instead."""
+
+
+class SupabaseJWT:
+    """Verifies Supabase access tokens locally with the project's JWT secret,
+    so that an authenticated request does not need a round-trip to Supabase Auth.
+
+    Only HMAC signed tokens can be verified locally. Tokens that are signed
+    with an asymmetric key raise `SupabaseJWTUnverifiableError`.
+
+    Attributes
+    ----------
+    secret: bytes | None
+        The JWT secret of the Supabase project
+    audience: str
+        The expected `aud` claim
+    leeway: int
+        Number of seconds of clock skew allowed when checking `exp` and `nbf`
+    """
+
+    ALGORITHMS = {
+        "HS256": hashlib.sha256,
+        "HS384": hashlib.sha384,
+        "HS512": hashlib.sha512,
+    }
+
+    def __init__(self, secret: str = None, audience: str = None, leeway: int = None):
+        secret = secret or settings.SUPABASE_JWT_SECRET
+        self.secret = secret.encode() if secret else None
+        self.audience = audience or settings.SUPABASE_JWT_AUDIENCE
+        self.leeway = leeway if leeway is not None else settings.SUPABASE_JWT_LEEWAY
+
+    @staticmethod
+    def _b64decode(segment: str) -> bytes:
+        return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+    def decode_unverified(self, token: str) -> tuple[dict, dict]:
+        """Decode the header and the claims of a token without verifying it
+
+        Params
+        ------
+        token: str
+            A JWT access token
+
+        Returns
+        -------
+        tuple[dict, dict]
+            The header and the claims of the token
+        """
+        try:
+            header_segment, payload_segment, _ = token.split(".")
+            header = json.loads(self._b64decode(header_segment))
+            payload = json.loads(self._b64decode(payload_segment))
+        except (ValueError, TypeError):
+            raise SupabaseJWTError("Malformed access token.")
+
+        if not isinstance(header, dict) or not isinstance(payload, dict):
+            raise SupabaseJWTError("Malformed access token.")
+
+        return header, payload
+
+    def verify(self, token: str) -> dict:
+        """Verify the signature and the registered claims of a token
+
+        Params
+        ------
+        token: str
+            A JWT access token
+
+        Returns
+        -------
+        dict
+            The verified claims of the token
+        """
+        header, payload = self.decode_unverified(token)
+
+        digestmod = self.ALGORITHMS.get(header.get("alg"))
+        if digestmod is None or self.secret is None:
+            raise SupabaseJWTUnverifiableError(f"Unable to verify a {header.get('alg')} token locally.")
+
+        signing_input, _, signature = token.rpartition(".")
+        try:
+            signature = self._b64decode(signature)
+        except ValueError:
+            raise SupabaseJWTError("Malformed access token.")
+
+        expected = hmac.new(self.secret, signing_input.encode(), digestmod).digest()
+        if not hmac.compare_digest(expected, signature):
+            raise SupabaseJWTError("Invalid access token signature.")
+
+        self.verify_claims(payload)
+        return payload
+
+    def verify_claims(self, payload: dict):
+        """Check the time and audience claims of a decoded token
+
+        Params
+        ------
+        payload: dict
+            The claims of a token
+
+        Returns
+        -------
+        None
+        """
+        now = time.time()
+
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or now > exp + self.leeway:
+            raise SupabaseJWTError("The access token has expired.")
+
+        nbf = payload.get("nbf")
+        if isinstance(nbf, (int, float)) and now < nbf - self.leeway:
+            raise SupabaseJWTError("The access token is not valid yet.")
+
+        audience = payload.get("aud")
+        audiences = audience if isinstance(audience, list) else [audience]
+        if self.audience not in audiences:
+            raise SupabaseJWTError("Invalid access token audience.")
+
+        if not payload.get("sub"):
+            raise SupabaseJWTError("The access token has no subject.")
@@ -2,4 +2,28 @@ from gotrue.helpers import User
 
 
 class SupabaseUser(User):
-    pass
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "SupabaseUser":
+        """Build a user from the claims of a verified access token
+
+        Params
+        ------
+        claims: dict
+            The claims of a Supabase access token
+
+        Returns
+        -------
+        SupabaseUser
+            A user object. Fields that are not part of the token's claims,
+            such as `created_at`, are left unset.
+        """
+        return cls.model_construct(
+            id=claims["sub"],
+            aud=claims.get("aud"),
+            role=claims.get("role"),
+            email=claims.get("email"),
+            phone=claims.get("phone"),
+            app_metadata=claims.get("app_metadata", {}),
+            user_metadata=claims.get("user_metadata", {}),
+        )
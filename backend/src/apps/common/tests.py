@@ -0,0 +1,161 @@
+import hmac
+import json
+import time
+import base64
+import hashlib
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.common.authentication import SupabaseAuthentication
+from apps.common.supabase.supabase_jwt import SupabaseJWT, SupabaseJWTError, SupabaseJWTUnverifiableError
+
+SECRET = "test-jwt-secret"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_token(secret: str = SECRET, alg: str = "HS256", **claims) -> str:
+    claims = {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 3600, **claims}
+    signing_input = f"{_b64encode(json.dumps({'alg': alg, 'typ': 'JWT'}).encode())}.{_b64encode(json.dumps(claims).encode())}"
+
+    digestmod = SupabaseJWT.ALGORITHMS.get(alg, hashlib.sha256)
+    signature = hmac.new(secret.encode(), signing_input.encode(), digestmod).digest()
+
+    return f"{signing_input}.{_b64encode(signature)}"
+
+
+class SupabaseJWTTestCase(TestCase):
+    def setUp(self):
+        self.jwt = SupabaseJWT(SECRET, "authenticated", leeway=10)
+
+    def test_verifies_a_valid_token(self):
+        claims = self.jwt.verify(make_token(email="alice@example.com"))
+
+        self.assertEqual(claims["sub"], "user-1")
+        self.assertEqual(claims["email"], "alice@example.com")
+
+    def test_verifies_every_hmac_algorithm(self):
+        for alg in SupabaseJWT.ALGORITHMS:
+            with self.subTest(alg=alg):
+                self.assertEqual(self.jwt.verify(make_token(alg=alg))["sub"], "user-1")
+
+    def test_rejects_an_expired_token(self):
+        with self.assertRaisesMessage(SupabaseJWTError, "expired"):
+            self.jwt.verify(make_token(exp=int(time.time()) - 60))
+
+        with self.assertRaisesMessage(SupabaseJWTError, "expired"):
+            self.jwt.verify(make_token(exp=None))
+
+    def test_accepts_an_expired_token_within_the_leeway(self):
+        self.assertEqual(self.jwt.verify(make_token(exp=int(time.time()) - 5))["sub"], "user-1")
+
+    def test_rejects_a_bad_signature(self):
+        with self.assertRaisesMessage(SupabaseJWTError, "signature"):
+            self.jwt.verify(make_token(secret="another-secret"))
+
+    def test_rejects_a_wrong_audience(self):
+        with self.assertRaisesMessage(SupabaseJWTError, "audience"):
+            self.jwt.verify(make_token(aud="anon"))
+
+        self.assertEqual(self.jwt.verify(make_token(aud=["other", "authenticated"]))["sub"], "user-1")
+
+    def test_rejects_an_empty_subject(self):
+        with self.assertRaisesMessage(SupabaseJWTError, "subject"):
+            self.jwt.verify(make_token(sub=""))
+
+    def test_rejects_a_malformed_token(self):
+        for token in ("", "not-a-token", "a.b", "a.b.c.d", "e30.bm90LWpzb24.c2ln", "W10.e30.c2ln"):
+            with self.subTest(token=token), self.assertRaisesMessage(SupabaseJWTError, "Malformed"):
+                self.jwt.verify(token)
+
+    def test_checks_nbf_with_the_leeway(self):
+        with self.assertRaisesMessage(SupabaseJWTError, "not valid yet"):
+            self.jwt.verify(make_token(nbf=int(time.time()) + 60))
+
+        self.assertEqual(self.jwt.verify(make_token(nbf=int(time.time()) + 5))["sub"], "user-1")
+
+    def test_cannot_verify_other_algorithms_locally(self):
+        with self.assertRaises(SupabaseJWTUnverifiableError):
+            self.jwt.verify(make_token(alg="RS256"))
+
+        with self.assertRaises(SupabaseJWTUnverifiableError):
+            SupabaseJWT("", "authenticated").verify(make_token())
+
+
+@override_settings(SUPABASE_JWT_SECRET=SECRET, SUPABASE_JWT_AUDIENCE="authenticated", SUPABASE_JWT_LEEWAY=10)
+class SupabaseAuthenticationTestCase(TestCase):
+    def setUp(self):
+        self.cache = mock.Mock(get=mock.Mock(return_value=None))
+        patcher = mock.patch(
+            "apps.common.authentication.supabase_authentication.caches",
+            {"default": self.cache}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _authenticate(self, token: str):
+        request = Request(APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+        return SupabaseAuthentication().authenticate(request)
+
+    def test_authenticates_a_valid_token(self):
+        user, _ = self._authenticate(make_token(email="alice@example.com"))
+
+        self.assertEqual(user.id, "user-1")
+        self.assertEqual(user.email, "alice@example.com")
+
+    def test_caches_the_user_until_the_token_expires(self):
+        exp = int(time.time()) + 600
+
+        user, _ = self._authenticate(make_token(exp=exp))
+
+        self.cache.set.assert_called_once()
+        _, cached_user = self.cache.set.call_args.args
+        self.assertEqual(cached_user, user)
+        self.assertAlmostEqual(self.cache.set.call_args.kwargs["timeout"], exp - time.time(), delta=2)
+
+    def test_skips_the_verification_on_a_cache_hit(self):
+        cached_user = SimpleNamespace(id="user-1")
+        self.cache.get.return_value = cached_user
+
+        with mock.patch.object(SupabaseJWT, "verify") as verify:
+            user, _ = self._authenticate(make_token(secret="another-secret"))
+
+        self.assertIs(user, cached_user)
+        verify.assert_not_called()
+        self.cache.set.assert_not_called()
+
+    def test_rejects_an_invalid_token(self):
+        for token in (make_token(secret="another-secret"), make_token(exp=int(time.time()) - 60), "not-a-token"):
+            with self.subTest(token=token), self.assertRaises(AuthenticationFailed):
+                self._authenticate(token)
+
+        self.cache.set.assert_not_called()
+
+    def test_verifies_other_algorithms_with_supabase_auth(self):
+        exp = int(time.time()) + 600
+        remote_user = SimpleNamespace(id="user-1")
+        client = mock.Mock()
+        client.auth.get_user.return_value = SimpleNamespace(user=remote_user)
+        token = make_token(alg="RS256", exp=exp)
+
+        with mock.patch("apps.common.authentication.supabase_authentication.get_client", return_value=client):
+            user, _ = self._authenticate(token)
+
+        self.assertIs(user, remote_user)
+        client.auth.get_user.assert_called_once_with(token)
+        self.assertAlmostEqual(self.cache.set.call_args.kwargs["timeout"], exp - time.time(), delta=2)
+
+    def test_rejects_a_token_unknown_to_supabase_auth(self):
+        client = mock.Mock()
+        client.auth.get_user.return_value = None
+
+        with mock.patch("apps.common.authentication.supabase_authentication.get_client", return_value=client):
+            with self.assertRaises(AuthenticationFailed):
+                self._authenticate(make_token(alg="RS256"))
@@ -1,3 +1,4 @@
+import json
 import logging
 
 
@@ -19,3 +20,23 @@ class CommonLogger:
     @staticmethod
     def w(message: str):
         CommonLogger.logger.warning(message)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats a log record as a single JSON object, with the fields
+    given in the `fields` dict of the record's `extra`
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", {}))
+
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, default=str)
@@ -0,0 +1,191 @@
+import time
+import logging
+import inspect
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+class TimingRecorder:
+    """Collects the timing spans of a request
+
+    Attributes
+    ----------
+    spans: List[Tuple[str, float]]
+        The name and the duration in milliseconds of each span, in the order they finished
+    """
+
+    def __init__(self):
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, duration: float):
+        # Appending to a list is atomic, so the spans of worker threads can be added without a lock
+        self.spans.append((name, duration))
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """Sum the spans of each name
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        Dict[str, Tuple[float, int]]
+            The total duration in milliseconds and the number of spans of each name,
+            in the order each name first finished
+        """
+        totals = {}
+        for name, duration in self.spans:
+            total, count = totals.get(name, (0, 0))
+            totals[name] = (total + duration, count + 1)
+
+        return totals
+
+    def server_timing(self) -> str:
+        """Format the spans as the value of a `Server-Timing` header
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        str
+            One metric per span name, with the total duration and, if the span
+            ran more than once, the number of spans as its description
+        """
+        return ", ".join(
+            f"{name};dur={total:.1f}" if count == 1 else f'{name};dur={total:.1f};desc="x{count}"'
+            for name, (total, count) in self.totals().items()
+        )
+
+
+class Timing:
+    """Measures the phases of the report generation as named spans.
+
+    A finished span is logged as a structured record on the `timing` logger, and
+    added to the recorder of the current request, if any, which is reported in the
+    `Server-Timing` header by `ServerTimingMiddleware`. The recorder is held in a
+    context variable, so the spans of `asyncio` tasks and of `sync_to_async` threads
+    are recorded on the request that started them. Every finished span is also passed
+    to the listeners, such as the metrics of `apps.metrics`.
+    """
+
+    logger = logging.getLogger("timing")
+
+    _recorder: ContextVar[TimingRecorder | None] = ContextVar("timing_recorder", default=None)
+    _listeners: List[Callable[[str, float, str | None], None]] = []
+
+    @classmethod
+    def add_listener(cls, listener: Callable[[str, float, str | None], None]):
+        """Call a function with every span that finishes in the process
+
+        Params
+        ------
+        listener: Callable[[str, float, str | None], None]
+            Called with the name of the span, its duration in seconds and the name
+            of the exception that ended it, or None. It must not raise.
+
+        Returns
+        -------
+        None
+        """
+        if listener not in cls._listeners:
+            cls._listeners.append(listener)
+
+    @classmethod
+    @contextmanager
+    def record(cls) -> Iterator[TimingRecorder]:
+        """Record the spans that finish inside the context
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        ContextManager[TimingRecorder]
+            The recorder of the spans
+        """
+        recorder = TimingRecorder()
+        token = cls._recorder.set(recorder)
+
+        try:
+            yield recorder
+        finally:
+            cls._recorder.reset(token)
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, **fields):
+        """Measure the duration of the code inside the context
+
+        Params
+        ------
+        name: str
+            The name of the span, a token such as `fetch.get_user`
+        fields:
+            Additional fields of the log record
+
+        Returns
+        -------
+        ContextManager[None]
+        """
+        start = time.perf_counter()
+        error = None
+
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            duration = 1000 * elapsed
+
+            recorder = cls._recorder.get()
+            if recorder is not None:
+                recorder.add(name, duration)
+
+            for listener in cls._listeners:
+                listener(name, elapsed, error)
+
+            if cls.logger.isEnabledFor(logging.DEBUG):
+                fields = dict(fields, span=name, duration_ms=round(duration, 3))
+                if error is not None:
+                    fields["error"] = error
+                cls.logger.debug(name, extra={"fields": fields})
+
+    @classmethod
+    def timed(cls, name: str) -> Callable[[Callable], Callable]:
+        """Decorate a function or a coroutine function to measure each of its calls as a span
+
+        Params
+        ------
+        name: str
+            The name of the span
+
+        Returns
+        -------
+        Callable[[Callable], Callable]
+            The decorator
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with cls.span(name):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with cls.span(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
@@ -4,3 +4,28 @@ from django.apps import AppConfig
 class GenerationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.generation'
+
+    def ready(self):
+        # Parse the report fonts and build the styles before the first request
+        from .utils.docgen.registry import ReportlabRegistry
+        ReportlabRegistry.get()
+
+        self._warm_currency_formatters()
+
+    def _warm_currency_formatters(self):
+        from django.conf import settings
+        from babel.numbers import LC_NUMERIC
+
+        from .serializers import ReportRequestSerializer
+        from .utils.docgen.currency import CurrencyFormatter
+
+        if settings.REPORT_FORMATTER_WARM_LOCALES == ["all"]:
+            locales = ReportRequestSerializer.accepted_locales()
+        else:
+            locales = filter(None, map(ReportRequestSerializer.parse_locale, settings.REPORT_FORMATTER_WARM_LOCALES))
+
+        # The report views pass the resolved locale with its dashes replaced, and the automated job the default locale
+        CurrencyFormatter.warm(
+            settings.REPORT_FORMATTER_WARM_CURRENCIES,
+            [LC_NUMERIC, *(name.replace('-', '_') for name in locales)]
+        )
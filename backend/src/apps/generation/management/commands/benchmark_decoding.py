@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ...utils.benchmarks import benchmark_decoding
+
+
+class Command(BaseCommand):
+    help = "Compare the validated and the trusted decoding of the entry rows fetched from Supabase"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000, help="The number of rows in the response")
+        parser.add_argument("--repeat", type=int, default=3, help="The number of timed runs of each path")
+        parser.add_argument("--seed", type=int, default=0, help="The seed of the synthetic rows")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        results = benchmark_decoding(options["rows"], options["repeat"], options["seed"])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        baseline = results["adapter_per_call"]["best_seconds"]
+        self.stdout.write(f"Decoding {options['rows']} entry rows")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:>18}: {result['best_seconds'] * 1000:9.1f} ms "
+                f"({baseline / result['best_seconds']:5.2f}x), "
+                f"peak {result['peak_bytes'] / 2 ** 20:7.1f} MiB"
+            )
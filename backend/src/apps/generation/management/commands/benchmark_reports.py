@@ -0,0 +1,106 @@
+import json
+import sys
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils.benchmarks import benchmark_documents, benchmark_endpoint
+from ...utils.benchmarks.documents import DOCUMENT_SIZES, DOCUMENT_CATEGORIES
+from ...utils.benchmarks.endpoint import ENDPOINT_SIZES
+
+# The fields that identify a result of each suite, to match it with the result of a baseline
+SUITE_KEYS = {
+    "documents": ("entries", "categories"),
+    "endpoint": ("entries", "cache"),
+}
+COMPARED_METRICS = ("best_seconds", "peak_bytes", "size_bytes")
+
+
+def _integers(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the generation of report documents and the report endpoint on synthetic data, and record the results as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=_integers, default=list(DOCUMENT_SIZES), help="The numbers of entries of the rendered documents, comma separated")
+        parser.add_argument("--categories", type=_integers, default=list(DOCUMENT_CATEGORIES), help="The numbers of categories of the rendered documents, comma separated")
+        parser.add_argument("--endpoint-sizes", type=_integers, default=list(ENDPOINT_SIZES), help="The numbers of entries of the requested reports, comma separated. Empty skips the endpoint.")
+        parser.add_argument("--repeat", type=int, default=3, help="The number of timed runs of each benchmark")
+        parser.add_argument("--seed", type=int, default=0, help="The seed of the synthetic data")
+        parser.add_argument("--output", default=None, help="Write the results to this JSON file instead of the standard output")
+        parser.add_argument("--compare", default=None, help="A JSON file of previous results to compare the results with")
+        parser.add_argument("--threshold", type=float, default=1.2, help="Fail if a compared metric grows by more than this ratio")
+
+    def _get_commit(self) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _compare(self, results: dict, baseline: dict, threshold: float) -> list[str]:
+        regressions = []
+
+        for suite, keys in SUITE_KEYS.items():
+            previous = {tuple(r[k] for k in keys): r for r in baseline.get(suite, [])}
+
+            for result in results.get(suite, []):
+                key = tuple(result[k] for k in keys)
+                if key not in previous:
+                    continue
+
+                label = f"{suite} {dict(zip(keys, key))}"
+                if "error" in result and "error" not in previous[key]:
+                    self.stdout.write(f"{label}: failed, {result['error']}")
+                    regressions.append(label)
+                    continue
+
+                for metric in COMPARED_METRICS:
+                    before, after = previous[key].get(metric), result.get(metric)
+                    if not before or after is None:
+                        continue
+
+                    ratio = after / before
+                    self.stdout.write(f"{label} {metric}: {before:.6g} -> {after:.6g} ({ratio:.2f}x)")
+
+                    if ratio > threshold:
+                        regressions.append(f"{label} {metric}")
+
+        return regressions
+
+    def handle(self, *args, **options):
+        results = {
+            "metadata": {
+                "commit": self._get_commit(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "repeat": options["repeat"],
+                "seed": options["seed"],
+            },
+            "documents": benchmark_documents(options["sizes"], options["categories"], options["repeat"], options["seed"]),
+            "endpoint": benchmark_endpoint(options["endpoint_sizes"], options["repeat"], options["seed"]),
+        }
+
+        output = json.dumps(results, indent=2)
+        if options["output"] is None:
+            self.stdout.write(output)
+        else:
+            with open(options["output"], "w") as f:
+                f.write(output)
+            self.stdout.write(f"Wrote the results to {options['output']}.")
+
+        if options["compare"] is None:
+            return
+
+        with open(options["compare"]) as f:
+            regressions = self._compare(results, json.load(f), options["threshold"])
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} metrics regressed by more than {options['threshold']}x: {', '.join(regressions)}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...views import AutomatedMonthlyReportView
+
+
+class Command(BaseCommand):
+    help = "Run the queued automated monthly report jobs, and resume the jobs whose worker has died"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=None,
+            help="Keep polling for new jobs every POLL seconds instead of exiting when the queue is empty"
+        )
+
+    def handle(self, *args, **options):
+        view = AutomatedMonthlyReportView()
+
+        while True:
+            count = view.job_worker(view).run_pending()
+            self.stdout.write(f"Ran {count} report jobs.")
+
+            if options["poll"] is None:
+                return
+
+            time.sleep(options["poll"])
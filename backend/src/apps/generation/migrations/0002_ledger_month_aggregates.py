@@ -0,0 +1,51 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(max_length=255)),
+                ('is_positive', models.BooleanField()),
+                ('total', models.FloatField()),
+                ('count', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger_id', models.BigIntegerField()),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('refreshed_version', models.PositiveIntegerField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ledgermonth',
+            constraint=models.UniqueConstraint(fields=('ledger_id', 'year', 'month'), name='unique_ledger_month'),
+        ),
+        migrations.AddField(
+            model_name='dailycategorytotal',
+            name='ledger_month',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='generation.ledgermonth'),
+        ),
+        migrations.AddIndex(
+            model_name='dailycategorytotal',
+            index=models.Index(fields=['ledger_month', 'date'], name='generation__ledger__8d4ec0_idx'),
+        ),
+    ]
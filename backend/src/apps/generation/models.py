@@ -1,27 +1,94 @@
-import pydantic
+import uuid
 
+from django.db import models
 
-# Pydantic models
-class UserViewModel(pydantic.BaseModel):
-    id: str
-    email: str
-    username: str
-    allow_report: bool
-    current_ledger: int
 
+class ReportJob(models.Model):
+    """A queued run of the automated monthly report for a period"""
 
-class LedgerModel(pydantic.BaseModel):
-    id: int
-    name: str
-    currency_name: str
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        COMPLETED = "completed"
+        FAILED = "failed"
 
+    ACTIVE_STATUSES = [Status.PENDING, Status.RUNNING]
 
-class EntryModel(pydantic.BaseModel):
-    amount: float
-    is_positive: bool
-    created_by: str
-    date: str
-    id: int
-    note: str | None
-    category: str
-    ledger: int
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    month = models.PositiveSmallIntegerField()
+    year = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+
+    # Progress counters
+    user_count = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+
+    # The worker holding the job renews its heartbeat, a job with a stale heartbeat is resumed by another worker
+    worker = models.CharField(max_length=255, null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+        constraints = [
+            # Only one job of a period can be queued or running at a time
+            models.UniqueConstraint(
+                fields=["month", "year"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="unique_active_report_job"
+            )
+        ]
+
+
+class ReportJobItem(models.Model):
+    """The checkpoint of a user whose report was processed by a job"""
+
+    job = models.ForeignKey(ReportJob, on_delete=models.CASCADE, related_name="items")
+    user_id = models.CharField(max_length=64)
+    username = models.CharField(max_length=255)
+    sent = models.BooleanField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["job", "user_id"], name="unique_report_job_item")]
+
+
+class LedgerMonth(models.Model):
+    """The state of the stored aggregates of a ledger's month, see `AggregateStore`"""
+
+    ledger_id = models.BigIntegerField()
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+
+    # Bumped by every change to the entries of the month. The aggregates are
+    # fresh while they were computed at the current version.
+    version = models.PositiveIntegerField(default=0)
+    refreshed_version = models.PositiveIntegerField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    entry_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["ledger_id", "year", "month"], name="unique_ledger_month")]
+
+
+class DailyCategoryTotal(models.Model):
+    """The sum of a ledger's entries of a day, category and sign"""
+
+    ledger_month = models.ForeignKey(LedgerMonth, on_delete=models.CASCADE, related_name="totals")
+    date = models.DateField()
+    category = models.CharField(max_length=255)
+    is_positive = models.BooleanField()
+    total = models.FloatField()
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["ledger_month", "date"])]
@@ -0,0 +1,73 @@
+import json
+from dataclasses import dataclass, astuple
+
+import pydantic
+
+# The pydantic models are kept apart from the Django models of `models.py`, so the
+# render worker processes can import them before Django is set up.
+
+
+class UserViewModel(pydantic.BaseModel):
+    id: str
+    email: str
+    username: str
+    allow_report: bool
+    current_ledger: int
+
+
+class LedgerModel(pydantic.BaseModel):
+    id: int
+    name: str
+    currency_name: str
+
+
+class EntryModel(pydantic.BaseModel):
+    amount: float
+    is_positive: bool
+    created_by: str
+    date: str
+    id: int
+    note: str | None = None
+    category: str
+    ledger: int
+
+
+@dataclass(slots=True)
+class EntryRecord:
+    """A lightweight counterpart of `EntryModel` that is built from trusted rows
+    without validation. It has the same fields, and the parts of the pydantic
+    model interface that are used on entries."""
+
+    amount: float
+    is_positive: bool
+    created_by: str
+    date: str
+    id: int
+    note: str | None
+    category: str
+    ledger: int
+
+    def model_dump(self) -> dict:
+        return dict(zip(ENTRY_RECORD_FIELDS, astuple(self)))
+
+    def model_dump_json(self) -> str:
+        return json.dumps(self.model_dump(), separators=(",", ":"), ensure_ascii=False)
+
+
+ENTRY_RECORD_FIELDS = tuple(EntryModel.model_fields)
+
+
+class CategoryTotalModel(pydantic.BaseModel):
+    ledger: int
+    created_by: str
+    category: str
+    is_positive: bool
+    total: float
+
+
+class DeliveryResultModel(pydantic.BaseModel):
+    user_id: str
+    username: str
+    sent: bool
+    attempts: int
+    error: str | None = None
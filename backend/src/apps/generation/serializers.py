@@ -1,7 +1,10 @@
 import locale
 
+from django.conf import settings
 from rest_framework import serializers
 
+from .models import ReportJob
+
 
 class ReportRequestSerializer(serializers.Serializer):
 
@@ -23,6 +26,40 @@ class ReportRequestSerializer(serializers.Serializer):
     def create(self, validated_data):
         return ReportRequestSerializer.ReportRequest(**validated_data)
 
+    @staticmethod
+    def parse_locale(value: str) -> str | None:
+        """Resolve a locale of the format <lang>-<region>
+
+        Params
+        ------
+        value: str
+            The locale, i.e. en-us
+
+        Returns
+        -------
+        str | None
+            The resolved locale name, or None if the locale is unknown
+        """
+        return locale.locale_alias.get(value.replace('-', '_').lower())
+
+    @classmethod
+    def accepted_locales(cls) -> list[str]:
+        """Get every locale that `validate_locale` accepts
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        list[str]
+            The distinct resolved locale names
+        """
+        return sorted({
+            name for alias, name in locale.locale_alias.items()
+            if alias.count('_') == 1 and '-' not in alias
+        })
+
     def validate_locale(self, value: str):
         if value.count('-') != 1:
             raise serializers.ValidationError(self.INVALID_LOCALE_FORMAT_MESSAGE)
@@ -30,8 +67,128 @@ class ReportRequestSerializer(serializers.Serializer):
         if len(value.split('-')) != 2:
             raise serializers.ValidationError(self.INVALID_LOCALE_FORMAT_MESSAGE)
         
-        parsed_locale = locale.locale_alias.get(value.replace('-', '_').lower())
+        parsed_locale = self.parse_locale(value)
         if parsed_locale is None:
             raise serializers.ValidationError(self.INVALID_LOCALE_VALUE_MESSAGE)
 
         return parsed_locale
+
+
+class RangeReportRequestSerializer(ReportRequestSerializer):
+    """A report request over a range of months. Either a `year`, for the whole year,
+    or the `start_month`, `start_year`, `end_month` and `end_year` of the range are given.
+    """
+
+    month = None
+    year = serializers.IntegerField(required=False)
+    start_month = serializers.IntegerField(min_value=1, max_value=12, required=False)
+    start_year = serializers.IntegerField(required=False)
+    end_month = serializers.IntegerField(min_value=1, max_value=12, required=False)
+    end_year = serializers.IntegerField(required=False)
+
+    RANGE_FIELDS = ("start_month", "start_year", "end_month", "end_year")
+
+    INVALID_RANGE_MESSAGE = "Provide either a year, or the start_month, start_year, end_month and end_year of the range."
+    INVALID_RANGE_ORDER_MESSAGE = "The start of the range must not be after its end."
+    RANGE_TOO_LONG_MESSAGE = "The range cannot span more than {} months."
+
+    class RangeReportRequest:
+        def __init__(self, **kwargs):
+            self.ledger_id = kwargs.get("ledger_id")
+            self.start = kwargs.get("start")
+            self.end = kwargs.get("end")
+            self.locale = kwargs.get("locale")
+
+    def create(self, validated_data):
+        return RangeReportRequestSerializer.RangeReportRequest(**validated_data)
+
+    def validate(self, attrs):
+        given = [field for field in self.RANGE_FIELDS if attrs.get(field) is not None]
+
+        if attrs.get("year") is not None and not given:
+            start, end = (1, attrs["year"]), (12, attrs["year"])
+        elif attrs.get("year") is None and len(given) == len(self.RANGE_FIELDS):
+            start = (attrs["start_month"], attrs["start_year"])
+            end = (attrs["end_month"], attrs["end_year"])
+        else:
+            raise serializers.ValidationError(self.INVALID_RANGE_MESSAGE)
+
+        months = (end[1] * 12 + end[0]) - (start[1] * 12 + start[0]) + 1
+        if months < 1:
+            raise serializers.ValidationError(self.INVALID_RANGE_ORDER_MESSAGE)
+
+        if months > settings.REPORT_RANGE_MAX_MONTHS:
+            raise serializers.ValidationError(self.RANGE_TOO_LONG_MESSAGE.format(settings.REPORT_RANGE_MAX_MONTHS))
+
+        validated = {key: value for key, value in attrs.items() if key not in self.RANGE_FIELDS and key != "year"}
+        validated.update(start=start, end=end)
+        return validated
+
+
+class TimeSeriesRequestSerializer(RangeReportRequestSerializer):
+    """A request for the income and expense of a range of months, summed by `bucket`"""
+
+    locale = None
+    bucket = serializers.ChoiceField(choices=["month", "week"], default="month")
+
+    class TimeSeriesRequest:
+        def __init__(self, **kwargs):
+            self.ledger_id = kwargs.get("ledger_id")
+            self.start = kwargs.get("start")
+            self.end = kwargs.get("end")
+            self.bucket = kwargs.get("bucket")
+
+    def create(self, validated_data):
+        return TimeSeriesRequestSerializer.TimeSeriesRequest(**validated_data)
+
+
+class BatchReportTargetSerializer(serializers.Serializer):
+
+    ledger_id = serializers.IntegerField()
+    month = serializers.IntegerField(min_value=1, max_value=12)
+    year = serializers.IntegerField()
+
+
+class BatchReportRequestSerializer(ReportRequestSerializer):
+    """A request for the monthly reports of several ledgers and periods"""
+
+    ledger_id = None
+    month = None
+    year = None
+    targets = serializers.ListField(
+        child=BatchReportTargetSerializer(),
+        min_length=1,
+        max_length=settings.REPORT_BATCH_MAX_TARGETS
+    )
+
+    class BatchReportRequest:
+        def __init__(self, **kwargs):
+            self.targets = kwargs.get("targets")
+            self.locale = kwargs.get("locale")
+
+    def create(self, validated_data):
+        return BatchReportRequestSerializer.BatchReportRequest(**validated_data)
+
+    def validate_targets(self, value: list) -> list[tuple[int, int, int]]:
+        # Repeated targets are only rendered once
+        return list(dict.fromkeys((target["ledger_id"], target["month"], target["year"]) for target in value))
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            "id",
+            "month",
+            "year",
+            "status",
+            "user_count",
+            "sent",
+            "failed",
+            "attempts",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
@@ -1,3 +1,796 @@
-from django.test import TestCase
+import io
+import os
+import json
+import queue
+import shutil
+import socketserver
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.core.cache import caches
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from postgrest import SyncPostgrestClient
+from postgrest.exceptions import APIError
+from postgrest.utils import SyncClient
+
+from apps.generation.models import LedgerMonth, ReportJob, ReportJobItem
+from apps.generation.schemas import DeliveryResultModel, EntryModel, LedgerModel, EntryRecord, UserViewModel
+from apps.generation.views import GenerateReportView
+from apps.generation.utils.aggregates import AggregateStore
+from apps.generation.utils.archive import ZipStream
+from apps.generation.utils.benchmarks.synthetic import SyntheticData
+from apps.generation.utils.cache.report_cache import ReportCache
+from apps.generation.utils.delivery.dispatcher import DeliveryDispatcher
+from apps.generation.utils.delivery.gmail import GmailDeliveryEngine
+from apps.generation.utils.docgen.range_summary import RangeSummary, month_span
+from apps.generation.utils.docgen.renderer import ProcessPoolRenderer
+from apps.generation.utils.docgen.reportlab import ReportlabEngine
+from apps.generation.utils.fetcher.fetcher import DataFetcher
+from apps.generation.utils.jobs.report_job_worker import ReportJobWorker
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks enough SMTP for `smtplib` to send a message, and records what it receives"""
+
+    def _reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server: LocalSMTPServer = self.server
+        with server.lock:
+            server.connections += 1
+
+        self._reply("220 localhost ESMTP")
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+
+            if command.startswith(("EHLO", "HELO")):
+                self._reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self._reply("250 OK")
+
+                with server.lock:
+                    server.messages += 1
+                    drop = server.drop_after is not None and server.messages == server.drop_after
+
+                # Close the connection without a reply, like a server that drops an idle session
+                if drop:
+                    return
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """A local SMTP server that counts its connections and the messages it accepted
+
+    Attributes
+    ----------
+    connections: int
+        The number of connections that were opened
+    messages: int
+        The number of messages that were accepted
+    drop_after: int | None
+        The server closes the connection right after accepting this many messages in total
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, drop_after: int = None):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.drop_after = drop_after
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class GmailDeliveryEngineTestCase(TestCase):
+    def setUp(self):
+        attachment = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        attachment.write(b"%PDF-1.4")
+        attachment.close()
+
+        self.attachment_filepath = attachment.name
+        self.addCleanup(os.remove, attachment.name)
+
+    @staticmethod
+    def _smtp_settings(server: LocalSMTPServer, max_messages_per_connection: int = 100) -> override_settings:
+        return override_settings(
+            GMAIL_SMTP_HOST="127.0.0.1",
+            GMAIL_SMTP_PORT=server.server_address[1],
+            GMAIL_SMTP_SSL=False,
+            GMAIL_SMTP_MAX_MESSAGES_PER_CONNECTION=max_messages_per_connection,
+            GMAIL_EMAIL="reports@example.com",
+            GMAIL_PASSWORD=""
+        )
+
+    def _create_engine(self, server: LocalSMTPServer, max_messages_per_connection: int = 100) -> GmailDeliveryEngine:
+        with self._smtp_settings(server, max_messages_per_connection):
+            return GmailDeliveryEngine()
+
+    def _send(self, engine: GmailDeliveryEngine, count: int):
+        for i in range(count):
+            engine.send_email("Report", "<p>Report</p>", f"user{i}@example.com", self.attachment_filepath, "report.pdf")
+
+    def test_session_reuses_the_connection(self):
+        with LocalSMTPServer() as server:
+            engine = self._create_engine(server)
+            with engine.session():
+                self._send(engine, 3)
+
+        self.assertEqual(server.messages, 3)
+        self.assertEqual(server.connections, 1)
+
+    def test_connection_is_reopened_after_the_message_cap(self):
+        with LocalSMTPServer() as server:
+            engine = self._create_engine(server, max_messages_per_connection=2)
+            with engine.session():
+                self._send(engine, 5)
+
+        self.assertEqual(server.messages, 5)
+        self.assertEqual(server.connections, 3)
+
+    def test_send_reconnects_when_the_server_disconnects(self):
+        with LocalSMTPServer(drop_after=1) as server:
+            engine = self._create_engine(server)
+            with engine.session():
+                # The second email finds the connection closed, and is sent again on a new one
+                self._send(engine, 2)
+
+        self.assertEqual(server.messages, 2)
+        self.assertEqual(server.connections, 2)
+
+    def test_emails_outside_of_a_session_use_their_own_connection(self):
+        with LocalSMTPServer() as server:
+            engine = self._create_engine(server)
+            self._send(engine, 2)
+
+        self.assertEqual(server.messages, 2)
+        self.assertEqual(server.connections, 2)
+
+    def test_dispatcher_worker_survives_a_failing_callback(self):
+        results = []
+
+        def on_result(key, attempts, error):
+            results.append((key, attempts, error))
+            if key == 0:
+                raise RuntimeError("The callback failed")
+
+        pending = queue.Queue()
+        for i in range(3):
+            pending.put((i, {
+                "subject": "Report",
+                "content": "<p>Report</p>",
+                "to_address": f"user{i}@example.com",
+                "attachment_filepath": self.attachment_filepath,
+                "attachment_filename": "report.pdf"
+            }))
+        pending.put(None)
+
+        with LocalSMTPServer() as server, self._smtp_settings(server):
+            for thread in DeliveryDispatcher(GmailDeliveryEngine, max_workers=1).start(pending, on_result):
+                thread.join()
+
+        # Each email is reported once, as sent on its first attempt
+        self.assertEqual(results, [(0, 1, None), (1, 1, None), (2, 1, None)])
+        self.assertEqual(server.messages, 3)
+
+
+class StubPostgrestClient(SyncPostgrestClient):
+    """A PostgREST client whose requests are answered by `handler` instead of a server, and recorded in `requests`"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        super().__init__("http://postgrest.test")
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+    def create_session(self, base_url, headers, timeout, verify=True) -> SyncClient:
+        return SyncClient(base_url=base_url, headers=headers, timeout=timeout, transport=httpx.MockTransport(self._respond))
+
+
+class DataFetcherTestCase(TestCase):
+    LEDGER = LedgerModel(id=7, name="Main", currency_name="USD")
+    UID = "0b9f7e4a-5f5c-4c6c-9d43-2a1f8e0c1d11"
+
+    AGGREGATES_DISABLED = {
+        "code": "PGRST123",
+        "details": None,
+        "hint": None,
+        "message": "Use of aggregate functions is not allowed"
+    }
+
+    def _create_fetcher(self, handler, trusted: bool = False) -> tuple[DataFetcher, StubPostgrestClient]:
+        client = StubPostgrestClient(handler)
+        with mock.patch("apps.generation.utils.fetcher.fetcher.get_client", return_value=client):
+            return DataFetcher(trusted), client
+
+    @staticmethod
+    def _json(status_code: int, content) -> httpx.Response:
+        return httpx.Response(status_code, content=json.dumps(content), headers={"Content-Type": "application/json"})
+
+    def _entry_row(self, entry_id: int, amount: float, category: str, is_positive: bool) -> dict:
+        return {
+            "id": entry_id,
+            "ledger": self.LEDGER.id,
+            "created_by": self.UID,
+            "date": "2024-05-10",
+            "category": category,
+            "amount": amount,
+            "is_positive": is_positive
+        }
+
+    def test_period_statistics_are_decoded(self):
+        rows = [
+            {"ledger": 7, "created_by": self.UID, "category": "Food", "is_positive": False, "total": 42.5},
+            {"ledger": 7, "created_by": self.UID, "category": "Salary", "is_positive": True, "total": 1000},
+        ]
+        fetcher, client = self._create_fetcher(lambda request: self._json(200, rows))
+
+        totals = fetcher.get_period_statistics(self.UID, self.LEDGER, 5, 2024)
+
+        self.assertEqual([(t.category, t.is_positive, t.total) for t in totals], [("Food", False, 42.5), ("Salary", True, 1000)])
+        self.assertEqual(client.requests[0].url.params["select"], DataFetcher.CATEGORY_TOTALS_SELECT)
+
+    def test_period_statistics_fall_back_when_aggregates_are_disabled(self):
+        fetcher, _ = self._create_fetcher(lambda request: self._json(400, self.AGGREGATES_DISABLED))
+
+        self.assertIsNone(fetcher.get_period_statistics(self.UID, self.LEDGER, 5, 2024))
+
+    def test_period_statistics_bulk_fall_back_when_aggregates_are_disabled(self):
+        fetcher, _ = self._create_fetcher(lambda request: self._json(400, self.AGGREGATES_DISABLED))
+
+        self.assertIsNone(fetcher.get_period_statistics_bulk([(self.UID, self.LEDGER)], 5, 2024))
+
+    def test_period_statistics_raise_other_errors(self):
+        error = {"code": "42P01", "details": None, "hint": None, "message": "relation \"entry\" does not exist"}
+        fetcher, _ = self._create_fetcher(lambda request: self._json(404, error))
+
+        with self.assertRaises(APIError):
+            fetcher.get_period_statistics(self.UID, self.LEDGER, 5, 2024)
+
+    def test_column_projected_period_data(self):
+        rows = [self._entry_row(1, 12.5, "Food", False), self._entry_row(2, 1000, "Salary", True)]
+
+        for trusted in (False, True):
+            with self.subTest(trusted=trusted):
+                fetcher, client = self._create_fetcher(lambda request: self._json(200, rows), trusted)
+
+                entries = fetcher.get_period_data(self.UID, self.LEDGER, 5, 2024, DataFetcher.ENTRY_TABLE_COLUMNS)
+
+                self.assertEqual(client.requests[0].url.params["select"], ",".join(DataFetcher.ENTRY_TABLE_COLUMNS))
+                self.assertEqual([(e.id, e.amount, e.category, e.note) for e in entries], [(1, 12.5, "Food", None), (2, 1000, "Salary", None)])
+                self.assertEqual(isinstance(entries[0], EntryRecord), trusted)
+
+    def test_bulk_entries_of_a_shared_ledger_are_kept_per_user(self):
+        other_uid = "5d2c1b0a-9e8f-4a7b-b6c5-d4e3f2a1b0c9"
+        rows = [
+            self._entry_row(1, 10, "Food", False),
+            {**self._entry_row(2, 20, "Rent", False), "created_by": other_uid},
+        ]
+        fetcher, _ = self._create_fetcher(lambda request: self._json(200, rows))
+
+        entries = fetcher.get_period_data_bulk([(self.UID, self.LEDGER), (other_uid, self.LEDGER)], 5, 2024)
+
+        self.assertEqual([e.id for e in entries[(self.UID, self.LEDGER.id)]], [1])
+        self.assertEqual([e.id for e in entries[(other_uid, self.LEDGER.id)]], [2])
+
+    def test_bulk_ledgers_are_only_returned_to_their_creator(self):
+        other_uid = "5d2c1b0a-9e8f-4a7b-b6c5-d4e3f2a1b0c9"
+        rows = [{"id": self.LEDGER.id, "name": "Main", "created_by": self.UID, "currency": {"currency_name": "USD"}}]
+        fetcher, _ = self._create_fetcher(lambda request: self._json(200, rows))
+
+        ledgers = fetcher.get_ledgers_bulk([(self.UID, self.LEDGER.id), (other_uid, self.LEDGER.id)])
+
+        self.assertEqual(list(ledgers), [(self.UID, self.LEDGER.id)])
+
+
+class ProcessPoolRendererTestCase(TestCase):
+    @override_settings(REPORT_RENDER_START_METHOD="spawn")
+    def test_renders_in_spawned_workers(self):
+        # A spawned worker imports the renderer before Django is set up
+        data = SyntheticData(0)
+        renderer = ProcessPoolRenderer(ReportlabEngine, max_workers=1)
+
+        rendered = list(renderer.render_iter((5, 2024), [{"user": data.user(), "ledger": data.ledger(), "data": data.entries(10)}]))
+
+        self.assertEqual(len(rendered), 1)
+        _, filepath, error = rendered[0]
+        self.assertIsNone(error)
+        self.addCleanup(os.remove, filepath)
+
+        with open(filepath, "rb") as document:
+            self.assertEqual(document.read(5), b"%PDF-")
+
+
+class StubJobSteps:
+    """Runs the pipeline of a report job in the calling thread, sending every report"""
+
+    def __init__(self, user_ids, on_user=None):
+        self.user_ids = user_ids
+        self.on_user = on_user
+        self.processed = []
+
+    def fetcher(self):
+        return SimpleNamespace(iter_allow_report_users=lambda: (SimpleNamespace(id=uid) for uid in self.user_ids))
+
+    def _fetch_report_data(self, fetcher, period, users):
+        return users
+
+    def _run_pipeline(self, period, users, fetch_batch, on_result=None):
+        for user in users:
+            if self.on_user is not None:
+                self.on_user(user)
+
+            self.processed.append(user.id)
+            on_result(DeliveryResultModel(user_id=user.id, username=user.id, sent=True, attempts=1))
+
+
+@override_settings(REPORT_JOB_LEASE_TIMEOUT=60, REPORT_JOB_HEARTBEAT_INTERVAL=3600, REPORT_JOB_MAX_ATTEMPTS=2)
+class ReportJobWorkerTestCase(TestCase):
+    def _stale_job(self, attempts=1, **kwargs) -> ReportJob:
+        return ReportJob.objects.create(
+            month=5,
+            year=2024,
+            status=ReportJob.Status.RUNNING,
+            worker="dead-worker",
+            heartbeat_at=timezone.now() - timedelta(seconds=120),
+            attempts=attempts,
+            **kwargs
+        )
+
+    def test_claims_the_oldest_pending_job(self):
+        first = ReportJob.objects.create(month=4, year=2024)
+        second = ReportJob.objects.create(month=5, year=2024)
+        worker = ReportJobWorker(StubJobSteps([]))
+
+        job = worker.claim()
+
+        self.assertEqual(job.pk, first.pk)
+        self.assertEqual(job.status, ReportJob.Status.RUNNING)
+        self.assertEqual(job.worker, worker.name)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(worker.claim().pk, second.pk)
+        self.assertIsNone(worker.claim())
+
+    def test_does_not_claim_a_job_with_a_live_heartbeat(self):
+        ReportJob.objects.create(month=5, year=2024, status=ReportJob.Status.RUNNING, worker="live-worker", heartbeat_at=timezone.now(), attempts=1)
+
+        self.assertIsNone(ReportJobWorker(StubJobSteps([])).claim())
+
+    def test_resumes_a_stale_job_without_the_finished_users(self):
+        stale = self._stale_job(sent=1)
+        ReportJobItem.objects.create(job=stale, user_id="u1", username="u1", sent=True, attempts=1)
+        steps = StubJobSteps(["u1", "u2", "u3"])
+        worker = ReportJobWorker(steps)
+
+        job = worker.claim()
+        self.assertEqual(job.pk, stale.pk)
+        self.assertEqual(job.attempts, 2)
+
+        worker.run_job(job)
+        job.refresh_from_db()
+
+        self.assertEqual(steps.processed, ["u2", "u3"])
+        self.assertEqual(job.status, ReportJob.Status.COMPLETED)
+        self.assertEqual(job.sent, 3)
+        self.assertEqual(job.user_count, 3)
+        self.assertEqual(job.items.count(), 3)
+
+    def test_stops_once_the_lease_is_lost(self):
+        ReportJob.objects.create(month=5, year=2024)
+
+        def steal_lease(user):
+            if user.id == "u2":
+                ReportJob.objects.update(worker="other-worker", heartbeat_at=timezone.now())
+
+        steps = StubJobSteps(["u1", "u2", "u3"], on_user=steal_lease)
+        worker = ReportJobWorker(steps)
+
+        worker.run_job(worker.claim())
+        job = ReportJob.objects.get()
+
+        # The checkpoint of u2 is kept, but its counters belong to the new owner of the job
+        self.assertEqual(steps.processed, ["u1", "u2"])
+        self.assertEqual(job.status, ReportJob.Status.RUNNING)
+        self.assertEqual(job.worker, "other-worker")
+        self.assertEqual(job.sent, 1)
+        self.assertEqual(job.items.count(), 2)
+
+    def test_abandons_a_job_after_max_attempts(self):
+        self._stale_job(attempts=2)
+        steps = StubJobSteps(["u1"])
+        worker = ReportJobWorker(steps)
+
+        job = worker.claim()
+        worker.run_job(job)
+        job.refresh_from_db()
+
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(job.status, ReportJob.Status.FAILED)
+        self.assertEqual(steps.processed, [])
+
+    def test_heartbeat_survives_a_failed_update(self):
+        job = ReportJob.objects.create(month=5, year=2024)
+        worker = ReportJobWorker(StubJobSteps([]))
+        stopped = mock.Mock(wait=mock.Mock(side_effect=[False, False, True]))
+
+        with mock.patch("apps.generation.utils.jobs.report_job_worker.ReportJob") as report_job, \
+                mock.patch("apps.generation.utils.jobs.report_job_worker.connection"):
+            update = report_job.objects.filter.return_value.update
+            update.side_effect = [OperationalError("database is locked"), 1]
+            worker._heartbeat(job, stopped)
+
+        self.assertEqual(update.call_count, 2)
+        self.assertFalse(worker._lease_lost.is_set())
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "reports": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-reports"},
+    "report-meta": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-report-meta"},
+})
+class ReportCacheTestCase(TestCase):
+    def setUp(self):
+        caches["reports"].clear()
+        caches["report-meta"].clear()
+
+    def _create_cache(self, **kwargs) -> ReportCache:
+        return ReportCache("reports", "report-meta", **{"max_entries": 2, "max_bytes": 1024, **kwargs})
+
+    def test_evicts_the_least_recently_used_document(self):
+        cache = self._create_cache()
+        cache.set("a", b"a")
+        cache.set("b", b"b")
+
+        cache.get("a")
+        cache.set("c", b"c")
+
+        self.assertEqual(cache.get("a"), b"a")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), b"c")
+
+    def test_keeps_the_documents_under_max_bytes(self):
+        cache = self._create_cache(max_entries=10, max_bytes=10)
+        cache.set("a", b"a" * 6)
+        cache.set("b", b"b" * 4)
+        cache.set("c", b"c" * 4)
+        cache.set("d", b"d" * 11)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), b"b" * 4)
+        self.assertEqual(cache.get("c"), b"c" * 4)
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(caches["report-meta"].get(ReportCache.INDEX_KEY)["size"], 8)
+
+    def test_counts_hits_and_misses(self):
+        cache = self._create_cache()
+        cache.get("a")
+        cache.set("a", b"a")
+        cache.get("a")
+        cache.get("a")
+
+        # The counters are shared by every instance on the same meta cache
+        self.assertEqual(self._create_cache().stats(), {"hits": 2, "misses": 1})
+
+    def test_keeps_the_generated_on_time_of_an_etag(self):
+        cache = self._create_cache(max_entries=1)
+        generated_on = cache.get_generated_on('W/"a"')
+
+        self.assertEqual(cache.get_generated_on('W/"a"'), generated_on)
+        cache.get_generated_on('W/"b"')
+        self.assertEqual(list(caches["report-meta"].get(ReportCache.INDEX_KEY)["generated_on"]), ["b"])
+        # The documents have their own budget
+        cache.set("a", b"a")
+        self.assertEqual(cache.get("a"), b"a")
+
+    def test_evicts_across_file_based_caches(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        file_caches = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "reports": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": os.path.join(directory, "reports")},
+            "report-meta": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": os.path.join(directory, "meta")},
+        }
+        with override_settings(CACHES=file_caches):
+            lock_file = os.path.join(directory, "meta", "index.lock")
+            first, second = self._create_cache(lock_file=lock_file), self._create_cache(lock_file=lock_file)
+
+            first.set("a", b"a")
+            second.set("b", b"b")
+            first.set("c", b"c")
+
+            self.assertIsNone(second.get("a"))
+            self.assertEqual(second.get("b"), b"b")
+            self.assertEqual(len(os.listdir(os.path.join(directory, "reports"))), 2)
+
+
+class StubReportFetcher:
+    """Serves the same entries of a single user and ledger"""
+
+    ENTRY_TABLE_COLUMNS = None
+    DATA = SyntheticData(0)
+    ENTRIES = DATA.entries(20, month=5)
+
+    def get_user(self, user_id):
+        return UserViewModel(id=user_id, email="alice@example.com", username="alice", allow_report=True, current_ledger=1)
+
+    def get_ledger(self, user_id, ledger_id):
+        return LedgerModel(id=ledger_id, name="Main", currency_name="USD")
+
+    def get_period_data(self, user_id, ledger, month, year, columns=None):
+        return self.ENTRIES
+
+    def get_period_fingerprint(self, user_id, ledger, month, year):
+        return len(self.ENTRIES), max(e.id for e in self.ENTRIES)
+
+
+@override_settings(AGGREGATE_STORE_MAX_AGE=3600, REPORT_SERVER_AGGREGATION=False)
+class GenerateReportViewTestCase(TestCase):
+    BODY = {"ledger_id": 1, "month": 5, "year": 2024}
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = GenerateReportView.as_view(fetcher=StubReportFetcher)
+
+    def _request(self, method="post", etag=None):
+        headers = {} if etag is None else {"HTTP_IF_NONE_MATCH": etag}
+        if method == "post":
+            request = self.factory.post("/generation/report", self.BODY, format="json", **headers)
+        else:
+            request = self.factory.get("/generation/report", self.BODY, **headers)
+
+        force_authenticate(request, user=SimpleNamespace(id="u1", is_authenticated=True))
+        response = self.view(request)
+        if response.status_code == 200:
+            # Close the document buffer
+            b"".join(response.streaming_content)
+
+        return response
+
+    def test_answers_a_matching_etag_with_304(self):
+        etag = self._request()["ETag"]
+
+        response = self._request(etag=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_answers_a_matching_etag_with_304_on_get(self):
+        response = self._request("get")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self._request("get", response["ETag"]).status_code, 304)
+
+    def test_renders_again_after_a_reported_change(self):
+        etag = self._request()["ETag"]
+
+        AggregateStore.mark_changed(1, "2024-05-03")
+        response = self._request(etag=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_renders_again_once_the_etag_expires(self):
+        # An edit that the webhook missed does not change the fingerprint
+        with mock.patch("apps.generation.views.time.time", return_value=3600 * 10):
+            etag = self._request()["ETag"]
+            self.assertEqual(self._request(etag=etag).status_code, 304)
+
+        with mock.patch("apps.generation.views.time.time", return_value=3600 * 11):
+            response = self._request(etag=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class StubRangeFetcher:
+    """Serves the entries of a ledger by month, and records the ranges that were fetched"""
+
+    def __init__(self, entries, on_fetch=None):
+        self.entries = entries
+        self.on_fetch = on_fetch
+        self.ranges = []
+
+    def iter_range_data(self, uid, ledger, start, end):
+        self.ranges.append((start, end))
+        if self.on_fetch is not None:
+            self.on_fetch()
+
+        first, last = start[1] * 12 + start[0], end[1] * 12 + end[0]
+        yield [e for e in self.entries if first <= int(e.date[:4]) * 12 + int(e.date[5:7]) <= last]
+
+
+class AggregateStoreTestCase(TestCase):
+    LEDGER = LedgerModel(id=1, name="Main", currency_name="USD")
+
+    @staticmethod
+    def _entry(entry_id: int, entry_date: str, amount: float, category: str = "Food", is_positive: bool = False) -> EntryModel:
+        return EntryModel(
+            id=entry_id,
+            amount=amount,
+            is_positive=is_positive,
+            category=category,
+            date=entry_date,
+            note=None,
+            created_by="u1",
+            ledger=1
+        )
+
+    def test_marks_untracked_and_tracked_months_changed(self):
+        self.assertFalse(AggregateStore.mark_changed(1, "2024-05"))
+        self.assertEqual(AggregateStore.get_version(1, 5, 2024), 1)
+
+        self.assertTrue(AggregateStore.mark_changed(1, "2024-05-03"))
+        self.assertEqual(AggregateStore.get_version(1, 5, 2024), 2)
+        self.assertEqual(AggregateStore.get_version(1, 6, 2024), 0)
+        self.assertEqual(AggregateStore.get_version(2, 5, 2024), 0)
+
+    def test_refreshes_only_the_stale_months(self):
+        store = AggregateStore(max_age=0)
+        fetcher = StubRangeFetcher([self._entry(1, "2024-01-10", 5), self._entry(2, "2024-03-02", 7)])
+
+        self.assertEqual(store.refresh(fetcher, "u1", self.LEDGER, (1, 2024), (3, 2024)), 3)
+        self.assertEqual(store.stale_months(1, (1, 2024), (3, 2024)), [])
+        self.assertEqual(LedgerMonth.objects.get(ledger_id=1, year=2024, month=3).entry_count, 1)
+
+        AggregateStore.mark_changed(1, "2024-02-14")
+        self.assertEqual(store.stale_months(1, (1, 2024), (3, 2024)), [(2, 2024)])
+
+        self.assertEqual(store.refresh(fetcher, "u1", self.LEDGER, (1, 2024), (3, 2024)), 1)
+        self.assertEqual(fetcher.ranges, [((1, 2024), (3, 2024)), ((2, 2024), (2, 2024))])
+
+    def test_keeps_a_month_changed_during_the_refresh_stale(self):
+        store = AggregateStore(max_age=0)
+        fetcher = StubRangeFetcher([], on_fetch=lambda: AggregateStore.mark_changed(1, "2024-05"))
+
+        store.refresh(fetcher, "u1", self.LEDGER, (5, 2024), (5, 2024))
+
+        self.assertEqual(store.stale_months(1, (5, 2024), (5, 2024)), [(5, 2024)])
+
+    def test_refreshes_the_months_older_than_max_age(self):
+        store = AggregateStore(max_age=60)
+        store.refresh(StubRangeFetcher([]), "u1", self.LEDGER, (5, 2024), (6, 2024))
+
+        LedgerMonth.objects.filter(month=5).update(refreshed_at=timezone.now() - timedelta(seconds=120))
+
+        self.assertEqual(store.stale_months(1, (5, 2024), (6, 2024)), [(5, 2024)])
+        self.assertEqual(AggregateStore(max_age=0).stale_months(1, (5, 2024), (6, 2024)), [])
+
+    def test_groups_consecutive_months_into_spans(self):
+        months = [(11, 2023), (12, 2023), (1, 2024), (3, 2024), (5, 2024), (6, 2024)]
+
+        self.assertEqual(AggregateStore._spans(months), [
+            [(11, 2023), (12, 2023), (1, 2024)],
+            [(3, 2024)],
+            [(5, 2024), (6, 2024)],
+        ])
+        self.assertEqual(AggregateStore._spans([]), [])
+
+    def test_sums_the_time_series_by_month(self):
+        store = AggregateStore(max_age=0)
+        store.refresh(StubRangeFetcher([
+            self._entry(1, "2024-04-30", 10),
+            self._entry(2, "2024-05-01", 20, "Rent"),
+            self._entry(3, "2024-05-31", 5),
+            self._entry(4, "2024-05-15", 100, "Salary", is_positive=True),
+        ]), "u1", self.LEDGER, (4, 2024), (6, 2024))
+
+        april, may, june = store.time_series(1, (4, 2024), (6, 2024))
+
+        self.assertEqual((april["start"], april["end"], april["expense"]), ("2024-04-01", "2024-04-30", 10))
+        self.assertEqual((may["income"], may["expense"], may["net"]), (100, 25, 75))
+        self.assertEqual(may["expense_categories"], {"Rent": 20, "Food": 5})
+        self.assertEqual(may["income_categories"], {"Salary": 100})
+        self.assertEqual((june["end"], june["net"]), ("2024-06-30", 0))
+
+    def test_clips_the_weeks_to_the_range(self):
+        store = AggregateStore(max_age=0)
+        store.refresh(StubRangeFetcher([
+            self._entry(1, "2024-05-01", 1),
+            self._entry(2, "2024-05-05", 2),
+            self._entry(3, "2024-05-06", 4),
+            self._entry(4, "2024-05-31", 8),
+        ]), "u1", self.LEDGER, (5, 2024), (5, 2024))
+
+        weeks = store.time_series(1, (5, 2024), (5, 2024), bucket="week")
+
+        # May 1st 2024 is a Wednesday
+        self.assertEqual([(w["start"], w["end"]) for w in weeks], [
+            ("2024-05-01", "2024-05-05"),
+            ("2024-05-06", "2024-05-12"),
+            ("2024-05-13", "2024-05-19"),
+            ("2024-05-20", "2024-05-26"),
+            ("2024-05-27", "2024-05-31"),
+        ])
+        self.assertEqual([w["expense"] for w in weeks], [3, 4, 0, 0, 8])
+
+
+class RangeSummaryTestCase(TestCase):
+    @staticmethod
+    def _entry(entry_date: str, amount: float, category: str, is_positive: bool = False) -> EntryModel:
+        return EntryModel(id=0, amount=amount, is_positive=is_positive, category=category, date=entry_date, created_by="u1", ledger=1)
+
+    def test_spans_the_months_across_a_year_boundary(self):
+        self.assertEqual(month_span((11, 2023), (2, 2024)), [(11, 2023), (12, 2023), (1, 2024), (2, 2024)])
+        self.assertEqual(month_span((5, 2024), (5, 2024)), [(5, 2024)])
+        self.assertEqual(month_span((6, 2024), (5, 2024)), [])
+
+    def test_sums_the_entries_of_the_range(self):
+        summary = RangeSummary((12, 2023), (1, 2024))
+        summary.add([
+            self._entry("2023-12-24", 30, "Gifts"),
+            self._entry("2023-12-31", 500, "Salary", is_positive=True),
+            self._entry("2024-01-05", 10, "Food"),
+        ])
+        summary.add([
+            self._entry("2024-01-20", 60, "Gifts"),
+            # Outside of the range
+            self._entry("2023-11-30", 1000, "Rent"),
+            self._entry("2024-02-01", 1000, "Salary", is_positive=True),
+        ])
+
+        self.assertEqual(len(summary), 4)
+        self.assertEqual((summary.total_income, summary.total_expense), (500, 100))
+        self.assertEqual(summary.monthly_totals(), [(12, 2023, 500, 30), (1, 2024, 0, 70)])
+        self.assertEqual(summary.expense_breakdown(), [("Gifts", 90, 90.0), ("Food", 10, 10.0)])
+        self.assertEqual(summary.income_breakdown(), [("Salary", 500, 100.0)])
+
+
+class ZipStreamTestCase(TestCase):
+    def test_streams_a_valid_archive(self):
+        stream = ZipStream()
+        members = {"May 2024.pdf": b"%PDF-1.4 " * 100, "reports/June 2024.pdf": os.urandom(4096), "empty.txt": b""}
+
+        chunks = []
+        for name, content in members.items():
+            written = list(stream.write(name, content))
+            # Each member is handed out as soon as it is written
+            self.assertTrue(written)
+            chunks.extend(written)
+        chunks.extend(stream.close())
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), list(members))
+            for name, content in members.items():
+                self.assertEqual(archive.read(name), content)
+
+    def test_compresses_the_members(self):
+        stream = ZipStream(zipfile.ZIP_DEFLATED)
+        data = b"".join([*stream.write("report.txt", b"a" * 10000), *stream.close()])
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.getinfo("report.txt").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(archive.read("report.txt"), b"a" * 10000)
+        self.assertLess(len(data), 10000)
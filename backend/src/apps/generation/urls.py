@@ -4,5 +4,15 @@ from . import views
 
 urlpatterns = [
     path("automated-monthly-report", view=views.AutomatedMonthlyReportView.as_view()),
+    path("automated-monthly-report/jobs/<uuid:job_id>", view=views.AutomatedMonthlyReportJobView.as_view()),
     path("report", view=views.GenerateReportView.as_view()),
+    path("batch-report", view=views.BatchReportView.as_view()),
+    path("range-report", view=views.GenerateRangeReportView.as_view()),
+    path("time-series", view=views.LedgerTimeSeriesView.as_view()),
+    path("entry-changes", view=views.EntryChangesView.as_view()),
+
+    # Asynchronous variants, to be served by an ASGI server
+    path("async/automated-monthly-report", view=views.AsyncAutomatedMonthlyReportView.as_view()),
+    path("async/report", view=views.AsyncGenerateReportView.as_view()),
+    path("async/range-report", view=views.AsyncGenerateRangeReportView.as_view()),
 ]
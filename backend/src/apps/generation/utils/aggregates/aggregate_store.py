@@ -0,0 +1,314 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from calendar import monthrange
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ...models import LedgerMonth, DailyCategoryTotal
+from ...schemas import LedgerModel
+from ..docgen.range_summary import month_span
+from ..fetcher.fetcher import DataFetcher
+from ....common.utils.timing import Timing
+
+
+class AggregateStore:
+    """A local store of the per-day, per-category income and expense of each ledger,
+    so the charts over several months read a few precomputed rows instead of scanning
+    the entries on every request.
+
+    The aggregates are stored and refreshed by ledger month. A month is refreshed only
+    when it was never computed, when one of its entries changed since it was computed
+    (see `mark_changed`, called by the entry webhook), or when it is older than
+    `max_age` seconds, which bounds the staleness of the months whose changes were missed.
+    The consecutive months to refresh are fetched with a single ranged query.
+
+    Attributes
+    ----------
+    max_age: int
+        The number of seconds after which a month is refreshed even if no change was
+        reported. 0 disables the expiry.
+    """
+
+    def __init__(self, max_age: int = None):
+        self.max_age = settings.AGGREGATE_STORE_MAX_AGE if max_age is None else max_age
+
+    @staticmethod
+    def mark_changed(ledger_id: int, entry_date: str) -> bool:
+        """Invalidate the stored aggregates of the month of a changed entry, and bump
+        the version of the month, which is also part of the reports' entity tags
+
+        Params
+        ------
+        ledger_id: int
+            The ledger of the entry
+        entry_date: str
+            The ISO date of the entry, or its "YYYY-MM" prefix
+
+        Returns
+        -------
+        bool
+            True if the month was already tracked,
+            False if it is tracked from now on
+        """
+        year, month = int(entry_date[:4]), int(entry_date[5:7])
+        months = LedgerMonth.objects.filter(ledger_id=ledger_id, year=year, month=month)
+
+        if months.update(version=F("version") + 1) > 0:
+            return True
+
+        try:
+            with transaction.atomic():
+                LedgerMonth.objects.create(ledger_id=ledger_id, year=year, month=month, version=1)
+        except IntegrityError:
+            # Another change of the month created it first
+            months.update(version=F("version") + 1)
+            return True
+
+        return False
+
+    @staticmethod
+    def get_version(ledger_id: int, month: int, year: int) -> int:
+        """Get the number of changes reported for the entries of a ledger's month
+
+        Params
+        ------
+        ledger_id: int
+            The ledger of the entries
+        month: int
+            The month of the entries
+        year: int
+            The year of the entries
+
+        Returns
+        -------
+        int
+            The version of the month, 0 if no change was ever reported
+        """
+        return LedgerMonth.objects \
+            .filter(ledger_id=ledger_id, year=year, month=month) \
+            .values_list("version", flat=True) \
+            .first() or 0
+
+    def _is_stale(self, state: LedgerMonth | None, expiry) -> bool:
+        return state is None \
+            or state.refreshed_version != state.version \
+            or (expiry is not None and state.refreshed_at < expiry)
+
+    def _get_states(self, ledger_id: int, months: List[Tuple[int, int]]) -> Dict[Tuple[int, int], LedgerMonth]:
+        states = LedgerMonth.objects.filter(
+            ledger_id=ledger_id,
+            year__gte=months[0][1],
+            year__lte=months[-1][1]
+        )
+
+        wanted = set(months)
+        return {(s.month, s.year): s for s in states if (s.month, s.year) in wanted}
+
+    def stale_months(self, ledger_id: int, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Get the months of a range whose aggregates must be refreshed
+
+        Params
+        ------
+        ledger_id: int
+            The ledger of the aggregates
+        start: Tuple[int, int]
+            The (month, year) of the first month
+        end: Tuple[int, int]
+            The (month, year) of the last month, included
+
+        Returns
+        -------
+        List[Tuple[int, int]]
+            The (month, year) of each stale month, in order
+        """
+        months = month_span(start, end)
+        states = self._get_states(ledger_id, months)
+        expiry = timezone.now() - timedelta(seconds=self.max_age) if self.max_age else None
+
+        return [period for period in months if self._is_stale(states.get(period), expiry)]
+
+    @staticmethod
+    def _spans(months: List[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+        spans = []
+
+        for month, year in months:
+            if spans and (year * 12 + month) - (spans[-1][-1][1] * 12 + spans[-1][-1][0]) == 1:
+                spans[-1].append((month, year))
+            else:
+                spans.append([(month, year)])
+
+        return spans
+
+    def _claim_states(self, ledger_id: int, months: List[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+        versions = {}
+
+        for month, year in months:
+            try:
+                with transaction.atomic():
+                    state, _ = LedgerMonth.objects.get_or_create(ledger_id=ledger_id, year=year, month=month)
+            except IntegrityError:
+                # Another request created the month first
+                state = LedgerMonth.objects.get(ledger_id=ledger_id, year=year, month=month)
+
+            versions[(month, year)] = state.version
+
+        return versions
+
+    def _save(self, ledger_id: int, versions: Dict[Tuple[int, int], int], totals: Dict[tuple, list]):
+        now = timezone.now()
+
+        with transaction.atomic():
+            states = {
+                (s.month, s.year): s
+                for s in LedgerMonth.objects.select_for_update().filter(
+                    ledger_id=ledger_id,
+                    year__in={year for _, year in versions}
+                )
+                if (s.month, s.year) in versions
+            }
+
+            DailyCategoryTotal.objects.filter(ledger_month__in=states.values()).delete()
+            DailyCategoryTotal.objects.bulk_create(
+                DailyCategoryTotal(
+                    ledger_month=states[(entry_date.month, entry_date.year)],
+                    date=entry_date,
+                    category=category,
+                    is_positive=is_positive,
+                    total=total,
+                    count=count
+                )
+                for (entry_date, category, is_positive), (total, count) in totals.items()
+            )
+
+            entry_counts = defaultdict(int)
+            for (entry_date, _, _), (_, count) in totals.items():
+                entry_counts[(entry_date.month, entry_date.year)] += count
+
+            # The version read before fetching is stored, so a change reported during the fetch keeps the month stale
+            for period, state in states.items():
+                state.refreshed_version = versions[period]
+                state.refreshed_at = now
+                state.entry_count = entry_counts[period]
+            LedgerMonth.objects.bulk_update(states.values(), ["refreshed_version", "refreshed_at", "entry_count"])
+
+    def refresh(
+            self,
+            fetcher: DataFetcher,
+            uid: str,
+            ledger: LedgerModel,
+            start: Tuple[int, int],
+            end: Tuple[int, int]
+    ) -> int:
+        """Recompute the stale months of a range from the user's entries
+
+        Params
+        ------
+        fetcher: DataFetcher
+            The fetcher that reads the entries
+        uid: str
+            The id of the ledger's owner
+        ledger: LedgerModel
+            The ledger of the aggregates
+        start: Tuple[int, int]
+            The (month, year) of the first month
+        end: Tuple[int, int]
+            The (month, year) of the last month, included
+
+        Returns
+        -------
+        int
+            The number of months that were refreshed
+        """
+        stale = self.stale_months(ledger.id, start, end)
+
+        for span in self._spans(stale):
+            versions = self._claim_states(ledger.id, span)
+
+            # Summed by day, category and sign, as [total, count]
+            totals = defaultdict(lambda: [0, 0])
+            dates = {}
+            with Timing.span("aggregates.refresh", months=len(span)):
+                for page in fetcher.iter_range_data(uid, ledger, span[0], span[-1]):
+                    for entry in page:
+                        entry_date = dates.get(entry.date)
+                        if entry_date is None:
+                            entry_date = dates[entry.date] = date.fromisoformat(entry.date[:10])
+
+                        total = totals[(entry_date, entry.category, entry.is_positive)]
+                        total[0] += entry.amount
+                        total[1] += 1
+
+                self._save(ledger.id, versions, totals)
+
+        return len(stale)
+
+    @staticmethod
+    def _bucket_bounds(bucket: str, day: date, first: date, last: date) -> Tuple[date, date]:
+        if bucket == "week":
+            # Weeks start on Monday, the first and the last weeks are clipped to the range
+            start = day - timedelta(days=day.weekday())
+            return max(start, first), min(start + timedelta(days=6), last)
+
+        return date(day.year, day.month, 1), date(day.year, day.month, monthrange(day.year, day.month)[1])
+
+    def time_series(self, ledger_id: int, start: Tuple[int, int], end: Tuple[int, int], bucket: str = "month") -> List[dict]:
+        """Get the stored income and expense of a range, summed by month or by week.
+        Call `refresh` first for the range to be up to date.
+
+        Params
+        ------
+        ledger_id: int
+            The ledger of the aggregates
+        start: Tuple[int, int]
+            The (month, year) of the first month
+        end: Tuple[int, int]
+            The (month, year) of the last month, included
+        bucket: str
+            Either `"month"` or `"week"`
+
+        Returns
+        -------
+        List[dict]
+            One bucket for each month or week of the range, in order, with its `start` and `end`
+            dates, its `income`, `expense` and `net`, and its `income_categories` and
+            `expense_categories` totals
+        """
+        first = date(start[1], start[0], 1)
+        last = date(end[1], end[0], monthrange(end[1], end[0])[1])
+
+        # Every bucket of the range is listed, including the empty ones
+        buckets = {}
+        day = first
+        while day <= last:
+            bucket_start, bucket_end = self._bucket_bounds(bucket, day, first, last)
+            buckets[bucket_start] = {
+                "start": bucket_start.isoformat(),
+                "end": bucket_end.isoformat(),
+                "income": 0,
+                "expense": 0,
+                "net": 0,
+                "income_categories": {},
+                "expense_categories": {},
+            }
+            day = bucket_end + timedelta(days=1)
+
+        rows = DailyCategoryTotal.objects \
+            .filter(ledger_month__ledger_id=ledger_id, date__gte=first, date__lte=last) \
+            .order_by("date") \
+            .values_list("date", "category", "is_positive", "total")
+
+        for day, category, is_positive, total in rows.iterator():
+            data = buckets[self._bucket_bounds(bucket, day, first, last)[0]]
+            sign = "income" if is_positive else "expense"
+
+            data[sign] += total
+            data[f"{sign}_categories"][category] = data[f"{sign}_categories"].get(category, 0) + total
+
+        for data in buckets.values():
+            data["net"] = data["income"] - data["expense"]
+
+        return list(buckets.values())
@@ -0,0 +1,86 @@
+import io
+import zipfile
+from typing import Iterator, List
+
+
+class _ArchiveSink(io.RawIOBase):
+    """An unseekable file that keeps what is written to it until it is drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """Builds a ZIP archive member by member, and hands out its bytes as soon as
+    each member is written, so a response can send the archive while the next
+    members are still being produced.
+
+    The archive is written to an unseekable sink, so the size and the checksum of
+    each member follow its data in a data descriptor instead of being patched into
+    its header. Only the central directory, which lists the members, is kept until
+    `close`.
+
+    Attributes
+    ----------
+    compression: int
+        The compression method of the members. PDF documents are already compressed,
+        so they are stored as is by default.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_STORED):
+        self.compression = compression
+
+        self._sink = _ArchiveSink()
+        self._archive = zipfile.ZipFile(self._sink, mode="w", compression=compression)
+
+    def _drain(self) -> Iterator[bytes]:
+        data = self._sink.drain()
+        if data:
+            yield data
+
+    def write(self, name: str, content: bytes) -> Iterator[bytes]:
+        """Add a member to the archive
+
+        Params
+        ------
+        name: str
+            The path of the member in the archive
+        content: bytes
+            The content of the member
+
+        Returns
+        -------
+        Iterator[bytes]
+            The bytes of the archive that were written for the member
+        """
+        with self._archive.open(name, mode="w") as member:
+            member.write(content)
+
+        yield from self._drain()
+
+    def close(self) -> Iterator[bytes]:
+        """Finish the archive by writing its central directory
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        Iterator[bytes]
+            The last bytes of the archive
+        """
+        self._archive.close()
+        yield from self._drain()
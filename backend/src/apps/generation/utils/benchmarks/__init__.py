@@ -0,0 +1,6 @@
+# flake8: noqa F401
+from .synthetic import SyntheticData
+from .measure import measure
+from .decoding import benchmark_decoding
+from .documents import benchmark_documents
+from .endpoint import benchmark_endpoint
@@ -0,0 +1,41 @@
+from typing import Dict, List
+
+from pydantic import TypeAdapter
+
+from .measure import measure
+from .synthetic import SyntheticData
+from ...schemas import EntryModel
+from ..fetcher.decoding import decode_entries
+
+
+def benchmark_decoding(rows: int = 100_000, repeat: int = 3, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Compare the ways of decoding the entry rows of a PostgREST response
+
+    The compared paths are:
+        - `adapter_per_call`: a `TypeAdapter` built on every call, as the fetcher used to do
+        - `cached_adapter`: the module-level adapter of `decode_entries`
+        - `trusted`: the `EntryRecord`s built by `decode_entries` without validation
+
+    Params
+    ------
+    rows: int
+        The number of rows in the response
+    repeat: int
+        The number of timed runs of each path
+    seed: int
+        The seed of the synthetic rows
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        The best and mean time in seconds and the peak traced memory in bytes of each path
+    """
+    data = SyntheticData(seed).entry_rows(rows)
+
+    paths = {
+        "adapter_per_call": lambda r: TypeAdapter(List[EntryModel]).validate_python(r),
+        "cached_adapter": lambda r: decode_entries(r),
+        "trusted": lambda r: decode_entries(r, trusted=True)
+    }
+
+    return {name: measure(lambda: decode(data), repeat) for name, decode in paths.items()}
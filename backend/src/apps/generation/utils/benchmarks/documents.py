@@ -0,0 +1,66 @@
+from typing import Dict, Iterable, List
+
+from .measure import measure
+from .synthetic import SyntheticData
+from ..docgen.base import BaseDocumentEngine
+from ..docgen.reportlab import ReportlabEngine
+
+DOCUMENT_SIZES = (10, 1_000, 10_000, 100_000)
+DOCUMENT_CATEGORIES = (5, 50)
+
+
+def _render(document_engine: type[BaseDocumentEngine], data: SyntheticData, entries: list, month: int, year: int) -> int:
+    d_engine = document_engine((month, year))
+
+    with d_engine.generate_pdf(data.user(), data.ledger(), entries, d_engine.get_buffer()) as buffer:
+        return buffer.seek(0, 2)
+
+
+def benchmark_documents(
+        sizes: Iterable[int] = DOCUMENT_SIZES,
+        categories: Iterable[int] = DOCUMENT_CATEGORIES,
+        repeat: int = 3,
+        seed: int = 0,
+        document_engine: type[BaseDocumentEngine] = ReportlabEngine
+) -> List[Dict[str, float]]:
+    """Measure the generation of report documents of every number of entries and categories
+
+    Params
+    ------
+    sizes: Iterable[int]
+        The numbers of entries in a report
+    categories: Iterable[int]
+        The numbers of distinct categories the entries are spread over
+    repeat: int
+        The number of timed renders of each report
+    seed: int
+        The seed of the synthetic entries
+    document_engine: type[BaseDocumentEngine]
+        The document engine to measure
+
+    Returns
+    -------
+    List[Dict[str, float]]
+        For each report, the number of `entries` and `categories`, the best and mean time
+        in seconds, the peak traced memory in bytes, and the size of the document in bytes.
+        A report that failed to render has an `error` instead of the measurements.
+    """
+    month, year = 1, 2024
+    data = SyntheticData(seed)
+    results = []
+
+    for size in sizes:
+        for category_count in categories:
+            entries = data.entries(size, month, year, category_count)
+
+            result = {"entries": size, "categories": category_count}
+            try:
+                result["size_bytes"] = _render(document_engine, data, entries, month, year)
+                result.update(measure(lambda: _render(document_engine, data, entries, month, year), repeat))
+            except Exception as e:
+                # A report that fails to render is recorded, so it shows up when results are compared
+                result["error"] = repr(e)
+
+            results.append(result)
+
+    return results
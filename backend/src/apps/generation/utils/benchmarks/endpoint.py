@@ -0,0 +1,127 @@
+from typing import Dict, Iterable, List
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .measure import measure
+from .synthetic import SyntheticData
+from ..cache.report_cache import ReportCache
+from ...views import GenerateReportView
+from ....common.supabase import SupabaseUser
+
+ENDPOINT_SIZES = (10, 1_000, 10_000)
+
+
+class SyntheticFetcher:
+    """A stand-in for `DataFetcher` that serves the same synthetic user, ledger and entries to every request
+
+    Attributes
+    ----------
+    data: SyntheticData
+        The generator of the user and the ledger
+    entries: list
+        The entries of every period
+    """
+
+    ENTRY_TABLE_COLUMNS = None
+
+    data: SyntheticData = None
+    entries: list = None
+
+    def get_user(self, uid):
+        return self.data.user()
+
+    def get_ledger(self, uid, ledger_id):
+        return self.data.ledger()
+
+    def get_period_data(self, uid, ledger, month, year, columns=None):
+        return self.entries
+
+    def get_period_fingerprint(self, uid, ledger, month, year):
+        return len(self.entries), max((entry.id for entry in self.entries), default=None)
+
+    def get_period_statistics(self, uid, ledger, month, year):
+        return None
+
+
+class NullAggregateStore:
+    """A stand-in for `AggregateStore` that reports no change of any month, so the requests need no database"""
+
+    @staticmethod
+    def get_version(ledger_id, month, year) -> int:
+        return 0
+
+
+class NullReportCache:
+    """A report cache that never holds a document, so every request renders its report"""
+
+    make_etag = staticmethod(ReportCache.make_etag)
+
+    def make_key(self, *args) -> str:
+        return ""
+
+    def get_generated_on(self, etag: str) -> None:
+        return None
+
+    def get(self, key: str) -> None:
+        return None
+
+    def set(self, key: str, content: bytes):
+        pass
+
+
+def _request(view, factory: APIRequestFactory, user: SupabaseUser) -> int:
+    request = factory.post("/generation/report", {"ledger_id": 1, "month": 1, "year": 2024}, format="json")
+    force_authenticate(request, user=user)
+
+    response = view(request)
+    if response.status_code != 200:
+        raise RuntimeError(f"The report endpoint responded with {response.status_code}.")
+
+    content = b"".join(response.streaming_content) if response.streaming else response.content
+    response.close()
+    return len(content)
+
+
+def benchmark_endpoint(
+        sizes: Iterable[int] = ENDPOINT_SIZES,
+        repeat: int = 3,
+        seed: int = 0
+) -> List[Dict[str, float]]:
+    """Measure the requests to `GenerateReportView`, with the data served by `SyntheticFetcher`
+    instead of Supabase. Each report is requested without the report cache, then with it.
+
+    Params
+    ------
+    sizes: Iterable[int]
+        The numbers of entries in a report
+    repeat: int
+        The number of timed requests of each report
+    seed: int
+        The seed of the synthetic entries
+
+    Returns
+    -------
+    List[Dict[str, float]]
+        For each report and `cache` mode ("miss" or "hit"), the number of `entries`, the best
+        and mean time in seconds, the peak traced memory in bytes, and the size of the response in bytes
+    """
+    data = SyntheticData(seed)
+    factory = APIRequestFactory()
+    user = SupabaseUser.from_claims({"sub": data.user_id})
+    results = []
+
+    for size in sizes:
+        fetcher = type("SizedSyntheticFetcher", (SyntheticFetcher,), {"data": data, "entries": data.entries(size)})
+
+        for cache, report_cache in (("miss", NullReportCache), ("hit", GenerateReportView.report_cache)):
+            view = GenerateReportView.as_view(fetcher=fetcher, report_cache=report_cache, aggregate_store=NullAggregateStore)
+            # Warms the report cache of the "hit" requests
+            size_bytes = _request(view, factory, user)
+
+            result = {"entries": size, "cache": cache}
+            result.update(measure(lambda: _request(view, factory, user), repeat))
+            result["size_bytes"] = size_bytes
+
+            results.append(result)
+
+    return results
@@ -0,0 +1,49 @@
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+
+def measure(func: Callable[[], Any], repeat: int = 3, trace_memory: bool = True) -> Dict[str, float]:
+    """Time a function, and measure the peak memory it allocates
+
+    Params
+    ------
+    func: Callable[[], Any]
+        The function to measure
+    repeat: int
+        The number of timed calls
+    trace_memory: bool
+        If True, the function is called once more with tracemalloc to measure its peak
+        memory. It is a separate call, as tracing slows the function down.
+
+    Returns
+    -------
+    Dict[str, float]
+        - `best_seconds: float` - the fastest call
+        - `mean_seconds: float` - the mean of the calls
+        - `peak_bytes: int` - the peak traced memory, only if `trace_memory` is True
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    result = {
+        "best_seconds": min(timings),
+        "mean_seconds": sum(timings) / len(timings)
+    }
+
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            output = func()
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        del output
+
+    return result
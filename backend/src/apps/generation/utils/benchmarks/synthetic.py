@@ -0,0 +1,128 @@
+import json
+import random
+import calendar
+from typing import List
+
+from ...schemas import UserViewModel, LedgerModel, EntryModel
+from ..fetcher.decoding import decode_entries
+
+CATEGORIES = ("Food", "Groceries", "Rent", "Utilities", "Transport", "Salary", "Entertainment", "Health", "Travel", "Gifts")
+
+
+def category_names(count: int) -> List[str]:
+    """Get the names of `count` distinct categories"""
+    if count <= len(CATEGORIES):
+        return list(CATEGORIES[:count])
+
+    return list(CATEGORIES) + [f"Category {i}" for i in range(len(CATEGORIES) + 1, count + 1)]
+
+
+class SyntheticData:
+    """Generates reproducible users, ledgers and entries shaped like the rows returned by PostgREST
+
+    Attributes
+    ----------
+    seed: int
+        The seed of the random generator, the same seed always generates the same rows
+    user_id: str
+        The id of the owner of the generated rows
+    ledger_id: int
+        The id of the ledger of the generated entries
+    """
+
+    def __init__(self, seed: int = 0, user_id: str = "00000000-0000-0000-0000-000000000000", ledger_id: int = 1):
+        self.seed = seed
+        self.user_id = user_id
+        self.ledger_id = ledger_id
+
+    def entry_rows(self, count: int, month: int = 1, year: int = 2024, categories: int = len(CATEGORIES)) -> List[dict]:
+        """Generate the rows of the `entry` table in a month
+
+        Params
+        ------
+        count: int
+            The number of rows
+        month: int
+            An integer value in the range [1,12]
+        year: int
+            An integer value
+        categories: int
+            The number of distinct categories the entries are spread over
+
+        Returns
+        -------
+        List[dict]
+            The rows, as decoded from the JSON body of a PostgREST response
+        """
+        rand = random.Random(self.seed)
+        last_day = calendar.monthrange(year, month)[1]
+        names = category_names(categories)
+
+        rows = [
+            {
+                "id": i + 1,
+                "created_at": f"{year}-{month:02d}-01T00:00:00+00:00",
+                "created_by": self.user_id,
+                "ledger": self.ledger_id,
+                "date": f"{year}-{month:02d}-{rand.randint(1, last_day):02d}",
+                "category": rand.choice(names),
+                "amount": round(rand.uniform(1, 500), 2),
+                "is_positive": rand.random() < 0.3,
+                "note": None if rand.random() < 0.5 else f"Note {i + 1}"
+            }
+            for i in range(count)
+        ]
+
+        # Round-trip through JSON, so the rows hold the same types as a real response
+        return json.loads(json.dumps(rows))
+
+    def ledger_row(self, name: str = "Synthetic", currency_name: str = "USD") -> dict:
+        """Generate the row of the `ledger` table, with its currency embedded
+
+        Params
+        ------
+        name: str
+            The name of the ledger
+        currency_name: str
+            The ISO 4217 code of the ledger's currency
+
+        Returns
+        -------
+        dict
+            The row, as decoded from the JSON body of a PostgREST response
+        """
+        return {
+            "id": self.ledger_id,
+            "name": name,
+            "created_by": self.user_id,
+            "currency": {"currency_name": currency_name}
+        }
+
+    def user(self, username: str = "synthetic") -> UserViewModel:
+        """Generate the user who owns the generated ledger
+
+        Params
+        ------
+        username: str
+            The username of the user
+
+        Returns
+        -------
+        UserViewModel
+            The user
+        """
+        return UserViewModel(
+            id=self.user_id,
+            email=f"{username}@example.com",
+            username=username,
+            allow_report=True,
+            current_ledger=self.ledger_id
+        )
+
+    def ledger(self, name: str = "Synthetic", currency_name: str = "USD") -> LedgerModel:
+        """Generate the ledger of the generated entries, see `ledger_row`"""
+        return LedgerModel(id=self.ledger_id, name=name, currency_name=currency_name)
+
+    def entries(self, count: int, month: int = 1, year: int = 2024, categories: int = len(CATEGORIES)) -> List[EntryModel]:
+        """Generate the validated entries of a month, see `entry_rows`"""
+        return decode_entries(self.entry_rows(count, month, year, categories))
@@ -0,0 +1,309 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where only the threads of a process are synchronized
+    fcntl = None
+
+from django.conf import settings
+from django.core.cache import caches, BaseCache
+
+from ...schemas import UserViewModel, LedgerModel, EntryModel
+
+
+class ReportCache:
+    """A content-addressed cache of generated report documents that is backed by
+    Django's cache framework, so it is shared by every worker process that uses
+    the same cache backend.
+
+    The documents are evicted in least recently used order once the cache holds more
+    than `max_entries` documents or more than `max_bytes`. The access order and the size
+    of the documents are kept in an index on the `meta_cache`, with the hit and miss
+    counters and the "Generated on" times of `get_generated_on`. The index is updated
+    under a lock, which also holds across processes if `lock_file` is set.
+
+    Attributes
+    ----------
+    cache: BaseCache
+        The Django cache backend that stores the documents
+    meta_cache: BaseCache
+        The Django cache backend that stores the index
+    max_entries: int
+        The maximum number of documents to keep, and of "Generated on" times
+    max_bytes: int
+        The maximum total size of the documents to keep
+    lock_file: str | None
+        The file locked while the index is updated
+    """
+
+    KEY_PREFIX = "report"
+    INDEX_KEY = "report-cache:index"
+
+    _thread_lock = threading.Lock()
+
+    def __init__(
+            self,
+            alias: str = None,
+            meta_alias: str = None,
+            max_entries: int = None,
+            max_bytes: int = None,
+            lock_file: str = None
+    ):
+        self.cache: BaseCache = caches[alias or settings.REPORT_CACHE_ALIAS]
+        self.meta_cache: BaseCache = caches[meta_alias or settings.REPORT_CACHE_META_ALIAS]
+        self.max_entries = max_entries or settings.REPORT_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or settings.REPORT_CACHE_MAX_BYTES
+        self.lock_file = lock_file or settings.REPORT_CACHE_LOCK_FILE
+
+    @staticmethod
+    def make_key(
+            user: UserViewModel,
+            ledger: LedgerModel,
+            month: int,
+            year: int,
+            locale: str,
+            entries: List[EntryModel],
+            generated_on: datetime = None
+    ) -> str:
+        """Compute the digest that identifies a report document
+
+        Params
+        ------
+        user: UserViewModel
+            The user that the report is generated for
+        ledger: LedgerModel
+            The ledger of the report
+        month: int
+            The month of the report period
+        year: int
+            The year of the report period
+        locale: str
+            The locale used to format the report
+        entries: List[EntryModel]
+            The entries that are rendered in the report
+        generated_on: datetime
+            The "Generated on" time of a deterministic document, see `get_generated_on`
+
+        Returns
+        -------
+        str
+            A hex digest that changes whenever any of the inputs change
+        """
+        digest = hashlib.sha256()
+        digest.update(user.model_dump_json().encode())
+        digest.update(ledger.model_dump_json().encode())
+        digest.update(f"{month}:{year}:{locale}:{len(entries)}".encode())
+        if generated_on is not None:
+            digest.update(generated_on.isoformat().encode())
+
+        for entry in sorted(entries, key=lambda e: e.id):
+            digest.update(entry.model_dump_json().encode())
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_etag(
+            user: UserViewModel,
+            ledger: LedgerModel,
+            month: int,
+            year: int,
+            locale: str,
+            entry_count: int,
+            last_entry_id: int | None,
+            version: int,
+            expiry: int | None = None
+    ) -> str:
+        """Compute the entity tag of a report from a fingerprint of its inputs. Unlike
+        `make_key`, it does not need the entries, so an unchanged report is recognized
+        before they are fetched.
+
+        The entries have no modification time, so an added or deleted entry is detected
+        by the count and the largest id, and an edited entry by the version of its month
+        (see `AggregateStore.mark_changed`). The `expiry` changes the tag periodically, which
+        bounds how long an edit missed by the entry webhook is served as unchanged. The tag is weak: the documents of a tag show
+        the same data, but the bytes may differ if their "Generated on" time was lost
+        from the cache.
+
+        Params
+        ------
+        user: UserViewModel
+            The user that the report is generated for
+        ledger: LedgerModel
+            The ledger of the report
+        month: int
+            The month of the report period
+        year: int
+            The year of the report period
+        locale: str
+            The locale used to format the report
+        entry_count: int
+            The number of entries of the period
+        last_entry_id: int | None
+            The largest id of the entries of the period
+        version: int
+            The number of changes reported for the entries of the period
+        expiry: int | None
+            The time bucket the tag is valid in, None if it does not expire
+
+        Returns
+        -------
+        str
+            A weak entity tag
+        """
+        digest = hashlib.sha256()
+        digest.update(user.model_dump_json().encode())
+        digest.update(ledger.model_dump_json().encode())
+        digest.update(f"{month}:{year}:{locale}:{entry_count}:{last_entry_id}:{version}:{expiry}".encode())
+
+        return f'W/"{digest.hexdigest()[:32]}"'
+
+    def get_generated_on(self, etag: str) -> datetime:
+        """Get the "Generated on" time of the documents of an entity tag. It is set by the
+        first call and kept until it is the least recently used of `max_entries` times,
+        so every rendering of the same inputs shows the same time while it is requested.
+
+        Params
+        ------
+        etag: str
+            An entity tag created by `make_etag`
+
+        Returns
+        -------
+        datetime
+            The time the report of these inputs was first generated
+        """
+        tag = etag.removeprefix("W/").strip('"')
+
+        with self._index() as index:
+            generated_on = index["generated_on"].get(tag)
+            if generated_on is None:
+                generated_on = datetime.now().replace(microsecond=0)
+                index["generated_on"][tag] = generated_on
+
+            index["generated_on"].move_to_end(tag)
+            while len(index["generated_on"]) > self.max_entries:
+                index["generated_on"].popitem(last=False)
+
+        return generated_on
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    @contextmanager
+    def _lock(self):
+        with self._thread_lock:
+            if self.lock_file is None or fcntl is None:
+                yield
+                return
+
+            os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+            with open(self.lock_file, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _index(self):
+        # Reads the index under the lock, and writes it back once the block is done
+        with self._lock():
+            index = self.meta_cache.get(self.INDEX_KEY) or {
+                "documents": OrderedDict(),
+                "size": 0,
+                "generated_on": OrderedDict(),
+                "hits": 0,
+                "misses": 0
+            }
+
+            yield index
+            self.meta_cache.set(self.INDEX_KEY, index, timeout=None)
+
+    def _evict(self, index: dict):
+        documents = index["documents"]
+        while documents and (len(documents) > self.max_entries or index["size"] > self.max_bytes):
+            key, size = documents.popitem(last=False)
+            index["size"] -= size
+            self.cache.delete(self._entry_key(key))
+
+    def get(self, key: str) -> bytes | None:
+        """Get a cached report document
+
+        Params
+        ------
+        key: str
+            A digest created by `make_key`
+
+        Returns
+        -------
+        bytes | None
+            The content of the PDF document if it is cached, None otherwise
+        """
+        content = self.cache.get(self._entry_key(key))
+
+        with self._index() as index:
+            documents = index["documents"]
+            if content is None:
+                index["misses"] += 1
+                # The document expired from the backend
+                if key in documents:
+                    index["size"] -= documents.pop(key)
+            else:
+                index["hits"] += 1
+                # A document missing from the index, e.g. after the meta cache was cleared, is tracked again
+                index["size"] += len(content) - documents.pop(key, 0)
+                documents[key] = len(content)
+                self._evict(index)
+
+        return content
+
+    def set(self, key: str, content: bytes):
+        """Store a report document in the cache
+
+        Params
+        ------
+        key: str
+            A digest created by `make_key`
+        content: bytes
+            The content of the PDF document
+
+        Returns
+        -------
+        None
+        """
+        if len(content) > self.max_bytes:
+            return
+
+        with self._index() as index:
+            documents = index["documents"]
+            index["size"] += len(content) - documents.pop(key, 0)
+            documents[key] = len(content)
+
+            self.cache.set(self._entry_key(key), content)
+            self._evict(index)
+
+    def stats(self) -> dict:
+        """Get the usage counters of the cache
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        dict
+            - `hits: int` - number of lookups that found a document
+            - `misses: int` - number of lookups that did not find a document
+        """
+        index = self.meta_cache.get(self.INDEX_KEY) or {}
+        return {
+            "hits": index.get("hits", 0),
+            "misses": index.get("misses", 0),
+        }
@@ -1,4 +1,6 @@
 from os import PathLike
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
 
 
 class BaseDeliveryEngine:
@@ -34,3 +36,46 @@ class BaseDeliveryEngine:
         None
         """
         pass
+
+    @contextmanager
+    def session(self):
+        """Open a delivery session. Emails that are sent inside the session may share
+        the engine's connection instead of opening one for each email.
+        A session must not be shared between threads.
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        ContextManager[BaseDeliveryEngine]
+            The engine itself
+        """
+        yield self
+
+    def send_many(self, messages: Iterable[dict]) -> List[Optional[Exception]]:
+        """Send multiple emails in a single session. A failed email does not stop the
+        remaining emails from being sent.
+
+        Params
+        ------
+        messages: Iterable[dict]
+            The keyword arguments of `send_email` for each email
+
+        Returns
+        -------
+        List[Optional[Exception]]
+            The error of each email in the same order as `messages`, or None if it was sent
+        """
+        errors = []
+
+        with self.session():
+            for message in messages:
+                try:
+                    self.send_email(**message)
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(e)
+
+        return errors
@@ -0,0 +1,195 @@
+import time
+import queue
+import random
+import smtplib
+import threading
+from typing import Callable, Hashable, List, Optional, Tuple, Type
+
+from django.conf import settings
+
+from .base import BaseDeliveryEngine
+from ....common.utils.logging import CommonLogger
+from ....common.utils.timing import Timing
+from ....metrics.metrics import EMAILS
+
+
+class DeliveryDispatcher:
+    """Sends a batch of emails on a bounded pool of worker threads.
+
+    Each worker opens its own delivery session, so connections are reused between
+    the emails of a worker but never shared between threads. A failed email is
+    retried with an exponential backoff, unless the failure is permanent.
+
+    Attributes
+    ----------
+    delivery_engine: Type[BaseDeliveryEngine]
+        The delivery engine class used by each worker
+    max_workers: int
+        The maximum number of emails that are sent concurrently
+    max_attempts: int
+        The maximum number of attempts for each email
+    backoff: float
+        The delay in seconds before the first retry, doubled on each following retry
+    backoff_max: float
+        The maximum delay in seconds between two attempts
+    """
+
+    logger = CommonLogger
+
+    def __init__(
+            self,
+            delivery_engine: Type[BaseDeliveryEngine],
+            max_workers: int = None,
+            max_attempts: int = None,
+            backoff: float = None,
+            backoff_max: float = None
+    ):
+        self.delivery_engine = delivery_engine
+        self.max_workers = max_workers or settings.REPORT_DELIVERY_WORKERS
+        self.max_attempts = max_attempts or settings.REPORT_DELIVERY_MAX_ATTEMPTS
+        self.backoff = backoff if backoff is not None else settings.REPORT_DELIVERY_BACKOFF
+        self.backoff_max = backoff_max if backoff_max is not None else settings.REPORT_DELIVERY_BACKOFF_MAX
+
+    @staticmethod
+    def is_permanent(error: Exception) -> bool:
+        """Check if an email failed in a way that retrying it would not fix
+
+        Params
+        ------
+        error: Exception
+            The error raised by the delivery engine
+
+        Returns
+        -------
+        bool
+            True if the email should not be retried
+        """
+        if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError)):
+            return True
+
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 500 <= error.smtp_code < 600
+
+        return isinstance(error, (FileNotFoundError, ValueError, TypeError))
+
+    def _get_delay(self, attempt: int) -> float:
+        # Full jitter, so the workers do not retry against the server at the same time
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+
+    def _send(self, deliv_eng: BaseDeliveryEngine, message: dict) -> Tuple[int, Optional[Exception]]:
+        attempt = 0
+        engine = type(deliv_eng).__name__
+
+        while True:
+            attempt += 1
+            try:
+                with Timing.span("delivery.send_email", engine=engine, attempt=attempt):
+                    deliv_eng.send_email(**message)
+                EMAILS.labels(engine, "sent").inc()
+                return attempt, None
+            except Exception as e:
+                if attempt >= self.max_attempts or self.is_permanent(e):
+                    EMAILS.labels(engine, "failed").inc()
+                    return attempt, e
+
+                EMAILS.labels(engine, "retried").inc()
+
+            time.sleep(self._get_delay(attempt))
+
+    def _notify(self, on_result: Callable[[Hashable, int, Optional[Exception]], None], key: Hashable, attempts: int, error: Optional[Exception]):
+        try:
+            on_result(key, attempts, error)
+        except Exception as e:
+            # The email was already handled, a failing callback must not stop the worker
+            self.logger.e(f"The delivery result callback failed: key={key}. {e!r}")
+
+    def _work(self, pending: queue.Queue, on_result: Callable[[Hashable, int, Optional[Exception]], None]):
+        stopped = False
+
+        try:
+            deliv_eng = self.delivery_engine()
+
+            # `_send` catches the errors of each email, so only the engine and its session can raise here
+            with deliv_eng.session():
+                while (item := pending.get()) is not None:
+                    key, message = item
+                    self._notify(on_result, key, *self._send(deliv_eng, message))
+
+                stopped = True
+        except Exception as e:
+            self.logger.e(f"The delivery session failed. {e!r}")
+
+            # Fail the remaining emails of this worker, so the producer is never left blocked on the queue
+            while not stopped and (item := pending.get()) is not None:
+                self._notify(on_result, item[0], 0, e)
+
+    def start(
+            self,
+            pending: queue.Queue,
+            on_result: Callable[[Hashable, int, Optional[Exception]], None],
+            workers: int = None
+    ) -> List[threading.Thread]:
+        """Start the workers of the dispatcher. Each worker sends the `(key, message)`
+        items of `pending` until it receives a None, so the caller must put one None
+        in the queue for each worker once all the emails are queued.
+
+        Params
+        ------
+        pending: queue.Queue
+            The queue of the `(key, message)` items to send, where `message` is the
+            keyword arguments of `send_email`
+        on_result: Callable[[Hashable, int, Optional[Exception]], None]
+            Called from the worker threads with the key, the number of attempts and
+            the final error of each email. The error is None if the email was sent.
+            An exception raised by the callback is logged, and the worker carries on.
+        workers: int
+            The number of workers to start, defaults to `max_workers`
+
+        Returns
+        -------
+        List[threading.Thread]
+            The started workers
+        """
+        threads = [
+            threading.Thread(target=self._work, args=(pending, on_result), daemon=True)
+            for _ in range(workers or self.max_workers)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        return threads
+
+    def deliver_many(self, messages: List[dict]) -> List[Tuple[int, Optional[Exception]]]:
+        """Send multiple emails concurrently
+
+        Params
+        ------
+        messages: List[dict]
+            The keyword arguments of `send_email` for each email
+
+        Returns
+        -------
+        List[Tuple[int, Optional[Exception]]]
+            The number of attempts and the final error of each email, in the same
+            order as `messages`. The error is None if the email was sent.
+        """
+        if len(messages) < 1:
+            return []
+
+        workers = min(self.max_workers, len(messages))
+        results = [None] * len(messages)
+
+        pending = queue.Queue()
+        for index, message in enumerate(messages):
+            pending.put((index, message))
+        for _ in range(workers):
+            pending.put(None)
+
+        def on_result(index, attempts, error):
+            results[index] = (attempts, error)
+
+        for thread in self.start(pending, on_result, workers):
+            thread.join()
+
+        return results
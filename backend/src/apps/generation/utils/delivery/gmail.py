@@ -1,6 +1,7 @@
 import os
 import smtplib
 from email import encoders
+from contextlib import contextmanager
 from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -11,14 +12,28 @@ from .base import BaseDeliveryEngine
 
 
 class GmailDeliveryEngine(BaseDeliveryEngine):
+    """Sends emails through the Gmail SMTP server.
+
+    Outside of a `session`, each email opens its own connection. Inside a session,
+    the authenticated connection is kept open and reused by the following emails.
+    It is reopened after `max_messages_per_connection` emails, or when the server drops it.
+    """
+
     def __init__(self):
-        self.host = "smtp.gmail.com"
-        self.port = 465
+        self.host = settings.GMAIL_SMTP_HOST
+        self.port = settings.GMAIL_SMTP_PORT
+        self.use_ssl = settings.GMAIL_SMTP_SSL
+        self.timeout = settings.GMAIL_SMTP_TIMEOUT
+        self.max_messages_per_connection = settings.GMAIL_SMTP_MAX_MESSAGES_PER_CONNECTION
         self.email = settings.GMAIL_EMAIL
         self.username = settings.GMAIL_EMAIL
         self.password = settings.GMAIL_PASSWORD
-    
-    def send_email(self, subject, content, to_address, attachment_filepath: os.PathLike, attachment_filename: str):
+
+        self._smtp_server = None
+        self._sent_on_connection = 0
+        self._in_session = False
+
+    def _create_message(self, subject, content, to_address, attachment_filepath: os.PathLike, attachment_filename: str):
         # Attachment
         attachment_part = MIMEBase("application", "pdf")
         with open(attachment_filepath, "rb") as f:
@@ -34,7 +49,7 @@ class GmailDeliveryEngine(BaseDeliveryEngine):
 
         # Prepare the main message
         message = MIMEMultipart()
-        
+
         message["Subject"] = subject
         message["From"] = self.email
         message["To"] = to_address
@@ -42,8 +57,72 @@ class GmailDeliveryEngine(BaseDeliveryEngine):
         message.attach(content_part)
         message.attach(attachment_part)
 
-        with smtplib.SMTP_SSL(self.host, self.port) as smtp_server:
+        return message
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            smtp_server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp_server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+        if self.username and self.password:
             smtp_server.login(self.username, self.password)
-            smtp_server.sendmail(self.email, to_address, message.as_string())
+
+        self._smtp_server = smtp_server
+        self._sent_on_connection = 0
+        return smtp_server
+
+    def _disconnect(self):
+        if self._smtp_server is None:
+            return
+
+        try:
+            self._smtp_server.quit()
+        except OSError:
+            self._smtp_server.close()
+        finally:
+            self._smtp_server = None
+            self._sent_on_connection = 0
+
+    def _get_connection(self) -> smtplib.SMTP:
+        if self._smtp_server is not None and self._sent_on_connection >= self.max_messages_per_connection:
+            self._disconnect()
+
+        if self._smtp_server is None:
+            return self._connect()
+
+        return self._smtp_server
+
+    @contextmanager
+    def session(self):
+        if self._in_session:
+            yield self
+            return
+
+        self._in_session = True
+        try:
+            yield self
+        finally:
+            self._in_session = False
+            self._disconnect()
+
+    def send_email(self, subject, content, to_address, attachment_filepath: os.PathLike, attachment_filename: str):
+        message = self._create_message(subject, content, to_address, attachment_filepath, attachment_filename)
+
+        with self.session():
+            try:
+                self._get_connection().sendmail(self.email, to_address, message.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # The server closed an idle or exhausted connection, retry once on a new one
+                self._disconnect()
+                self._get_connection().sendmail(self.email, to_address, message.as_string())
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The message was rejected, but the connection can still be used
+                raise
+            except OSError:
+                self._disconnect()
+                raise
+
+            self._sent_on_connection += 1
 
         return
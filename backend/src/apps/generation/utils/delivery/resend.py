@@ -3,8 +3,10 @@ from os import PathLike
 import resend
 from django.conf import settings
 
+from .base import BaseDeliveryEngine
 
-class ResendDeliveryEngine:
+
+class ResendDeliveryEngine(BaseDeliveryEngine):
     def __init__(self):
         resend.api_key = settings.RESEND_KEY
 
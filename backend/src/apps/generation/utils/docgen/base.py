@@ -1,15 +1,27 @@
 import os
-from typing import List
+import uuid
+from typing import List, BinaryIO
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
 from babel.numbers import LC_NUMERIC
 
-from ...models import UserViewModel, LedgerModel, EntryModel
+from ...schemas import UserViewModel, LedgerModel, EntryModel, CategoryTotalModel
 from ... import apps
+from .range_summary import RangeSummary
 
 
 class BaseDocumentEngine:
     month: int
     year: int
+    # The last month of a period set by `set_period_range`
+    end_month: int = None
+    end_year: int = None
+    # Set by `set_deterministic`, the "Generated on" time of the report instead of the current time
+    generated_on: datetime = None
+    invariant: bool = False
+
+    # Documents larger than this are spilled from memory to a temporary file
+    SPOOL_MAX_SIZE = 4 * 1024 * 1024
     
     def __init__(self, period: tuple[int, int] = None):
         if period is None:
@@ -20,12 +32,62 @@ class BaseDocumentEngine:
         self.month = period[0]
         self.year = period[1]
 
+    @staticmethod
+    def register_fonts() -> None:
+        """Load the fonts used by the engine. It is called once in every
+        rendering worker process before any document is generated.
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        None
+        """
+        pass
+
     def set_period(self, month=None, year=None):
         if month is not None:
             self.month = month
         if year is not None:
             self.year = year
 
+    def set_period_range(self, start: tuple[int, int], end: tuple[int, int]):
+        """Set a period that spans from the start month to the end month, included.
+        `month` and `year` are set to the start of the range.
+
+        Params
+        ------
+        start: tuple[int, int]
+            The (month, year) of the first month
+        end: tuple[int, int]
+            The (month, year) of the last month
+
+        Returns
+        -------
+        None
+        """
+        self.set_period(*start)
+        self.end_month, self.end_year = end
+
+    def set_deterministic(self, generated_on: datetime):
+        """Render the same document for the same inputs, so it can be identified by
+        an entity tag. The report shows the given time instead of the current time,
+        and the engine leaves out any other varying metadata.
+
+        Params
+        ------
+        generated_on: datetime
+            The time shown as the generation time of the report
+
+        Returns
+        -------
+        None
+        """
+        self.generated_on = generated_on
+        self.invariant = True
+
     def set_currency(self, currency: str):
         self.currency = currency
     
@@ -66,26 +128,89 @@ class BaseDocumentEngine:
             An absolute path to a PDF file
         """
         now = datetime.now()
-        filepath = os.path.join(os.path.dirname(apps.__file__), "storage", f"{user.id}-{now.strftime('%d%m%Y-%H%M%S')}.pdf")
+        # The reports of a user can be rendered concurrently, so the timestamp alone is not unique
+        filepath = os.path.join(os.path.dirname(apps.__file__), "storage", f"{user.id}-{now.strftime('%d%m%Y-%H%M%S')}-{uuid.uuid4().hex[:8]}.pdf")
 
         if not os.path.exists(os.path.dirname(filepath)):
             os.makedirs(os.path.dirname(filepath))
 
         return filepath
 
-    def generate_pdf(self, user: UserViewModel, ledger: LedgerModel, entries: List[EntryModel]):
+    def get_buffer(self) -> BinaryIO:
+        """Get a new in-memory buffer where a report document can be written to
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        BinaryIO
+            A spooled temporary file. It is kept in memory unless the document
+            grows past `SPOOL_MAX_SIZE` bytes.
+        """
+        return SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE, mode="w+b")
+
+    def generate_pdf(
+            self,
+            user: UserViewModel,
+            ledger: LedgerModel,
+            entries: List[EntryModel],
+            output: str | BinaryIO | None = None,
+            statistics: List[CategoryTotalModel] | None = None
+    ):
         """Generate a PDF report for the specified user and their data
 
         Params
         ------
         user: UserViewModel
             An object containing user information
+        ledger: LedgerModel
+            The ledger that the entries belong to
         entries: list of Entry
             A list user's data
+        output: str | BinaryIO | None
+            | Where the document will be written to. Either a filepath or a writable binary buffer.
+            | If it is not given, a new filepath is created with `get_filepath`
+        statistics: List[CategoryTotalModel] | None
+            | The per-category totals of the entries, aggregated by the database.
+            | If they are not given, the engine aggregates the entries itself.
+
+        Returns
+        -------
+        str | BinaryIO
+            The filepath or the buffer that the PDF document was written to.
+            A buffer is rewound to its start before it is returned.
+        """
+        pass
+
+    def generate_range_pdf(
+            self,
+            user: UserViewModel,
+            ledger: LedgerModel,
+            summary: RangeSummary,
+            output: str | BinaryIO | None = None
+    ):
+        """Generate a PDF report over a range of months, set with `set_period_range`.
+        Instead of listing the entries, it shows the totals of each month, their trend
+        and the per-category breakdown of the whole range.
+
+        Params
+        ------
+        user: UserViewModel
+            An object containing user information
+        ledger: LedgerModel
+            The ledger that the entries belong to
+        summary: RangeSummary
+            The aggregated entries of the range
+        output: str | BinaryIO | None
+            | Where the document will be written to. Either a filepath or a writable binary buffer.
+            | If it is not given, a new filepath is created with `get_filepath`
 
         Returns
         -------
-        str
-            The filepath to the generated PDF file
+        str | BinaryIO
+            The filepath or the buffer that the PDF document was written to.
+            A buffer is rewound to its start before it is returned.
         """
         pass
@@ -0,0 +1,160 @@
+import re
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+
+from babel import Locale, UnknownLocaleError
+from babel.numbers import get_currency_precision, get_currency_symbol, get_decimal_symbol, get_group_symbol
+
+
+class CurrencyFormatter:
+    """Formats amounts in a currency for a locale, with the same output as
+    `babel.numbers.format_currency`.
+
+    The locale, its currency pattern and symbols are resolved once when the formatter
+    is created, so formatting an amount only quantizes it and joins the parts.
+    Patterns that the compiled path does not cover (scientific, significant digits,
+    scaled or long-name patterns) are formatted by Babel. The formatters are cached
+    process-wide, use `get` to create them.
+
+    Attributes
+    ----------
+    currency: str
+        The ISO 4217 code of the currency
+    locale: Locale
+        The locale of the formatted amounts
+    """
+
+    _cache: Dict[Tuple[str, str], "CurrencyFormatter"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, currency: str, locale: str | Locale):
+        self.currency = currency
+        self.locale = Locale.parse(locale)
+        self.pattern = self.locale.currency_formats["standard"]
+
+        pattern = self.pattern
+        self._compiled = (
+            not pattern.exp_prec
+            and "@" not in pattern.pattern
+            and pattern.scale == 0
+            and "¤¤¤" not in "".join(pattern.prefix + pattern.suffix)
+        )
+        if not self._compiled:
+            return
+
+        precision = get_currency_precision(currency)
+        self._quantum = Decimal(1).scaleb(-precision)
+        self._decimal_symbol = get_decimal_symbol(self.locale)
+        self._group_symbol = get_group_symbol(self.locale)
+        self._grouping = pattern.grouping
+        self._min_digits = pattern.int_prec[0]
+        # The positive and negative prefix and suffix, with the currency symbol filled in
+        self._affixes = tuple(
+            (self._resolve_affix(prefix), self._resolve_affix(suffix))
+            for prefix, suffix in zip(pattern.prefix, pattern.suffix)
+        )
+
+    @classmethod
+    def get(cls, currency: str, locale: str | Locale) -> "CurrencyFormatter":
+        """Get the formatter of a currency and a locale, creating it on the first call
+
+        Params
+        ------
+        currency: str
+            The ISO 4217 code of the currency
+        locale: str | Locale
+            The locale identifier, in any form accepted by `babel.Locale.parse`
+
+        Returns
+        -------
+        CurrencyFormatter
+            The formatter shared by the current process
+        """
+        key = (currency, str(locale))
+
+        formatter = cls._cache.get(key)
+        if formatter is None:
+            with cls._lock:
+                formatter = cls._cache.get(key)
+                if formatter is None:
+                    formatter = cls._cache[key] = cls(currency, locale)
+
+        return formatter
+
+    @classmethod
+    def warm(cls, currencies: Iterable[str], locales: Iterable[str]) -> int:
+        """Create the formatters of every pair of currency and locale ahead of the first report.
+        Locales that Babel does not know are skipped.
+
+        Params
+        ------
+        currencies: Iterable[str]
+            The ISO 4217 codes of the currencies
+        locales: Iterable[str]
+            The locale identifiers
+
+        Returns
+        -------
+        int
+            The number of formatters that are cached
+        """
+        currencies = list(currencies)
+
+        for locale in filter(None, locales):
+            for currency in currencies:
+                try:
+                    cls.get(currency, locale)
+                except (UnknownLocaleError, ValueError):
+                    break
+
+        return len(cls._cache)
+
+    def _resolve_affix(self, affix: str) -> str:
+        affix = affix.replace("¤¤", self.currency.upper())
+        affix = affix.replace("¤", get_currency_symbol(self.currency, self.locale))
+
+        # Remove the quotes around literal text, like Babel
+        return re.sub(r"'([^']*)'", lambda m: m.group(1) or "'", affix)
+
+    def _group(self, digits: str) -> str:
+        if len(digits) < self._min_digits:
+            digits = "0" * (self._min_digits - len(digits)) + digits
+
+        size = self._grouping[0]
+        groups = []
+        while len(digits) > size:
+            groups.append(digits[-size:])
+            digits = digits[:-size]
+            size = self._grouping[1]
+
+        groups.append(digits)
+        return self._group_symbol.join(reversed(groups))
+
+    def format(self, amount: float | int | Decimal) -> str:
+        """Format an amount
+
+        Params
+        ------
+        amount: float | int | Decimal
+            The amount to format
+
+        Returns
+        -------
+        str
+            The formatted amount, with the currency symbol
+        """
+        value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+
+        if not self._compiled or not value.is_finite():
+            return self.pattern.apply(value, self.locale, currency=self.currency)
+
+        prefix, suffix = self._affixes[value.is_signed()]
+        integer, _, fraction = f"{abs(value).quantize(self._quantum):f}".partition(".")
+
+        if fraction:
+            return prefix + self._group(integer) + self._decimal_symbol + fraction + suffix
+
+        return prefix + self._group(integer) + suffix
+
+    __call__ = format
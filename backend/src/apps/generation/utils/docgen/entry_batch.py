@@ -0,0 +1,204 @@
+from array import array
+from datetime import date
+from typing import Iterable, Iterator, List, Tuple
+
+from ...schemas import EntryModel, CategoryTotalModel
+
+
+class EntryBatch:
+    """A columnar batch of entries that is shared by the sections of a report.
+
+    The entries are stored in typed arrays instead of a list of models. Each array
+    is built by its own comprehension over the entries, then the totals and the
+    per-category sums of both signs are accumulated in a single pass over the arrays,
+    so no section walks the entries again to aggregate.
+
+    Attributes
+    ----------
+    amounts: array[float]
+        The amount of each entry
+    positive: array[int]
+        1 if the entry is an income, 0 if it is an expense
+    category_codes: array[int]
+        The index of each entry's category in `categories`
+    date_ordinals: array[int]
+        The proleptic Gregorian ordinal of each entry's date
+    categories: List[str]
+        The distinct categories, in the order they first appear
+    total_income: float
+        The sum of the income amounts
+    total_expense: float
+        The sum of the expense amounts
+    """
+
+    def __init__(self):
+        self.amounts = array("d")
+        self.positive = array("b")
+        self.category_codes = array("L")
+        self.date_ordinals = array("l")
+        self.categories: List[str] = []
+
+        self.total_income = 0
+        self.total_expense = 0
+
+        # Per-category sums indexed by category code, and the order each sign first saw its categories
+        self._income_sums = array("d")
+        self._expense_sums = array("d")
+        self._income_order: List[int] = []
+        self._expense_order: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[EntryModel], totals: Iterable[CategoryTotalModel] = None) -> "EntryBatch":
+        """Build a batch from entry models, and aggregate it
+
+        Params
+        ------
+        entries: Iterable[EntryModel]
+            The entries of the report, in the order they are listed
+        totals: Iterable[CategoryTotalModel]
+            The per-category totals of the same entries, aggregated by the database.
+            If they are given, the entries are not aggregated again.
+
+        Returns
+        -------
+        EntryBatch
+            The batch of entries
+        """
+        batch = cls()
+        entries = entries if isinstance(entries, list) else list(entries)
+
+        # The columns are built by comprehensions, which run much faster than appending field by field
+        codes = {}
+        ordinals = {}
+        batch.amounts = array("d", [entry.amount for entry in entries])
+        batch.positive = array("b", [entry.is_positive for entry in entries])
+        batch.category_codes = array("L", [codes.setdefault(entry.category, len(codes)) for entry in entries])
+        # A report spans a single period, so the few distinct dates are only parsed once
+        batch.date_ordinals = array("l", [
+            ordinals[entry.date] if entry.date in ordinals else ordinals.setdefault(entry.date, date.fromisoformat(entry.date[:10]).toordinal())
+            for entry in entries
+        ])
+        if totals is not None:
+            batch._apply_totals(totals, codes)
+            return batch
+
+        batch.categories = list(codes)
+
+        # Aggregate both signs in a single pass over the columns
+        income_sums = array("d", bytes(8 * len(codes)))
+        expense_sums = array("d", bytes(8 * len(codes)))
+        income_seen, expense_seen = bytearray(len(codes)), bytearray(len(codes))
+        total_income, total_expense = 0, 0
+
+        for code, amount, is_positive in zip(batch.category_codes, batch.amounts, batch.positive):
+            if is_positive:
+                total_income += amount
+                income_sums[code] += amount
+                if not income_seen[code]:
+                    income_seen[code] = 1
+                    batch._income_order.append(code)
+            else:
+                total_expense += amount
+                expense_sums[code] += amount
+                if not expense_seen[code]:
+                    expense_seen[code] = 1
+                    batch._expense_order.append(code)
+
+        batch._income_sums, batch._expense_sums = income_sums, expense_sums
+        batch.total_income, batch.total_expense = total_income, total_expense
+        return batch
+
+    def _apply_totals(self, totals: Iterable[CategoryTotalModel], codes: dict):
+        sums = {True: {}, False: {}}
+        for total in totals:
+            code = codes.setdefault(total.category, len(codes))
+            sums[total.is_positive][code] = sums[total.is_positive].get(code, 0) + total.total
+
+        self.categories = list(codes)
+        self._income_sums = array("d", bytes(8 * len(codes)))
+        self._expense_sums = array("d", bytes(8 * len(codes)))
+        for code, amount in sums[True].items():
+            self._income_sums[code] = amount
+        for code, amount in sums[False].items():
+            self._expense_sums[code] = amount
+
+        self.total_income = sum(sums[True].values())
+        self.total_expense = sum(sums[False].values())
+
+        # The categories of each sign are ordered by their first appearance, like an aggregated batch.
+        # The scan stops as soon as every category of the totals was seen, usually after a few entries.
+        unseen = {True: set(sums[True]), False: set(sums[False])}
+        orders = {True: self._income_order, False: self._expense_order}
+        remaining = len(unseen[True]) + len(unseen[False])
+
+        for code, is_positive in zip(self.category_codes, self.positive):
+            if not remaining:
+                break
+            if code in unseen[is_positive]:
+                unseen[is_positive].remove(code)
+                orders[is_positive].append(code)
+                remaining -= 1
+
+        for sign, order in orders.items():
+            order.extend(sorted(unseen[sign]))
+
+    def rows(self) -> Iterator[Tuple[str, str, float, bool]]:
+        """Iterate over the entries
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        Iterator[Tuple[str, str, float, bool]]
+            The ISO date, the category, the amount and whether each entry is an income
+        """
+        dates = {ordinal: date.fromordinal(ordinal).isoformat() for ordinal in set(self.date_ordinals)}
+
+        # Every column is decoded by a C-level map instead of a Python loop
+        return zip(
+            map(dates.__getitem__, self.date_ordinals),
+            map(self.categories.__getitem__, self.category_codes),
+            self.amounts,
+            map(bool, self.positive)
+        )
+
+    def _breakdown(self, sums: array, order: List[int], total: float) -> List[Tuple[str, float, float]]:
+        return [
+            (self.categories[code], sums[code], round(100 * sums[code] / total, 2))
+            for code in order
+        ]
+
+    def income_breakdown(self) -> List[Tuple[str, float, float]]:
+        """Get the income of each category
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        List[Tuple[str, float, float]]
+            The category, the summed amount and its percentage of the total income,
+            in the order the categories first appear
+        """
+        return self._breakdown(self._income_sums, self._income_order, self.total_income)
+
+    def expense_breakdown(self) -> List[Tuple[str, float, float]]:
+        """Get the expense of each category
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        List[Tuple[str, float, float]]
+            The category, the summed amount and its percentage of the total expense,
+            in the order the categories first appear
+        """
+        return self._breakdown(self._expense_sums, self._expense_order, self.total_expense)
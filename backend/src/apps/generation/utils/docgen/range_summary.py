@@ -0,0 +1,144 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from ...schemas import EntryModel
+
+
+def month_span(start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Get every month from the start month to the end month, included
+
+    Params
+    ------
+    start: Tuple[int, int]
+        The (month, year) of the first month
+    end: Tuple[int, int]
+        The (month, year) of the last month
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        The (month, year) of each month, in order
+    """
+    months = []
+    month, year = start
+    while (year, month) <= (end[1], end[0]):
+        months.append((month, year))
+        month, year = (1, year + 1) if month == 12 else (month + 1, year)
+
+    return months
+
+
+class RangeSummary:
+    """The aggregates of a report that spans several months.
+
+    The entries are added one page at a time, and only their monthly and per-category
+    sums are kept, so a year of entries is never held in memory at once.
+    It has the same breakdown methods as `EntryBatch`, so the statistics of a
+    monthly report can be reused for a range.
+
+    Attributes
+    ----------
+    start: Tuple[int, int]
+        The (month, year) of the first month of the range
+    end: Tuple[int, int]
+        The (month, year) of the last month of the range, included
+    months: List[Tuple[int, int]]
+        The (month, year) of every month of the range, in order
+    monthly_income: array[float]
+        The income of each month of `months`
+    monthly_expense: array[float]
+        The expense of each month of `months`
+    total_income: float
+        The sum of the income amounts
+    total_expense: float
+        The sum of the expense amounts
+    count: int
+        The number of entries that were added
+    """
+
+    def __init__(self, start: Tuple[int, int], end: Tuple[int, int]):
+        self.start = start
+        self.end = end
+
+        self.months = month_span(start, end)
+
+        # Entries are mapped to their month by the "YYYY-MM" prefix of their ISO date
+        self._month_index = {f"{year:04d}-{month:02d}": i for i, (month, year) in enumerate(self.months)}
+
+        self.monthly_income = array("d", bytes(8 * len(self.months)))
+        self.monthly_expense = array("d", bytes(8 * len(self.months)))
+        self.total_income = 0
+        self.total_expense = 0
+        self.count = 0
+
+        # Dictionaries keep the order in which each sign first saw its categories
+        self._income_sums: Dict[str, float] = {}
+        self._expense_sums: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, entries: Iterable[EntryModel]):
+        """Add a page of entries to the aggregates
+
+        Params
+        ------
+        entries: Iterable[EntryModel]
+            Entries dated within the range. Entries outside of it are ignored.
+
+        Returns
+        -------
+        None
+        """
+        month_index = self._month_index
+        monthly_income, monthly_expense = self.monthly_income, self.monthly_expense
+        income_sums, expense_sums = self._income_sums, self._expense_sums
+
+        for entry in entries:
+            index = month_index.get(entry.date[:7])
+            if index is None:
+                continue
+
+            amount = entry.amount
+            if entry.is_positive:
+                monthly_income[index] += amount
+                income_sums[entry.category] = income_sums.get(entry.category, 0) + amount
+            else:
+                monthly_expense[index] += amount
+                expense_sums[entry.category] = expense_sums.get(entry.category, 0) + amount
+            self.count += 1
+
+        self.total_income = sum(monthly_income)
+        self.total_expense = sum(monthly_expense)
+
+    def monthly_totals(self) -> List[Tuple[int, int, float, float]]:
+        """Get the totals of each month of the range
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        List[Tuple[int, int, float, float]]
+            The month, the year, the income and the expense of each month, in order
+        """
+        return [
+            (month, year, income, expense)
+            for (month, year), income, expense in zip(self.months, self.monthly_income, self.monthly_expense)
+        ]
+
+    @staticmethod
+    def _breakdown(sums: Dict[str, float], total: float) -> List[Tuple[str, float, float]]:
+        return [
+            (category, amount, round(100 * amount / total, 2))
+            for category, amount in sums.items()
+        ]
+
+    def income_breakdown(self) -> List[Tuple[str, float, float]]:
+        """See `EntryBatch.income_breakdown`"""
+        return self._breakdown(self._income_sums, self.total_income)
+
+    def expense_breakdown(self) -> List[Tuple[str, float, float]]:
+        """See `EntryBatch.expense_breakdown`"""
+        return self._breakdown(self._expense_sums, self.total_expense)
@@ -0,0 +1,188 @@
+import threading
+from types import MappingProxyType
+
+from django.contrib.staticfiles import finders
+
+from reportlab.lib import colors
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus.tables import TableStyle
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+
+
+class FrozenParagraphStyle(ParagraphStyle):
+    """A paragraph style that cannot be modified after it is created, so a single
+    instance can be shared by every document. Copies of it are regular styles."""
+
+    def __init__(self, name, parent=None, **kw):
+        # ReportLab only allows a parent of the same class, so the parent's attributes are copied instead
+        super().__init__(name)
+        if parent is not None:
+            self.__dict__.update({k: v for k, v in parent.__dict__.items() if k not in ("name", "parent")})
+
+        self._setKwds(**kw)
+        self.__dict__["_frozen"] = True
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(f"The paragraph style '{self.name}' is frozen.")
+
+        super().__setattr__(name, value)
+
+    def __deepcopy__(self, memo):
+        # ReportLab copies a style before it adjusts it while splitting paragraphs
+        style = ParagraphStyle(self.name)
+        style.__dict__.update({k: v for k, v in self.__dict__.items() if k != "_frozen"})
+        return style
+
+
+class FrozenTableStyle(TableStyle):
+    """A table style that cannot be extended after it is created"""
+
+    def add(self, *cmd):
+        raise AttributeError("The table style is frozen.")
+
+
+class ReportlabRegistry:
+    """A process-wide registry of the fonts and styles used by `ReportlabEngine`.
+
+    The fonts are parsed and registered with ReportLab, and the styles are built
+    only once per process. The registry is created under a lock and never modified
+    afterwards, so it can be shared by every thread.
+
+    Attributes
+    ----------
+    fonts: MappingProxyType[str, TTFont]
+        The registered fonts, keyed by their ReportLab font name
+    styles: MappingProxyType[str, FrozenParagraphStyle]
+        The paragraph styles of the report
+    table_styles: MappingProxyType[str, FrozenTableStyle]
+        The table styles of the report
+    """
+
+    FONTS = {
+        "Raleway": "fonts/Raleway/Raleway-Regular.ttf",
+        "RalewaySemi": "fonts/Raleway/Raleway-SemiBold.ttf",
+        "RalewayBd": "fonts/Raleway/Raleway-Bold.ttf",
+    }
+
+    _instance: "ReportlabRegistry" = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.fonts = MappingProxyType(self._register_fonts())
+        self.styles = MappingProxyType(self._create_styles())
+        self.table_styles = MappingProxyType(self._create_table_styles())
+
+    @classmethod
+    def get(cls) -> "ReportlabRegistry":
+        """Get the registry of the current process, creating it on the first call
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        ReportlabRegistry
+            The shared registry
+        """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+
+        return cls._instance
+
+    def _register_fonts(self) -> dict:
+        fonts = {name: TTFont(name, finders.find(path)) for name, path in self.FONTS.items()}
+
+        for font in fonts.values():
+            pdfmetrics.registerFont(font)
+        pdfmetrics.registerFontFamily("Raleway", normal="Raleway", bold="RalewayBd")
+
+        return fonts
+
+    def _create_styles(self) -> dict:
+        stylesheet = getSampleStyleSheet()
+
+        return {
+            "header": FrozenParagraphStyle(
+                "ReportHeader",
+                parent=stylesheet["Heading1"],
+                fontName="RalewayBd",
+                leading=13,
+                underlineOffset=-6
+            ),
+            "sub_header": FrozenParagraphStyle(
+                "ReportSubHeader",
+                parent=stylesheet["Heading3"],
+                fontName="Raleway"
+            ),
+            "section_header": FrozenParagraphStyle(
+                "ReportSectionHeader",
+                parent=stylesheet["Heading2"]
+            ),
+            "body": FrozenParagraphStyle(
+                "ReportBody",
+                parent=stylesheet["Normal"]
+            ),
+        }
+
+    def _create_table_styles(self) -> dict:
+        return {
+            "report_info": FrozenTableStyle([
+                ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                ("FONT", (0, 0), (-1, -1), "Raleway")
+            ]),
+            "entry_table": FrozenTableStyle(self._entry_table_commands(footer_rows=1)),
+            # The page-sized tables of a large ledger, each ending with its page subtotal and the running total
+            "entry_pages": FrozenTableStyle(self._entry_table_commands(footer_rows=2)),
+            # The expense and income categories side by side, in two columns each
+            "category_lists": FrozenTableStyle([
+                ("FONT", (0, 0), (-1, -1), "Raleway"),
+                ("ALIGNMENT", (1, 0), (1, -1), "RIGHT"),
+                ("ALIGNMENT", (3, 0), (3, -1), "RIGHT"),
+                ("LEFTPADDING", (0, 0), (0, -1), 30),
+                ("LEFTPADDING", (2, 0), (2, -1), 30),
+                ("RIGHTPADDING", (1, 0), (1, -1), 18),
+                ("RIGHTPADDING", (3, 0), (3, -1), 18),
+            ]),
+            "statistics": FrozenTableStyle([
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ]),
+            # The income, expense and net of each month of a range report, and their totals
+            "monthly_totals": FrozenTableStyle([
+                ("FONT", (0, 0), (-1, -1), "Raleway"),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.black),
+                ("ALIGNMENT", (0, 0), (-1, 0), "CENTER"),
+                ("ALIGNMENT", (1, 1), (-1, -1), "RIGHT"),
+                ("LINEAFTER", (0, 0), (-2, -1), 0.5, colors.Color(0, 0, 0)),
+                ("LINEABOVE", (0, -1), (-1, -1), 1, colors.black),
+                ("ROWBACKGROUNDS", (0, 1), (-1, -1), (colors.white, colors.Color(*[0.9] * 3))),
+            ]),
+        }
+
+    def _entry_table_commands(self, footer_rows: int) -> list:
+        footer = -footer_rows
+
+        commands = [
+            ("FONT", (0, 0), (-1, -1), "Raleway"),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.black),
+            ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+            ("ALIGNMENT", (0, 0), (-1, -1), "CENTER"),
+            ("ALIGNMENT", (-2, 1), (-1, -1), "RIGHT"),
+            ("ALIGNMENT", (2, 1), (2, footer - 1), "LEFT"),
+            ("LINEAFTER", (0, 0), (-2, -1), 0.5, colors.Color(0, 0, 0)),
+        ]
+        commands.extend(("SPAN", (0, row), (-3, row)) for row in range(footer, 0))
+        commands.extend([
+            ("ALIGNMENT", (0, footer), (-2, -1), "RIGHT"),
+            ("LINEABOVE", (0, footer), (-1, footer), 1, colors.black),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), (colors.white, colors.Color(*[0.9] * 3))),
+        ])
+
+        return commands
@@ -0,0 +1,184 @@
+import os
+import multiprocessing
+from typing import List, Dict, Type, Iterable, Iterator, Optional, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import django
+from django.conf import settings
+
+from .base import BaseDocumentEngine
+from ...schemas import UserViewModel, LedgerModel, EntryModel, EntryRecord, CategoryTotalModel
+from ....common.utils.logging import CommonLogger
+
+# Entries are sent to the worker processes as plain tuples in this field order,
+# which pickles much smaller and faster than the pydantic models
+ENTRY_FIELDS = tuple(EntryModel.model_fields)
+
+
+def pack_entries(entries: List[EntryModel]) -> List[tuple]:
+    return [tuple(getattr(entry, field) for field in ENTRY_FIELDS) for entry in entries]
+
+
+def unpack_entries(rows: List[tuple]) -> List[EntryRecord]:
+    # The rows were decoded when they were fetched, and are in the field order of `EntryRecord`
+    return [EntryRecord(*row) for row in rows]
+
+
+def _initialize_worker(document_engine: Type[BaseDocumentEngine]):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    django.setup()
+
+    document_engine.register_fonts()
+
+
+def _render_packed_report(
+        document_engine: Type[BaseDocumentEngine],
+        period: tuple[int, int],
+        user: dict,
+        ledger: dict,
+        entry_rows: List[tuple],
+        statistics: List[CategoryTotalModel] | None,
+        locale: str | None = None
+) -> str:
+    d_engine = document_engine(period)
+    if locale is not None:
+        d_engine.set_locale(locale)
+
+    return d_engine.generate_pdf(
+        UserViewModel.model_construct(**user),
+        LedgerModel.model_construct(**ledger),
+        unpack_entries(entry_rows),
+        statistics=statistics
+    )
+
+
+class ThreadPoolRenderer:
+    """Renders a batch of report documents on a pool of threads
+
+    Attributes
+    ----------
+    document_engine: Type[BaseDocumentEngine]
+        The document engine class used to render each report
+    max_workers: int
+        The number of workers in the pool
+    max_pending: int
+        The maximum number of reports that are submitted to the pool but not yet collected
+    """
+
+    logger = CommonLogger
+
+    def __init__(self, document_engine: Type[BaseDocumentEngine], max_workers: int = None):
+        self.document_engine = document_engine
+        self.max_workers = max_workers or settings.REPORT_RENDER_WORKERS
+        self.max_pending = 2 * self.max_workers
+
+    def _create_executor(self) -> Executor:
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _submit(self, executor: Executor, period: tuple[int, int], d: dict):
+        d_engine = self.document_engine(d.get('period', period))
+        if d.get('locale') is not None:
+            d_engine.set_locale(d['locale'])
+
+        return executor.submit(d_engine.generate_pdf, d['user'], d['ledger'], d['data'], statistics=d.get('statistics'))
+
+    def _collect(self, done, pending: dict) -> Iterator[Tuple[dict, Optional[str], Optional[Exception]]]:
+        for future in done:
+            d = pending.pop(future)
+            try:
+                yield d, future.result(), None
+            except Exception as e:
+                self.logger.e(f"Failed to render the report of user: username={d['user'].username}. {e!r}")
+                yield d, None, e
+
+    def render_iter(
+            self,
+            period: tuple[int, int],
+            data: Iterable[dict]
+    ) -> Iterator[Tuple[dict, Optional[str], Optional[Exception]]]:
+        """Render the reports of multiple users as their data arrives. At most
+        `max_pending` reports are in flight, so `data` is only consumed as fast
+        as the pool renders it.
+
+        Params
+        ------
+        period: tuple[int, int]
+            The (month, year) period of the reports
+        data: Iterable[dict]
+            The report data of each user, with the keys `user`, `ledger`, `data` and optionally `statistics`.
+            The optional `period` and `locale` keys override the period and the locale of a single report.
+
+        Returns
+        -------
+        Iterator[Tuple[dict, Optional[str], Optional[Exception]]]
+            The report data, the filepath of the generated document and the error
+            of each report, in the order they finish rendering
+        """
+        with self._create_executor() as executor:
+            pending = {}
+
+            for d in data:
+                pending[self._submit(executor, period, d)] = d
+
+                if len(pending) >= self.max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from self._collect(done, pending)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from self._collect(done, pending)
+
+    def render_many(self, period: tuple[int, int], data: List[dict]) -> Dict[str, str]:
+        """Render the reports of multiple users
+
+        Params
+        ------
+        period: tuple[int, int]
+            The (month, year) period of the reports
+        data: List[dict]
+            The report data of each user, with the keys `user`, `ledger`, `data` and optionally `statistics`
+
+        Returns
+        -------
+        Dict[str, str]
+            The filepath of each generated document, keyed by the user's id.
+            Users whose report failed to render are left out.
+        """
+        return {
+            d['user'].id: filepath
+            for d, filepath, error in self.render_iter(period, data)
+            if error is None
+        }
+
+
+class ProcessPoolRenderer(ThreadPoolRenderer):
+    """Renders a batch of report documents on a pool of processes, so the
+    CPU-bound layout work is not serialized by the GIL. Each worker process
+    registers the fonts once when it starts.
+    """
+
+    def _create_executor(self) -> Executor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(settings.REPORT_RENDER_START_METHOD),
+            initializer=_initialize_worker,
+            initargs=(self.document_engine,)
+        )
+
+    def _submit(self, executor: Executor, period: tuple[int, int], d: dict):
+        return executor.submit(
+            _render_packed_report,
+            self.document_engine,
+            d.get('period', period),
+            d['user'].model_dump(),
+            d['ledger'].model_dump(),
+            pack_entries(d['data']),
+            d.get('statistics'),
+            d.get('locale')
+        )
+
+
+RENDERERS = {
+    "thread": ThreadPoolRenderer,
+    "process": ProcessPoolRenderer,
+}
@@ -1,56 +1,68 @@
-from typing import List
+import os
+from typing import List, BinaryIO
 from datetime import datetime
-from calendar import monthrange, month_name
+from calendar import monthrange, month_name, month_abbr
+from itertools import islice, zip_longest
 
-from babel.numbers import format_currency
-from django.contrib.staticfiles import finders
+from django.conf import settings
 
-from reportlab.lib import colors
 from reportlab.lib.units import cm
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
 from reportlab.platypus.doctemplate import SimpleDocTemplate
 from reportlab.platypus.paragraph import Paragraph
 from reportlab.graphics.shapes import String
 from reportlab.platypus.tables import Table
 from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
 from reportlab.graphics.charts.piecharts import Pie
-from reportlab.platypus.flowables import PageBreak
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.platypus.flowables import Flowable, PageBreak
 
 from .base import BaseDocumentEngine
-from ...models import UserViewModel, EntryModel, LedgerModel
+from .registry import ReportlabRegistry
+from .entry_batch import EntryBatch
+from .range_summary import RangeSummary
+from .currency import CurrencyFormatter
+from ....common.utils.timing import Timing
+from ....metrics.metrics import REPORT_SIZE
+from ...schemas import UserViewModel, EntryModel, LedgerModel, CategoryTotalModel
 
 
 class ReportlabEngine(BaseDocumentEngine):
+
+    # The height of an entry row: the leading of the 10 pt font and the 3 pt top and bottom paddings
+    ENTRY_ROW_HEIGHT = 18
+    # The padding that SimpleDocTemplate's frame keeps on every side
+    FRAME_PADDING = 6
     
     def __init__(self, period: tuple[int, int] = None):
         super().__init__(period)
         
         self.margin = cm
         self.pagesize = A4
-        self._initialize_font()
-
-    def _initialize_font(self) -> None:
-        raleway_fonts = {
-            "normal": TTFont("Raleway", finders.find("fonts/Raleway/Raleway-Regular.ttf")),
-            "semi-bold": TTFont("RalewaySemi", finders.find("fonts/Raleway/Raleway-SemiBold.ttf")),
-            "bold": TTFont("RalewayBd", finders.find("fonts/Raleway/Raleway-Bold.ttf"))
-        }
-
-        pdfmetrics.registerFont(raleway_fonts["normal"])
-        pdfmetrics.registerFont(raleway_fonts["bold"])
-        pdfmetrics.registerFontFamily("Raleway", normal="Raleway", bold="RalewayBd")
-        
+        self.registry = ReportlabRegistry.get()
+
+    @staticmethod
+    def register_fonts() -> None:
+        """Register the report fonts and build the report styles. They are shared
+        process-wide through `ReportlabRegistry`, so this only does work on the
+        first call in each process.
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        None
+        """
+        ReportlabRegistry.get()
+
     def _format_currency(self, amount):
-        return format_currency(
-            amount,
-            self.currency,
-            locale=self.locale
-        )
+        return CurrencyFormatter.get(self.currency, self.locale).format(amount)
     
-    def _create_document(self, filename: str) -> SimpleDocTemplate:
+    def _create_document(self, filename: str | BinaryIO) -> SimpleDocTemplate:
         return SimpleDocTemplate(
             filename,
             pagesize=self.pagesize,
@@ -58,74 +70,67 @@ class ReportlabEngine(BaseDocumentEngine):
             topMargin=self.margin,
             rightMargin=self.margin,
             bottomMargin=self.margin,
+            # Fixes the creation date and the document id in the PDF's metadata
+            invariant=int(self.invariant),
         )
 
-    def _create_header(self, ledger: LedgerModel) -> Paragraph:
-        stylesheet = getSampleStyleSheet()
-        style = stylesheet["Heading1"]
-        style.fontName = "RalewayBd"
-        style.leading = 13
-        style.underlineOffset = -6
-
-        return Paragraph("<u>FinTrack Monthly Report</u>", style)
+    @Timing.timed("render.header")
+    def _create_header(self, ledger: LedgerModel, title: str = "FinTrack Monthly Report") -> Paragraph:
+        return Paragraph(f"<u>{title}</u>", self.registry.styles["header"])
 
+    @Timing.timed("render.sub_header")
     def _create_sub_header(self, ledger: LedgerModel) -> Table:
-        stylesheet = getSampleStyleSheet()
-        style = stylesheet["Heading3"]
-        style.fontName = "Raleway"
+        if self.end_month is None:
+            return Paragraph(f"{ledger.name} - {month_name[self.month]} {self.year}", self.registry.styles["sub_header"])
 
-        return Paragraph(f"{ledger.name} - {month_name[self.month]} {self.year}", style)
+        if (self.month, self.end_month, self.year) == (1, 12, self.end_year):
+            period = str(self.year)
+        else:
+            period = f"{month_name[self.month]} {self.year} - {month_name[self.end_month]} {self.end_year}"
 
+        return Paragraph(f"{ledger.name} - {period}", self.registry.styles["sub_header"])
+
+    @Timing.timed("render.report_info")
     def _create_report_info(self, user: UserViewModel) -> Table:
-        _, end_dd = monthrange(self.year, self.month)
+        end_month, end_year = (self.month, self.year) if self.end_month is None else (self.end_month, self.end_year)
+        _, end_dd = monthrange(end_year, end_month)
         
         format = "%d %B %Y"
         s_date = datetime(self.year, self.month, 1).strftime(format)
-        e_date = datetime(self.year, self.month, end_dd).strftime(format)
+        e_date = datetime(end_year, end_month, end_dd).strftime(format)
         
         fields = [
             ["Username", f": {user.username}"],
             ["Email", f": {user.email}"],
             ["Period", f": {s_date} - {e_date}"],
-            ["Generated on", f": {datetime.now().strftime(format)}"],
+            ["Generated on", f": {(self.generated_on or datetime.now()).strftime(format)}"],
         ]
 
         return Table(
             fields,
             hAlign="LEFT",
-            style=[
-                ("LEFTPADDING", (0, 0), (-1, -1), 0),
-                ("FONT", (0, 0), (-1, -1), "Raleway")
-            ],
+            style=self.registry.table_styles["report_info"],
         )
 
-    def _create_entry_table(self, entries: List[EntryModel]) -> Table:
-        total_debit = 0
-        total_credit = 0
-        
+    @Timing.timed("render.entry_table")
+    def _create_entry_table(self, batch: EntryBatch) -> Table:
         data = [
             ["No.", "Date", "Category", "Debit", "Credit"]
         ]
 
-        for i, entry in enumerate(entries):
-            row = [str(i + 1) + ".", entry.date, entry.category]
-            amount = self._format_currency(entry.amount)
-
-            if entry.is_positive:
-                total_debit += entry.amount
-                row.append(amount)
-                row.append("-")
-            else:
-                total_credit += entry.amount
-                row.append("-")
-                row.append(amount)
+        # Amounts repeat often within a ledger, so each distinct amount is only formatted once
+        formatted = {amount: self._format_currency(amount) for amount in set(batch.amounts)}
 
-            data.append(row)
+        data.extend(
+            [f"{i}.", entry_date, category, formatted[amount], "-"] if is_positive
+            else [f"{i}.", entry_date, category, "-", formatted[amount]]
+            for i, (entry_date, category, amount, is_positive) in enumerate(batch.rows(), 1)
+        )
 
         data.append([
             'Total', '', '',
-            self._format_currency(total_debit),
-            self._format_currency(total_credit)
+            self._format_currency(batch.total_income),
+            self._format_currency(batch.total_expense)
         ])
 
         aW = self.pagesize[0] - 2 * self.margin
@@ -134,23 +139,103 @@ class ReportlabEngine(BaseDocumentEngine):
             colWidths=[aW * 0.075, aW * 0.145, aW * 0.38, aW * 0.2, aW * 0.2],
             spaceBefore=1.5 * cm,
             repeatRows=1,
-            style=[
-                ("FONT", (0, 0), (-1, -1), "Raleway"),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("BACKGROUND", (0, 0), (-1, 0), colors.black),
-                ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                ("ALIGNMENT", (0, 0), (-1, -1), "CENTER"),
-                ("ALIGNMENT", (-2, 1), (-1, -1), "RIGHT"),
-                ("ALIGNMENT", (2, 1), (2, -1), "LEFT"),
-                ("LINEAFTER", (0, 0), (-2, -1), 0.5, colors.Color(0, 0, 0)),
-                ("SPAN", (0, -1), (-3, -1)),
-                ("ALIGNMENT", (0, -1), (-2, -1), "RIGHT"),
-                ("LINEABOVE", (0, -1), (-1, -1), 1, colors.black),
-                ("ROWBACKGROUNDS", (0, 1), (-1, -1), (colors.white, colors.Color(*[0.9] * 3))),
-            ]
+            style=self.registry.table_styles["entry_table"]
         )
 
+    def _remaining_height(self, flowables: List[Flowable]) -> float:
+        width = self.pagesize[0] - 2 * (self.margin + self.FRAME_PADDING)
+        height = self.pagesize[1] - 2 * (self.margin + self.FRAME_PADDING)
+
+        # The spaces between the flowables are counted in full, which never underestimates the used height
+        for flowable in flowables:
+            _, used = flowable.wrap(width, height)
+            height -= flowable.getSpaceBefore() + used + flowable.getSpaceAfter()
+
+        return height
+
+    @Timing.timed("render.entry_table")
+    def _create_entry_pages(self, batch: EntryBatch, first_page_height: float) -> List[Flowable]:
+        """Create the entry table of a large ledger as one table per page. Every table
+        has fixed row heights and fits its page, so ReportLab never measures or splits
+        a table, and the rendering time grows linearly with the number of entries.
+
+        Params
+        ------
+        batch: EntryBatch
+            The entries of the report
+        first_page_height: float
+            The height left on the first page, below the report info
+
+        Returns
+        -------
+        List[Flowable]
+            The tables, separated by page breaks
+        """
+        header = ["No.", "Date", "Category", "Debit", "Credit"]
+        row_height = self.ENTRY_ROW_HEIGHT
+        space_before = 1.5 * cm
+
+        # Each table holds its header, page subtotal and running total rows besides the entries.
+        # A row of the first page is kept free in case the intro is taller than measured.
+        page_height = self.pagesize[1] - 2 * (self.margin + self.FRAME_PADDING)
+        page_size = int(page_height // row_height) - 3
+        first_page_size = max(int((first_page_height - space_before) // row_height) - 4, 1)
+
+        formatted = {amount: self._format_currency(amount) for amount in set(batch.amounts)}
+        aW = self.pagesize[0] - 2 * self.margin
+        col_widths = [aW * 0.075, aW * 0.145, aW * 0.38, aW * 0.2, aW * 0.2]
+
+        rows = batch.rows()
+        flowables = []
+        number = 0
+        running_income, running_expense = 0, 0
+
+        while number < len(batch) or not flowables:
+            size = page_size if flowables else first_page_size
+            data = [header]
+            page_income, page_expense = 0, 0
+
+            for number, (entry_date, category, amount, is_positive) in enumerate(islice(rows, size), number + 1):
+                if is_positive:
+                    data.append([f"{number}.", entry_date, category, formatted[amount], "-"])
+                    page_income += amount
+                else:
+                    data.append([f"{number}.", entry_date, category, "-", formatted[amount]])
+                    page_expense += amount
+
+            running_income += page_income
+            running_expense += page_expense
+            last = number >= len(batch)
+
+            data.append([
+                "Page subtotal", "", "",
+                self._format_currency(page_income),
+                self._format_currency(page_expense)
+            ])
+            # The last table shows the totals of the batch, which may be aggregated by the database
+            data.append([
+                "Total", "", "",
+                self._format_currency(batch.total_income),
+                self._format_currency(batch.total_expense)
+            ] if last else [
+                "Running total", "", "",
+                self._format_currency(running_income),
+                self._format_currency(running_expense)
+            ])
+
+            if flowables:
+                flowables.append(PageBreak())
+
+            flowables.append(Table(
+                data,
+                colWidths=col_widths,
+                rowHeights=[row_height] * len(data),
+                spaceBefore=0 if flowables else space_before,
+                style=self.registry.table_styles["entry_pages"]
+            ))
+
+        return flowables
+
     def _create_pie_chart(self, drawing: Drawing, labels: List[str], values: List[str]):
         if len(values) < 1:
             drawing.add(String(drawing.width / 2, drawing.height / 2, "No entry data", fontSize=18, fontName="RalewayBd", textAnchor="middle"), '')
@@ -169,103 +254,195 @@ class ReportlabEngine(BaseDocumentEngine):
         drawing.add(pc, '')
         return drawing
 
-    def _create_category_section(self, entrylist: List[List[str]]):
-        if len(entrylist) < 1:
-            return Paragraph("")
-    
+    def _create_category_lists(self, expense_list: List[List[str]], income_list: List[List[str]]):
+        if len(expense_list) < 1 and len(income_list) < 1:
+            return Paragraph("", self.registry.styles["body"])
+
+        # The lists are rows of a single table instead of nested tables, so a long list
+        # is split across pages instead of failing to fit on one
         aW = self.pagesize[0] - 2 * self.margin
         return Table(
-            entrylist,
-            colWidths=[0.25 * aW, 0.25 * aW],
-            style=[
-                ("FONT", (0, 0), (-1, -1), "Raleway"),
-                ("ALIGNMENT", (1, 0), (1, -1), "RIGHT"),
-                ("LEFTPADDING", (0, 0), (0, -1), 24),
-                ("RIGHTPADDING", (1, 0), (1, -1), 24),
-            ])
+            [
+                expense + income
+                for expense, income in zip_longest(expense_list, income_list, fillvalue=["", ""])
+            ],
+            colWidths=[0.25 * aW] * 4,
+            style=self.registry.table_styles["category_lists"])
 
-    def _create_statistics(self, entries: List[EntryModel]):
-        incomes = {}
-        expenses = {}
-        
-        total_income = 0
-        total_expense = 0
-        
+    @Timing.timed("render.statistics")
+    def _create_statistics(self, batch: EntryBatch | RangeSummary) -> List[Flowable]:
         aW = self.pagesize[0] - 2 * self.margin
-        styles = getSampleStyleSheet()
-
-        for entry in entries:
-            # Get the dictionary to increment the counter for
-            target_counter = incomes if entry.is_positive else expenses
-            if target_counter.get(entry.category) is None:
-                target_counter[entry.category] = 0
+        styles = self.registry.styles
 
-            target_counter[entry.category] += entry.amount
+        incomes = batch.income_breakdown()
+        expenses = batch.expense_breakdown()
 
-            if entry.is_positive:
-                total_income += entry.amount
-            else:
-                total_expense += entry.amount
-
-        income_d, expense_d = Drawing(0.5 * aW, 150), Drawing(0.5 * aW, 150)
-        income_list, expense_list = [], []
-
-        # Process income values
-        income_labels, income_values = [], []
-        for k in incomes:
-            income_labels.append(k)
-            income_values.append(incomes[k])
-
-        income_d = self._create_pie_chart(income_d, income_labels, income_values)
-
-        for inc in incomes:
-            income_list.append([
-                f'{inc} ({round(100 * incomes[inc] / total_income, 2)}%)',
-                self._format_currency(incomes[inc])
-            ])
-
-        # Process expense values
-        expense_labels, expense_values = [], []
-        for k in expenses:
-            expense_labels.append(k)
-            expense_values.append(expenses[k])
+        income_d = self._create_pie_chart(
+            Drawing(0.5 * aW, 150),
+            [category for category, _, _ in incomes],
+            [amount for _, amount, _ in incomes]
+        )
+        income_list = [
+            [f'{category} ({percentage}%)', self._format_currency(amount)]
+            for category, amount, percentage in incomes
+        ]
 
-        expense_d = self._create_pie_chart(expense_d, expense_labels, expense_values)
+        expense_d = self._create_pie_chart(
+            Drawing(0.5 * aW, 150),
+            [category for category, _, _ in expenses],
+            [amount for _, amount, _ in expenses]
+        )
+        expense_list = [
+            [f'{category} ({percentage}%)', self._format_currency(amount)]
+            for category, amount, percentage in expenses
+        ]
 
-        for exp in expenses:
-            expense_list.append([
-                f'{exp} ({round(100 * expenses[exp] / total_expense, 2)}%)',
-                self._format_currency(expenses[exp])
-            ])
-            
         data = [
-            [Paragraph("Expense", styles["Heading2"]), Paragraph("Income", styles["Heading2"])],
+            [Paragraph("Expense", styles["section_header"]), Paragraph("Income", styles["section_header"])],
             [expense_d, income_d],
-            [self._create_category_section(expense_list), self._create_category_section(income_list)]
         ]
         
+        return [
+            Table(
+                data,
+                colWidths=[aW * 0.5, aW * 0.5],
+                style=self.registry.table_styles["statistics"]
+            ),
+            self._create_category_lists(expense_list, income_list)
+        ]
+
+    @Timing.timed("render.monthly_totals")
+    def _create_monthly_totals(self, summary: RangeSummary) -> Table:
+        data = [
+            ["Month", "Income", "Expense", "Net"]
+        ]
+        data.extend(
+            [f"{month_name[month]} {year}", self._format_currency(income), self._format_currency(expense), self._format_currency(income - expense)]
+            for month, year, income, expense in summary.monthly_totals()
+        )
+        data.append([
+            "Total",
+            self._format_currency(summary.total_income),
+            self._format_currency(summary.total_expense),
+            self._format_currency(summary.total_income - summary.total_expense)
+        ])
+
+        aW = self.pagesize[0] - 2 * self.margin
         return Table(
             data,
-            colWidths=[aW * 0.5, aW * 0.5],
-            style=[
-                ("VALIGN", (0, 0), (-1, -2), "MIDDLE"),
-                ("VALIGN", (0, -1), (-1, -1), "TOP"),
-            ]
+            colWidths=[aW * 0.25] * 4,
+            spaceBefore=1 * cm,
+            repeatRows=1,
+            style=self.registry.table_styles["monthly_totals"]
         )
 
-    def generate_pdf(self, user: UserViewModel, ledger: LedgerModel, entries: List[EntryModel]):
-        filepath = self.get_filepath(user)
-        document: SimpleDocTemplate = self._create_document(filepath)
+    @Timing.timed("render.trend_chart")
+    def _create_trend_chart(self, summary: RangeSummary) -> Drawing:
+        aW = self.pagesize[0] - 2 * self.margin
+        drawing = Drawing(aW, 230)
+
+        chart = HorizontalLineChart()
+        chart.x, chart.y = 70, 50
+        chart.width, chart.height = aW - 90, 150
+        chart.data = [list(summary.monthly_income), list(summary.monthly_expense)]
+        chart.joinedLines = 1
+        chart.lines[0].strokeColor = colors.green
+        chart.lines[1].strokeColor = colors.red
+        chart.lines.strokeWidth = 1.5
+
+        chart.categoryAxis.categoryNames = [f"{month_abbr[month]} {year % 100:02d}" for month, year in summary.months]
+        chart.categoryAxis.labels.fontName = "Raleway"
+        chart.categoryAxis.labels.boxAnchor = "ne"
+        chart.categoryAxis.labels.angle = 30
+        chart.categoryAxis.labels.dy = -2
+        chart.valueAxis.valueMin = 0
+        chart.valueAxis.labels.fontName = "Raleway"
+        chart.valueAxis.labelTextFormat = self._format_currency
+        drawing.add(chart, '')
+
+        legend = Legend()
+        legend.x, legend.y = 70, 225
+        legend.fontName = "Raleway"
+        legend.alignment = "right"
+        legend.columnMaximum = 1
+        legend.colorNamePairs = [(colors.green, "Income"), (colors.red, "Expense")]
+        drawing.add(legend, '')
+
+        return drawing
+
+    @Timing.timed("render")
+    def generate_range_pdf(
+            self,
+            user: UserViewModel,
+            ledger: LedgerModel,
+            summary: RangeSummary,
+            output: str | BinaryIO | None = None
+    ):
+        if output is None:
+            output = self.get_filepath(user)
+
+        document: SimpleDocTemplate = self._create_document(output)
+
+        self.set_currency(ledger.currency_name)
+        flowables = [
+            self._create_header(ledger, "FinTrack Report"),
+            self._create_sub_header(ledger),
+            self._create_report_info(user),
+            self._create_monthly_totals(summary),
+            self._create_trend_chart(summary),
+            PageBreak(),
+        ]
+        flowables.extend(self._create_statistics(summary))
+
+        with Timing.span("render.build"):
+            document.build(flowables)
+
+        if hasattr(output, "seek"):
+            REPORT_SIZE.observe(output.tell())
+            output.seek(0)
+        else:
+            REPORT_SIZE.observe(os.path.getsize(output))
+
+        return output
+
+    @Timing.timed("render")
+    def generate_pdf(
+            self,
+            user: UserViewModel,
+            ledger: LedgerModel,
+            entries: List[EntryModel],
+            output: str | BinaryIO | None = None,
+            statistics: List[CategoryTotalModel] | None = None
+    ):
+        if output is None:
+            output = self.get_filepath(user)
+
+        document: SimpleDocTemplate = self._create_document(output)
         flowables = []
 
         self.set_currency(ledger.currency_name)
         flowables.append(self._create_header(ledger))
         flowables.append(self._create_sub_header(ledger))
         flowables.append(self._create_report_info(user))
-        flowables.append(self._create_entry_table(entries))
+        # The entries are converted and aggregated once, and shared by both sections
+        with Timing.span("render.entry_batch", entries=len(entries)):
+            batch = EntryBatch.from_entries(entries, statistics)
+
+        if len(batch) > settings.REPORT_LARGE_LEDGER_ENTRIES:
+            flowables.extend(self._create_entry_pages(batch, self._remaining_height(flowables)))
+        else:
+            flowables.append(self._create_entry_table(batch))
         flowables.append(PageBreak())
-        flowables.append(self._create_statistics(entries))
+        flowables.extend(self._create_statistics(batch))
         
-        document.build(flowables)
+        # The layout of every flowable and the writing of the PDF
+        with Timing.span("render.build"):
+            document.build(flowables)
+
+        if hasattr(output, "seek"):
+            REPORT_SIZE.observe(output.tell())
+            output.seek(0)
+        else:
+            REPORT_SIZE.observe(os.path.getsize(output))
 
-        return filepath
+        return output
@@ -1,2 +1,3 @@
 # flake8: noqa F401
 from .fetcher import DataFetcher
+from .async_fetcher import AsyncDataFetcher
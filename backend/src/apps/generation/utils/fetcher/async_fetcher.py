@@ -0,0 +1,229 @@
+import asyncio
+from typing import List, Dict, Iterable, Tuple, AsyncIterator
+
+from postgrest.exceptions import APIError
+from supabase import AClient
+
+from ....common.supabase import get_async_client
+from ....common.utils.timing import Timing
+from ...schemas import UserViewModel, EntryModel, LedgerModel, CategoryTotalModel
+from .fetcher import DataFetcher
+from .decoding import USERS_ADAPTER, decode_category_totals
+
+
+class AsyncDataFetcher(DataFetcher):
+    """An asynchronous counterpart of `DataFetcher` that is built on the async
+    Supabase client. It must be created inside a running event loop, i.e. in an
+    async view served by an ASGI server.
+
+    Attributes
+    ----------
+    client: AClient
+        An asynchronous Supabase client that is initialized with admin privileges
+    """
+
+    def __init__(self, trusted: bool = None):
+        super().__init__(trusted)
+        self.client: AClient = get_async_client()
+
+    @Timing.timed("fetch.get_user")
+    async def get_user(self, uid: str) -> UserViewModel | str:
+        """See `DataFetcher.get_user`"""
+        user_response = await self.client.auth.admin.get_user_by_id(uid)
+        if not user_response.user:
+            return self.USER_NOT_FOUND_MESSAGE
+
+        settings_response = await self._settings_query(uid).execute()
+
+        if not settings_response.data:
+            return self.USER_DATA_NOT_FOUND_MESSAGE
+
+        return self._parse_user(user_response.user, settings_response.data)
+
+
+    async def iter_allow_report_users(self, page_size: int = None, columns: Iterable[str] = None) -> AsyncIterator[UserViewModel]:
+        """See `DataFetcher.iter_allow_report_users`"""
+        page_size = page_size or self.USER_PAGE_SIZE
+        columns = self._user_columns(columns)
+
+        after = None
+        while True:
+            with Timing.span("fetch.allow_report_users_page"):
+                response = await self._allow_report_users_query(columns, after, page_size).execute()
+                users = USERS_ADAPTER.validate_python(response.data)
+
+            for user in users:
+                yield user
+
+            if len(response.data) < page_size:
+                return
+
+            after = response.data[-1]["id"]
+
+
+    async def get_allow_report_users(self) -> List[UserViewModel]:
+        """See `DataFetcher.get_allow_report_users`"""
+        return [user async for user in self.iter_allow_report_users()]
+
+
+    @Timing.timed("fetch.get_ledger")
+    async def get_ledger(self, uid: str, ledger_id: int) -> LedgerModel | str:
+        """See `DataFetcher.get_ledger`"""
+        response = await self._ledger_query(uid, ledger_id).execute()
+        if not response.data:
+            return self.LEDGER_NOT_FOUND_MESSAGE
+
+        return self._parse_ledger(response.data[0])
+
+
+    @Timing.timed("fetch.get_period_data")
+    async def get_period_data(self, uid: str, ledger: LedgerModel, month: int, year: int, columns: Iterable[str] = None) -> List[EntryModel]:
+        """See `DataFetcher.get_period_data`"""
+        rows = await self._execute_paginated(lambda: self._period_query(uid, ledger, month, year, columns))
+
+        return self._parse_entries(rows)
+
+
+    async def iter_range_data(
+            self,
+            uid: str,
+            ledger: LedgerModel,
+            start: Tuple[int, int],
+            end: Tuple[int, int],
+            page_size: int = None
+    ) -> AsyncIterator[List[EntryModel]]:
+        """See `DataFetcher.iter_range_data`"""
+        page_size = page_size or self.BULK_PAGE_SIZE
+
+        after = None
+        while True:
+            with Timing.span("fetch.range_page"):
+                response = await self._range_query(uid, ledger, start, end, after, page_size).execute()
+                entries = self._parse_entries(response.data)
+
+            if entries:
+                yield entries
+
+            if len(response.data) < page_size:
+                return
+
+            after = response.data[-1]["id"]
+
+
+    @Timing.timed("fetch.get_period_fingerprint")
+    async def get_period_fingerprint(self, uid: str, ledger: LedgerModel, month: int, year: int) -> Tuple[int, int | None]:
+        """See `DataFetcher.get_period_fingerprint`"""
+        response = await self._period_fingerprint_query(uid, ledger, month, year).execute()
+
+        return response.count or 0, response.data[0]["id"] if response.data else None
+
+
+    @Timing.timed("fetch.get_period_statistics")
+    async def get_period_statistics(self, uid: str, ledger: LedgerModel, month: int, year: int) -> List[CategoryTotalModel] | None:
+        """See `DataFetcher.get_period_statistics`"""
+        try:
+            response = await self._category_totals_query(uid, ledger, month, year).execute()
+        except APIError as e:
+            if self._is_aggregates_disabled(e):
+                return None
+            raise
+
+        return decode_category_totals(response.data)
+
+
+    async def _execute_paginated(self, query_factory) -> List[dict]:
+        rows = []
+        offset = 0
+
+        while True:
+            response = await query_factory() \
+                .range(offset, offset + self.BULK_PAGE_SIZE - 1) \
+                .execute()
+
+            rows.extend(response.data)
+            if len(response.data) < self.BULK_PAGE_SIZE:
+                return rows
+
+            offset += self.BULK_PAGE_SIZE
+
+
+    @Timing.timed("fetch.get_ledgers_bulk")
+    async def get_ledgers_bulk(self, targets: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], LedgerModel]:
+        """See `DataFetcher.get_ledgers_bulk`"""
+        requesters: Dict[int, set] = {}
+        for uid, ledger_id in targets:
+            requesters.setdefault(ledger_id, set()).add(uid)
+
+        # The chunks are independent, so they are fetched concurrently
+        results = await asyncio.gather(*(
+            self._execute_paginated(lambda chunk=chunk: self._ledgers_bulk_query(chunk))
+            for chunk in self._chunks(list(requesters), self.BULK_CHUNK_SIZE)
+        ))
+
+        ledgers = {}
+        for rows in results:
+            self._group_ledgers(requesters, rows, ledgers)
+
+        return ledgers
+
+
+    @Timing.timed("fetch.get_period_data_bulk")
+    async def get_period_data_bulk(
+            self,
+            targets: Iterable[Tuple[str, LedgerModel]],
+            month: int,
+            year: int,
+            columns: Iterable[str] = None
+    ) -> Dict[Tuple[str, int], List[EntryModel]]:
+        """See `DataFetcher.get_period_data_bulk`"""
+        owners = self._group_owners(targets)
+        entries = {(uid, ledger_id): [] for ledger_id, uids in owners.items() for uid in uids}
+
+        results = await asyncio.gather(*(
+            self._execute_paginated(lambda chunk=chunk: self._period_bulk_query(
+                chunk,
+                list(set().union(*(owners[ledger_id] for ledger_id in chunk))),
+                month,
+                year,
+                columns
+            ))
+            for chunk in self._chunks(list(owners), self.BULK_CHUNK_SIZE)
+        ))
+
+        for rows in results:
+            self._group_entries(owners, rows, entries)
+
+        return entries
+
+
+    @Timing.timed("fetch.get_period_statistics_bulk")
+    async def get_period_statistics_bulk(
+            self,
+            targets: Iterable[Tuple[str, LedgerModel]],
+            month: int,
+            year: int
+    ) -> Dict[Tuple[str, int], List[CategoryTotalModel]] | None:
+        """See `DataFetcher.get_period_statistics_bulk`"""
+        owners = self._group_owners(targets)
+        totals = {(uid, ledger_id): [] for ledger_id, uids in owners.items() for uid in uids}
+
+        gathered = asyncio.gather(*(
+            self._execute_paginated(lambda chunk=chunk: self._category_totals_bulk_query(
+                chunk,
+                list(set().union(*(owners[ledger_id] for ledger_id in chunk))),
+                month,
+                year
+            ))
+            for chunk in self._chunks(list(owners), self.BULK_CHUNK_SIZE)
+        ))
+        try:
+            results = await gathered
+        except APIError as e:
+            if self._is_aggregates_disabled(e):
+                return None
+            raise
+
+        for rows in results:
+            self._group_category_totals(owners, rows, totals)
+
+        return totals
@@ -0,0 +1,60 @@
+from operator import itemgetter
+from typing import List
+
+from pydantic import TypeAdapter
+
+from ...schemas import UserViewModel, LedgerModel, EntryModel, EntryRecord, CategoryTotalModel, ENTRY_RECORD_FIELDS
+
+# Building a TypeAdapter compiles a validator, so the adapters are built once per process
+USER_ADAPTER = TypeAdapter(UserViewModel)
+USERS_ADAPTER = TypeAdapter(List[UserViewModel])
+LEDGER_ADAPTER = TypeAdapter(LedgerModel)
+ENTRIES_ADAPTER = TypeAdapter(List[EntryModel])
+CATEGORY_TOTALS_ADAPTER = TypeAdapter(List[CategoryTotalModel])
+
+_entry_values = itemgetter(*ENTRY_RECORD_FIELDS)
+_entry_fields = frozenset(ENTRY_RECORD_FIELDS)
+
+
+def decode_entries(rows: List[dict], trusted: bool = False) -> List[EntryModel] | List[EntryRecord]:
+    """Decode the entry rows of a PostgREST response
+
+    Params
+    ------
+    rows: List[dict]
+        The rows of the `entry` table. A column-projected query may leave out `note`, which is then None.
+    trusted: bool
+        If True, the rows are assumed to match the schema of the `entry` table and
+        are turned into `EntryRecord`s without validation. Otherwise, they are
+        validated into `EntryModel`s.
+
+    Returns
+    -------
+    List[EntryModel] | List[EntryRecord]
+        The decoded entries, in the same order as the rows
+    """
+    if not trusted:
+        return ENTRIES_ADAPTER.validate_python(rows)
+
+    if rows and not _entry_fields.issubset(rows[0]):
+        # The rows of a column-projected query
+        return [EntryRecord(*map(row.get, ENTRY_RECORD_FIELDS)) for row in rows]
+
+    return [EntryRecord(*values) for values in map(_entry_values, rows)]
+
+
+def decode_category_totals(rows: List[dict]) -> List[CategoryTotalModel]:
+    """Decode the rows of a per-category aggregate query
+
+    Params
+    ------
+    rows: List[dict]
+        The grouped rows, with the fields of `CategoryTotalModel`
+
+    Returns
+    -------
+    List[CategoryTotalModel]
+        The validated totals. There is at most one row per ledger, owner, category and sign,
+        so they are few enough to always be validated.
+    """
+    return CATEGORY_TOTALS_ADAPTER.validate_python(rows)
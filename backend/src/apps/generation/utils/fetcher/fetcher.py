@@ -1,12 +1,15 @@
 import datetime
 import calendar
-from typing import List
-from pydantic import TypeAdapter
-
+from typing import List, Dict, Iterable, Iterator, Tuple
+from django.conf import settings
+from postgrest.exceptions import APIError
 from supabase import Client
 
-from ....common.supabase import client
-from ...models import UserViewModel, EntryModel, LedgerModel
+from ....common.supabase import get_client
+from ....common.utils.logging import CommonLogger
+from ....common.utils.timing import Timing
+from ...schemas import UserViewModel, EntryModel, LedgerModel, CategoryTotalModel
+from .decoding import USER_ADAPTER, USERS_ADAPTER, LEDGER_ADAPTER, decode_entries, decode_category_totals
 
 
 class DataFetcher:
@@ -18,11 +21,237 @@ class DataFetcher:
     ----------
     client: Client
         A Supabase client object that is initialized with admin privileges
+    trusted: bool
+        If True, the entries are decoded into `EntryRecord`s without validation,
+        see `decode_entries`. Defaults to `FETCHER_TRUSTED_DECODING`.
     """
 
-    def __init__(self):
-        self.client: Client = client
+    # Maximum number of ids sent in a single `in` filter
+    BULK_CHUNK_SIZE = 100
+    # Maximum number of rows requested per page, kept under PostgREST's max-rows limit
+    BULK_PAGE_SIZE = 1000
+    # Number of users requested per keyset page, and the columns selected by default
+    USER_PAGE_SIZE = 1000
+    USER_COLUMNS = tuple(UserViewModel.model_fields)
+    # The entry columns rendered by the report's entry table, for a column-projected fetch
+    ENTRY_TABLE_COLUMNS = ("id", "ledger", "created_by", "date", "category", "amount", "is_positive")
+    # Groups the entries by category and sign in Postgres. It requires PostgREST's aggregate functions to be enabled.
+    CATEGORY_TOTALS_SELECT = "ledger, created_by, category, is_positive, total:amount.sum()"
+    # The PostgREST error of an aggregate select when `db-aggregates-enabled` is off
+    AGGREGATES_DISABLED_CODE = "PGRST123"
+
+    AGGREGATES_DISABLED_MESSAGE = "PostgREST's aggregate functions are disabled, the report statistics are summed from the entries instead. " \
+                                  "Enable db-aggregates-enabled or set REPORT_SERVER_AGGREGATION to false."
+
+    logger = CommonLogger
+
+    USER_NOT_FOUND_MESSAGE = "Unable to find the user with the given user id"
+    USER_DATA_NOT_FOUND_MESSAGE = "Unable to retrieve the user's data"
+    LEDGER_NOT_FOUND_MESSAGE = "Unable to retrieve the ledger. Please check that you have a valid ledger id and user id."
+
+    def __init__(self, trusted: bool = None):
+        self.client: Client = get_client()
+        self.trusted = settings.FETCHER_TRUSTED_DECODING if trusted is None else trusted
+
+    # Query builders and parsers, shared with the asynchronous fetcher
+    def _period_bounds(self, month: int, year: int) -> Tuple[str, str]:
+        last_day = calendar.monthrange(year, month)[1]
+
+        start = datetime.datetime(year, month, 1)
+        end = datetime.datetime(year, month, last_day)
+
+        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+    def _range_bounds(self, start: Tuple[int, int], end: Tuple[int, int]) -> Tuple[str, str]:
+        return self._period_bounds(*start)[0], self._period_bounds(*end)[1]
+
+    def _chunks(self, values: List, size: int):
+        for i in range(0, len(values), size):
+            yield values[i:i + size]
+
+    def _settings_query(self, uid: str):
+        return self.client \
+            .table("settings") \
+            .select("allow_report, current_ledger") \
+            .eq("user_id", uid) \
+            .single()
+
+    def _parse_user(self, user, settings_data: dict) -> UserViewModel:
+        return USER_ADAPTER.validate_python({
+            'id': user.id,
+            'current_ledger': settings_data['current_ledger'],
+            'allow_report': settings_data['allow_report'],
+            'username': user.user_metadata.get("username"),
+            'email': user.email
+        })
+
+    def _allow_report_users_query(self, columns: Iterable[str], after: str | None, page_size: int):
+        # Keyset pagination: each page starts after the last id of the previous page,
+        # so every page is an index range scan and rows cannot be skipped or repeated
+        query = self.client \
+            .table("user_view") \
+            .select(",".join(columns)) \
+            .eq("allow_report", True)
+
+        if after is not None:
+            query = query.gt("id", after)
+
+        return query.order("id").limit(page_size)
+
+    def _user_columns(self, columns: Iterable[str] | None) -> List[str]:
+        columns = list(columns or self.USER_COLUMNS)
+        if "id" not in columns:
+            columns.insert(0, "id")
+
+        return columns
+
+    def _ledger_query(self, uid: str, ledger_id: int):
+        return (self.client
+                .table("ledger")
+                .select("*, currency (currency_name)")
+                .eq("id", ledger_id)
+                .eq("created_by", uid))
+
+    def _ledgers_bulk_query(self, ledger_ids: List[int]):
+        return (self.client
+                .table("ledger")
+                .select("*, currency (currency_name)")
+                .in_("id", ledger_ids)
+                .order("id"))
+
+    def _parse_ledger(self, row: dict) -> LedgerModel:
+        return LEDGER_ADAPTER.validate_python({
+            "currency_name": row["currency"]["currency_name"],
+            "id": row['id'],
+            "name": row["name"]
+        })
+
+    def _entry_select(self, columns: Iterable[str] | None) -> str:
+        if columns is None:
+            return "*"
+
+        # The entries of a bulk fetch are matched to their owner by these columns
+        columns = list(columns)
+        columns.extend(column for column in ("ledger", "created_by") if column not in columns)
+
+        return ",".join(columns)
+
+    def _period_query(self, uid: str, ledger: LedgerModel, month: int, year: int, columns: Iterable[str] = None):
+        start, end = self._period_bounds(month, year)
+
+        return (self.client
+                .table("entry")
+                .select(self._entry_select(columns))
+                .eq("created_by", uid)
+                .eq("ledger", ledger.id)
+                .lte("date", end)
+                .gte("date", start)
+                .order("id"))
+
+    def _range_query(self, uid: str, ledger: LedgerModel, start: Tuple[int, int], end: Tuple[int, int], after: int | None, page_size: int):
+        first, last = self._range_bounds(start, end)
+
+        query = (self.client
+                 .table("entry")
+                 .select(self._entry_select(self.ENTRY_TABLE_COLUMNS))
+                 .eq("created_by", uid)
+                 .eq("ledger", ledger.id)
+                 .lte("date", last)
+                 .gte("date", first))
+
+        # Keyset pagination, like `_allow_report_users_query`
+        if after is not None:
+            query = query.gt("id", after)
+
+        return query.order("id").limit(page_size)
+
+    def _period_bulk_query(self, ledger_ids: List[int], uids: List[str], month: int, year: int, columns: Iterable[str] = None):
+        start, end = self._period_bounds(month, year)
+
+        return (self.client
+                .table("entry")
+                .select(self._entry_select(columns))
+                .in_("ledger", ledger_ids)
+                .in_("created_by", uids)
+                .lte("date", end)
+                .gte("date", start)
+                .order("id"))
+
+    def _period_fingerprint_query(self, uid: str, ledger: LedgerModel, month: int, year: int):
+        start, end = self._period_bounds(month, year)
+
+        # The exact count is sent in the Content-Range header, and the single row is the latest entry
+        return (self.client
+                .table("entry")
+                .select("id", count="exact")
+                .eq("created_by", uid)
+                .eq("ledger", ledger.id)
+                .lte("date", end)
+                .gte("date", start)
+                .order("id", desc=True)
+                .limit(1))
+
+    def _category_totals_query(self, uid: str, ledger: LedgerModel, month: int, year: int):
+        start, end = self._period_bounds(month, year)
+
+        return (self.client
+                .table("entry")
+                .select(self.CATEGORY_TOTALS_SELECT)
+                .eq("created_by", uid)
+                .eq("ledger", ledger.id)
+                .lte("date", end)
+                .gte("date", start))
 
+    def _category_totals_bulk_query(self, ledger_ids: List[int], uids: List[str], month: int, year: int):
+        start, end = self._period_bounds(month, year)
+
+        return (self.client
+                .table("entry")
+                .select(self.CATEGORY_TOTALS_SELECT)
+                .in_("ledger", ledger_ids)
+                .in_("created_by", uids)
+                .lte("date", end)
+                .gte("date", start)
+                .order("ledger")
+                .order("category")
+                .order("is_positive"))
+
+    def _is_aggregates_disabled(self, error: APIError) -> bool:
+        if error.code != self.AGGREGATES_DISABLED_CODE:
+            return False
+
+        self.logger.w(self.AGGREGATES_DISABLED_MESSAGE)
+        return True
+
+    def _parse_entries(self, rows: List[dict]) -> List[EntryModel]:
+        return decode_entries(rows, self.trusted)
+
+    def _group_owners(self, targets: Iterable[Tuple[str, LedgerModel]]) -> Dict[int, set]:
+        # Several users can have entries in the same ledger, so each ledger keeps the set of its requesters
+        owners: Dict[int, set] = {}
+        for uid, ledger in targets:
+            owners.setdefault(ledger.id, set()).add(uid)
+
+        return owners
+
+    def _group_ledgers(self, requesters: Dict[int, set], rows: List[dict], ledgers: Dict[Tuple[str, int], LedgerModel]):
+        for row in rows:
+            if row["created_by"] not in requesters[row["id"]]:
+                continue
+
+            ledgers[(row["created_by"], row["id"])] = self._parse_ledger(row)
+
+    def _group_entries(self, owners: Dict[int, set], rows: List[dict], entries: Dict[Tuple[str, int], List[EntryModel]]):
+        for entry in self._parse_entries(rows):
+            if entry.created_by in owners[entry.ledger]:
+                entries[(entry.created_by, entry.ledger)].append(entry)
+
+    def _group_category_totals(self, owners: Dict[int, set], rows: List[dict], totals: Dict[Tuple[str, int], List[CategoryTotalModel]]):
+        for total in decode_category_totals(rows):
+            if total.created_by in owners[total.ledger]:
+                totals[(total.created_by, total.ledger)].append(total)
+
+    @Timing.timed("fetch.get_user")
     def get_user(self, uid: str) -> UserViewModel | str:
         """Retrieve user information based on the given id
 
@@ -39,26 +268,49 @@ class DataFetcher:
         """
         user_response = self.client.auth.admin.get_user_by_id(uid)
         if not user_response.user:
-            return "Unable to find the user with the given user id"
+            return self.USER_NOT_FOUND_MESSAGE
+
+        settings_response = self._settings_query(uid).execute()
 
-        settings_response = self.client \
-            .table("settings") \
-            .select("allow_report, current_ledger") \
-            .eq("user_id", uid) \
-            .single() \
-            .execute()
-        
         if not settings_response.data:
-            return "Unable to retrieve the user's data"
-    
-        adapter = TypeAdapter(UserViewModel)
-        return adapter.validate_python({
-            'id': user_response.user.id,
-            'current_ledger': settings_response.data['current_ledger'],
-            'allow_report': settings_response.data['allow_report'],
-            'username': user_response.user.user_metadata.get("username"),
-            'email': user_response.user.email
-        })
+            return self.USER_DATA_NOT_FOUND_MESSAGE
+
+        return self._parse_user(user_response.user, settings_response.data)
+
+
+    def iter_allow_report_users(self, page_size: int = None, columns: Iterable[str] = None) -> Iterator[UserViewModel]:
+        """Iterate over the users who allow reports, one keyset page at a time.
+        Only a single page is held in memory.
+
+        Params
+        ------
+        page_size: int
+            The number of users requested per page, defaults to `USER_PAGE_SIZE`.
+            It should not exceed PostgREST's max-rows limit.
+        columns: Iterable[str]
+            The columns of `user_view` to select, defaults to the fields of `UserViewModel`.
+            They must include every field of `UserViewModel`. The `id` column is always selected.
+
+        Returns
+        -------
+        Iterator[UserViewModel]
+            The users that allow reports, ordered by id
+        """
+        page_size = page_size or self.USER_PAGE_SIZE
+        columns = self._user_columns(columns)
+
+        after = None
+        while True:
+            with Timing.span("fetch.allow_report_users_page"):
+                response = self._allow_report_users_query(columns, after, page_size).execute()
+                users = USERS_ADAPTER.validate_python(response.data)
+
+            yield from users
+
+            if len(response.data) < page_size:
+                return
+
+            after = response.data[-1]["id"]
 
 
     def get_allow_report_users(self) -> List[UserViewModel]:
@@ -73,12 +325,10 @@ class DataFetcher:
         List[UserViewModel]
             A list of users that allow reports
         """
-        response = self.client.table("user_view").select("*").eq("allow_report", True).execute()
-
-        adapter = TypeAdapter(List[UserViewModel])
-        return adapter.validate_python(response.data)
+        return list(self.iter_allow_report_users())
 
 
+    @Timing.timed("fetch.get_ledger")
     def get_ledger(self, uid: str, ledger_id: int) -> LedgerModel | str:
         """Get a ledger from an id
 
@@ -95,25 +345,15 @@ class DataFetcher:
             If the uid matches the ledger's creator, returns the ledger
             else it returns None
         """
-        query = (self.client
-                 .table("ledger")
-                 .select("*, currency (currency_name)")
-                 .eq("id", ledger_id)
-                 .eq("created_by", uid))
-
-        response = query.execute()
+        response = self._ledger_query(uid, ledger_id).execute()
         if not response.data:
-            return "Unable to retrieve the ledger. Please check that you have a valid ledger id and user id."
+            return self.LEDGER_NOT_FOUND_MESSAGE
 
-        adapter = TypeAdapter(LedgerModel)
-        return adapter.validate_python({
-            "currency_name": response.data[0]["currency"]["currency_name"],
-            "id": response.data[0]['id'],
-            "name": response.data[0]["name"]
-        })
+        return self._parse_ledger(response.data[0])
 
 
-    def get_period_data(self, uid: str, ledger: LedgerModel, month: int, year: int) -> List[EntryModel]:
+    @Timing.timed("fetch.get_period_data")
+    def get_period_data(self, uid: str, ledger: LedgerModel, month: int, year: int, columns: Iterable[str] = None) -> List[EntryModel]:
         """Get a user's entry data in the given month/year period
 
         Params
@@ -126,26 +366,249 @@ class DataFetcher:
             An integer value in the range [1,12]
         year: int
             An integer value
-        
+        columns: Iterable[str]
+            The columns of `entry` to select, defaults to every column.
+            `ENTRY_TABLE_COLUMNS` selects only what the report renders.
+
         Returns
         -------
         List[EntryModel]
             A list of entry objects in the specified month/year period
         """
-        last_day = calendar.monthrange(year, month)[1]
+        # Paginated, as a large ledger can have more entries in a month than PostgREST's max-rows limit
+        rows = self._execute_paginated(lambda: self._period_query(uid, ledger, month, year, columns))
 
-        start = datetime.datetime(year, month, 1)
-        end = datetime.datetime(year, month, last_day)
+        return self._parse_entries(rows)
 
-        query = (self.client
-                 .table("entry")
-                 .select("*")
-                 .eq("created_by", uid)
-                 .eq("ledger", ledger.id)
-                 .lte("date", end.strftime("%Y-%m-%d"))
-                 .gte("date", start.strftime("%Y-%m-%d")))
-        
-        response = query.execute()
 
-        adapter = TypeAdapter(List[EntryModel])
-        return adapter.validate_python(response.data)
+    def iter_range_data(
+            self,
+            uid: str,
+            ledger: LedgerModel,
+            start: Tuple[int, int],
+            end: Tuple[int, int],
+            page_size: int = None
+    ) -> Iterator[List[EntryModel]]:
+        """Iterate over a user's entries in a range of months with a single ranged query,
+        one keyset page at a time. Only the columns of `ENTRY_TABLE_COLUMNS` are selected,
+        and only a single page is held in memory.
+
+        Params
+        ------
+        uid: str
+            The user's id
+        ledger: LedgerModel
+            The ledger from which to search for the data
+        start: Tuple[int, int]
+            The (month, year) of the first month of the range
+        end: Tuple[int, int]
+            The (month, year) of the last month of the range, included
+        page_size: int
+            The number of entries requested per page, defaults to `BULK_PAGE_SIZE`
+
+        Returns
+        -------
+        Iterator[List[EntryModel]]
+            The pages of entries, ordered by id
+        """
+        page_size = page_size or self.BULK_PAGE_SIZE
+
+        after = None
+        while True:
+            with Timing.span("fetch.range_page"):
+                response = self._range_query(uid, ledger, start, end, after, page_size).execute()
+                entries = self._parse_entries(response.data)
+
+            if entries:
+                yield entries
+
+            if len(response.data) < page_size:
+                return
+
+            after = response.data[-1]["id"]
+
+
+    @Timing.timed("fetch.get_period_fingerprint")
+    def get_period_fingerprint(self, uid: str, ledger: LedgerModel, month: int, year: int) -> Tuple[int, int | None]:
+        """Get the number of a user's entries in the given month/year period and the largest
+        of their ids, in a single request that transfers at most one row
+
+        Params
+        ------
+        uid: str
+            The user's id
+        ledger: LedgerModel
+            The ledger from which to search for the data
+        month: int
+            An integer value in the range [1,12]
+        year: int
+            An integer value
+
+        Returns
+        -------
+        Tuple[int, int | None]
+            The number of entries, and the largest entry id or None if there are no entries
+        """
+        response = self._period_fingerprint_query(uid, ledger, month, year).execute()
+
+        return response.count or 0, response.data[0]["id"] if response.data else None
+
+
+    @Timing.timed("fetch.get_period_statistics")
+    def get_period_statistics(self, uid: str, ledger: LedgerModel, month: int, year: int) -> List[CategoryTotalModel] | None:
+        """Get the sum of a user's entries in the given month/year period for each category and sign.
+        The entries are grouped by Postgres, so only the totals are transferred.
+        If PostgREST's aggregate functions are disabled, None is returned, and the
+        document engine sums the entries itself.
+
+        Params
+        ------
+        uid: str
+            The user's id
+        ledger: LedgerModel
+            The ledger from which to aggregate the data
+        month: int
+            An integer value in the range [1,12]
+        year: int
+            An integer value
+
+        Returns
+        -------
+        List[CategoryTotalModel] | None
+            The total of each category and sign that has entries in the period,
+            or None if the aggregate functions are disabled
+        """
+        try:
+            response = self._category_totals_query(uid, ledger, month, year).execute()
+        except APIError as e:
+            if self._is_aggregates_disabled(e):
+                return None
+            raise
+
+        return decode_category_totals(response.data)
+
+
+    def _execute_paginated(self, query_factory) -> List[dict]:
+        rows = []
+        offset = 0
+
+        while True:
+            response = query_factory() \
+                .range(offset, offset + self.BULK_PAGE_SIZE - 1) \
+                .execute()
+
+            rows.extend(response.data)
+            if len(response.data) < self.BULK_PAGE_SIZE:
+                return rows
+
+            offset += self.BULK_PAGE_SIZE
+
+
+    @Timing.timed("fetch.get_ledgers_bulk")
+    def get_ledgers_bulk(self, targets: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], LedgerModel]:
+        """Get multiple ledgers in a few chunked queries
+
+        Params
+        ------
+        targets: Iterable[Tuple[str, int]]
+            Pairs of (user id, ledger id). A ledger is only returned if
+            the user is the ledger's creator
+
+        Returns
+        -------
+        Dict[Tuple[str, int], LedgerModel]
+            The ledgers that were found, keyed by their (user id, ledger id) pair.
+            Ledgers that could not be found are left out.
+        """
+        requesters: Dict[int, set] = {}
+        for uid, ledger_id in targets:
+            requesters.setdefault(ledger_id, set()).add(uid)
+
+        ledgers = {}
+        for chunk in self._chunks(list(requesters), self.BULK_CHUNK_SIZE):
+            rows = self._execute_paginated(lambda: self._ledgers_bulk_query(chunk))
+            self._group_ledgers(requesters, rows, ledgers)
+
+        return ledgers
+
+
+    @Timing.timed("fetch.get_period_data_bulk")
+    def get_period_data_bulk(
+            self,
+            targets: Iterable[Tuple[str, LedgerModel]],
+            month: int,
+            year: int,
+            columns: Iterable[str] = None
+    ) -> Dict[Tuple[str, int], List[EntryModel]]:
+        """Get the entry data of multiple users' ledgers in the given month/year period
+        in a few chunked queries
+
+        Params
+        ------
+        targets: Iterable[Tuple[str, LedgerModel]]
+            Pairs of (user id, ledger) to fetch the entries of
+        month: int
+            An integer value in the range [1,12]
+        year: int
+            An integer value
+        columns: Iterable[str]
+            The columns of `entry` to select, defaults to every column.
+            `ENTRY_TABLE_COLUMNS` selects only what the report renders.
+
+        Returns
+        -------
+        Dict[Tuple[str, int], List[EntryModel]]
+            The user's entries of each ledger in the specified month/year period, keyed by the
+            (user id, ledger id) pair. Every requested pair is present, pairs without entries map to an empty list.
+        """
+        owners = self._group_owners(targets)
+        entries = {(uid, ledger_id): [] for ledger_id, uids in owners.items() for uid in uids}
+
+        for chunk in self._chunks(list(owners), self.BULK_CHUNK_SIZE):
+            uids = list(set().union(*(owners[ledger_id] for ledger_id in chunk)))
+            rows = self._execute_paginated(lambda: self._period_bulk_query(chunk, uids, month, year, columns))
+            self._group_entries(owners, rows, entries)
+
+        return entries
+
+
+    @Timing.timed("fetch.get_period_statistics_bulk")
+    def get_period_statistics_bulk(
+            self,
+            targets: Iterable[Tuple[str, LedgerModel]],
+            month: int,
+            year: int
+    ) -> Dict[Tuple[str, int], List[CategoryTotalModel]] | None:
+        """Get the category totals of multiple users' ledgers in the given month/year period
+        in a few chunked aggregate queries. See `get_period_statistics`.
+
+        Params
+        ------
+        targets: Iterable[Tuple[str, LedgerModel]]
+            Pairs of (user id, ledger) to aggregate the entries of
+        month: int
+            An integer value in the range [1,12]
+        year: int
+            An integer value
+
+        Returns
+        -------
+        Dict[Tuple[str, int], List[CategoryTotalModel]] | None
+            The user's totals of each ledger, keyed by the (user id, ledger id) pair.
+            Every requested pair is present, pairs without entries map to an empty list.
+            None if the aggregate functions are disabled.
+        """
+        owners = self._group_owners(targets)
+        totals = {(uid, ledger_id): [] for ledger_id, uids in owners.items() for uid in uids}
+
+        for chunk in self._chunks(list(owners), self.BULK_CHUNK_SIZE):
+            uids = list(set().union(*(owners[ledger_id] for ledger_id in chunk)))
+            try:
+                rows = self._execute_paginated(lambda: self._category_totals_bulk_query(chunk, uids, month, year))
+            except APIError as e:
+                if self._is_aggregates_disabled(e):
+                    return None
+                raise
+            self._group_category_totals(owners, rows, totals)
+
+        return totals
@@ -0,0 +1,309 @@
+import os
+import time
+import socket
+import threading
+from datetime import date, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ...models import ReportJob, ReportJobItem
+from ...schemas import DeliveryResultModel
+from ....common.utils.logging import CommonLogger
+from ....metrics.metrics import REPORT_JOBS, REPORT_JOB_DURATION
+
+
+class ReportJobWorker:
+    """Runs the queued `ReportJob`s of the automated monthly report.
+
+    A job is claimed atomically in the database, and the worker renews its heartbeat
+    while the job runs. Every user whose report was sent or has failed is checkpointed
+    as a `ReportJobItem`, so a job whose worker died (its heartbeat is older than
+    `REPORT_JOB_LEASE_TIMEOUT`) is resumed by the next worker without processing
+    the finished users again. A worker that lost its job to another worker stops reading
+    users, and leaves the job to its new owner. A new job of a period that already had jobs, e.g. after
+    one has failed, skips the users whose report was sent by any of them, so a period
+    is never emailed twice to the same user.
+
+    Attributes
+    ----------
+    job_steps: AutomatedMonthlyReportMixin
+        Provides the fetcher and the steps of the automated monthly report
+    name: str
+        The identifier of the worker, stored on the jobs it claims
+    """
+
+    logger = CommonLogger
+
+    _thread: threading.Thread = None
+    _thread_lock = threading.Lock()
+
+    def __init__(self, job_steps):
+        self.job_steps = job_steps
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.lease_timeout = settings.REPORT_JOB_LEASE_TIMEOUT
+        self.heartbeat_interval = settings.REPORT_JOB_HEARTBEAT_INTERVAL
+        self.max_attempts = settings.REPORT_JOB_MAX_ATTEMPTS
+
+        self._checkpoint_lock = threading.Lock()
+        self._lease_lost = threading.Event()
+        self._user_count = 0
+
+    @staticmethod
+    def enqueue(month: int, year: int) -> tuple[ReportJob, bool]:
+        """Queue a job for a period, unless one is already queued or running
+
+        Params
+        ------
+        month: int
+            The month of the reports
+        year: int
+            The year of the reports
+
+        Returns
+        -------
+        tuple[ReportJob, bool]
+            The job of the period, and whether it was created
+        """
+        active = ReportJob.objects.filter(month=month, year=year, status__in=ReportJob.ACTIVE_STATUSES)
+
+        job = active.first()
+        if job is not None:
+            return job, False
+
+        try:
+            with transaction.atomic():
+                return ReportJob.objects.create(month=month, year=year), True
+        except IntegrityError:
+            # Another request queued the same period first
+            return active.get(), False
+
+    @classmethod
+    def ensure_started(cls, job_steps):
+        """Start a background worker thread in the current process, unless one is running.
+        The thread exits once there are no more jobs to run.
+
+        Params
+        ------
+        job_steps: AutomatedMonthlyReportMixin
+            Provides the fetcher and the steps of the automated monthly report
+
+        Returns
+        -------
+        None
+        """
+        with cls._thread_lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+
+            cls._thread = threading.Thread(
+                target=cls(job_steps)._run_in_background,
+                name="report-job-worker",
+                daemon=True
+            )
+            cls._thread.start()
+
+    def _claimable(self) -> Q:
+        stale = timezone.now() - timedelta(seconds=self.lease_timeout)
+        return Q(status=ReportJob.Status.PENDING) | Q(status=ReportJob.Status.RUNNING, heartbeat_at__lt=stale)
+
+    def claim(self) -> ReportJob | None:
+        """Claim the oldest queued job, or a running job whose worker stopped renewing its heartbeat
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        ReportJob | None
+            The claimed job, or None if there is no job to run
+        """
+        while True:
+            job = ReportJob.objects.filter(self._claimable()).order_by("created_at").first()
+            if job is None:
+                return None
+
+            now = timezone.now()
+            claimed = ReportJob.objects.filter(self._claimable(), pk=job.pk).update(
+                status=ReportJob.Status.RUNNING,
+                worker=self.name,
+                heartbeat_at=now,
+                started_at=Coalesce("started_at", Value(now)),
+                attempts=F("attempts") + 1
+            )
+
+            # Another worker claimed the job in the meantime
+            if claimed:
+                job.refresh_from_db()
+                return job
+
+    def _finish(self, job: ReportJob, status: str, error: str = None, started: float = None):
+        ReportJob.objects.filter(pk=job.pk, worker=self.name).update(
+            status=status,
+            error=error,
+            heartbeat_at=timezone.now(),
+            finished_at=timezone.now()
+        )
+
+        REPORT_JOBS.labels(status).inc()
+        if started is not None:
+            REPORT_JOB_DURATION.observe(time.perf_counter() - started)
+
+    def _lose_lease(self, job: ReportJob):
+        if not self._lease_lost.is_set():
+            self.logger.w(f"Report job {job.pk} was claimed by another worker, stopping.")
+            self._lease_lost.set()
+
+    def _heartbeat(self, job: ReportJob, stopped: threading.Event):
+        try:
+            while not stopped.wait(self.heartbeat_interval):
+                try:
+                    renewed = ReportJob.objects.filter(pk=job.pk, worker=self.name).update(
+                        heartbeat_at=timezone.now(),
+                        user_count=self._user_count
+                    )
+                except Exception as e:
+                    # e.g. the database is locked, the lease only expires after several missed beats
+                    self.logger.e(f"Failed to renew the heartbeat of report job {job.pk}. {e!r}")
+                    continue
+
+                if not renewed:
+                    self._lose_lease(job)
+                    return
+        finally:
+            connection.close()
+
+    def _checkpoint(self, job: ReportJob, result: DeliveryResultModel):
+        try:
+            with self._checkpoint_lock, transaction.atomic():
+                # The item is kept even if the lease was lost, the report of the user was processed
+                ReportJobItem.objects.create(job_id=job.pk, **result.model_dump())
+                updated = ReportJob.objects.filter(pk=job.pk, worker=self.name).update(
+                    sent=F("sent") + int(result.sent),
+                    failed=F("failed") + int(not result.sent),
+                    heartbeat_at=timezone.now()
+                )
+        except Exception as e:
+            # A lost checkpoint only means the user is processed again if the job is resumed
+            self.logger.e(f"Failed to checkpoint the report of user: username={result.username}. {e!r}")
+            return
+
+        if not updated:
+            self._lose_lease(job)
+
+    def _iter_pending_users(self, users, finished_users: set):
+        # The users are streamed page by page, and counted as they are read
+        for user in users:
+            if self._lease_lost.is_set():
+                return
+
+            self._user_count += 1
+            if user.id not in finished_users:
+                yield user
+
+    def run_job(self, job: ReportJob):
+        """Run a claimed job, skipping the users that were checkpointed by a previous attempt
+
+        Params
+        ------
+        job: ReportJob
+            A job claimed by this worker
+
+        Returns
+        -------
+        None
+        """
+        if job.attempts > self.max_attempts:
+            self.logger.e(f"Report job {job.pk} was abandoned after {job.attempts - 1} attempts.")
+            self._finish(job, ReportJob.Status.FAILED, "The job was interrupted too many times.")
+            return
+
+        started = time.perf_counter()
+        steps = self.job_steps
+        period = date(job.year, job.month, 1)
+        # The users processed by this job, and the users already emailed by an earlier job of the period
+        finished_users = set(
+            ReportJobItem.objects
+            .filter(Q(job=job) | Q(job__month=job.month, job__year=job.year, sent=True))
+            .values_list("user_id", flat=True)
+        )
+        self._user_count = 0
+        self._lease_lost.clear()
+
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stopped), daemon=True)
+        heartbeat.start()
+
+        try:
+            if finished_users:
+                self.logger.i(f"Resuming report job {job.pk}, {len(finished_users)} users of the period were already processed.")
+
+            fetcher = steps.fetcher()
+            steps._run_pipeline(
+                period,
+                self._iter_pending_users(fetcher.iter_allow_report_users(), finished_users),
+                partial(steps._fetch_report_data, fetcher, period),
+                on_result=partial(self._checkpoint, job)
+            )
+
+            if self._lease_lost.is_set():
+                return
+
+            ReportJob.objects.filter(pk=job.pk, worker=self.name).update(user_count=self._user_count)
+            self._finish(job, ReportJob.Status.COMPLETED, started=started)
+            self.logger.i(f"Report job {job.pk} completed.")
+        except Exception as e:
+            self.logger.e(f"Report job {job.pk} failed. {e!r}")
+            if self._lease_lost.is_set():
+                return
+
+            self._finish(job, ReportJob.Status.FAILED, repr(e), started)
+        finally:
+            stopped.set()
+            heartbeat.join()
+
+    def run_pending(self) -> int:
+        """Run the claimable jobs until there are none left
+
+        Params
+        ------
+        None
+
+        Returns
+        -------
+        int
+            The number of jobs that were run
+        """
+        count = 0
+        while (job := self.claim()) is not None:
+            self.run_job(job)
+            count += 1
+
+        return count
+
+    def _run_in_background(self):
+        cls = type(self)
+
+        try:
+            while True:
+                job = self.claim()
+
+                if job is None:
+                    # Check again under the lock, so a job queued while this thread
+                    # is exiting is not left waiting for the next worker
+                    with cls._thread_lock:
+                        job = self.claim()
+                        if job is None:
+                            cls._thread = None
+                            return
+
+                self.run_job(job)
+        except Exception as e:
+            self.logger.e(f"The report job worker stopped. {e!r}")
+        finally:
+            connection.close()
@@ -0,0 +1,2 @@
+# flake8: noqa F401
+from .report_pipeline import ReportPipeline
@@ -0,0 +1,190 @@
+import os
+import queue
+import threading
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from ..docgen.renderer import ThreadPoolRenderer
+from ..delivery.dispatcher import DeliveryDispatcher
+from ...schemas import UserViewModel, DeliveryResultModel
+from ....common.utils.logging import CommonLogger
+
+RENDER_FAILED_MESSAGE = "Failed to render the report."
+
+
+class ReportPipeline:
+    """Runs the automated monthly report job as three overlapping stages.
+
+    The users are fetched in batches on the calling thread, their reports are rendered
+    by the renderer on a background thread, and the rendered reports are emailed by
+    the dispatcher's workers. The stages are connected by bounded queues, so only
+    the reports in flight are held in memory, and the first emails go out while
+    the remaining users are still being fetched and rendered.
+
+    Attributes
+    ----------
+    renderer: ThreadPoolRenderer
+        Renders the report documents
+    dispatcher: DeliveryDispatcher
+        Sends the rendered reports
+    period: tuple[int, int]
+        The (month, year) period of the reports
+    batch_size: int
+        The number of users whose data is fetched together
+    queue_size: int
+        The maximum number of reports waiting between two stages
+    """
+
+    logger = CommonLogger
+
+    def __init__(
+            self,
+            renderer: ThreadPoolRenderer,
+            dispatcher: DeliveryDispatcher,
+            period: tuple[int, int],
+            batch_size: int = None,
+            queue_size: int = None
+    ):
+        self.renderer = renderer
+        self.dispatcher = dispatcher
+        self.period = period
+        self.batch_size = batch_size or settings.REPORT_PIPELINE_BATCH_SIZE
+        self.queue_size = queue_size or settings.REPORT_PIPELINE_QUEUE_SIZE
+
+        self._lock = threading.Lock()
+        self._results: List[DeliveryResultModel] = []
+        self._recipients = {}
+        self._render_closed = False
+        self._on_result: Optional[Callable[[DeliveryResultModel], None]] = None
+
+    def _batches(self, users: Iterable[UserViewModel]) -> Iterator[List[UserViewModel]]:
+        users = iter(users)
+        while batch := list(islice(users, self.batch_size)):
+            yield batch
+
+    def _add_result(self, user: UserViewModel, attempts: int, error: str | None):
+        result = DeliveryResultModel(
+            user_id=user.id,
+            username=user.username,
+            sent=error is None,
+            attempts=attempts,
+            error=error
+        )
+
+        with self._lock:
+            self._results.append(result)
+
+        if self._on_result is not None:
+            self._on_result(result)
+
+    def _on_delivered(self, key: int, attempts: int, error: Exception | None):
+        with self._lock:
+            user, filepath = self._recipients.pop(key)
+
+        # The report is attached to its email, so it is no longer needed once the email is sent or abandoned
+        self._remove(filepath)
+
+        if error is not None:
+            self.logger.e(f"Failed to send the report of user: username={user.username}, attempts={attempts}. {error!r}")
+
+        self._add_result(user, attempts, None if error is None else str(error) or type(error).__name__)
+
+    def _remove(self, filepath: str):
+        try:
+            os.remove(filepath)
+        except OSError as e:
+            self.logger.e(f"Failed to remove the report: filepath={filepath}. {e!r}")
+
+    def _iter_render_queue(self, render_queue: queue.Queue) -> Iterator[dict]:
+        while (d := render_queue.get()) is not None:
+            yield d
+
+        self._render_closed = True
+
+    def _render(self, render_queue: queue.Queue, delivery_queue: queue.Queue, workers: int, create_email: Callable[[dict], dict]):
+        try:
+            rendered = self.renderer.render_iter(self.period, self._iter_render_queue(render_queue))
+
+            for key, (d, filepath, error) in enumerate(rendered):
+                if error is not None:
+                    self._add_result(d['user'], 0, RENDER_FAILED_MESSAGE)
+                    continue
+
+                d['filepath'] = filepath
+                try:
+                    message = create_email(d)
+                except Exception:
+                    self._remove(filepath)
+                    raise
+
+                # Only the user and the document are kept once the report is rendered, the entries are released
+                with self._lock:
+                    self._recipients[key] = d['user'], filepath
+                delivery_queue.put((key, message))
+        except Exception as e:
+            self.logger.e(f"The render stage failed. {e!r}")
+
+            # Keep consuming the fetched data, so the fetch stage is never left blocked on the queue
+            if not self._render_closed:
+                for d in self._iter_render_queue(render_queue):
+                    self._add_result(d['user'], 0, RENDER_FAILED_MESSAGE)
+        finally:
+            for _ in range(workers):
+                delivery_queue.put(None)
+
+    def run(
+            self,
+            users: Iterable[UserViewModel],
+            fetch_batch: Callable[[List[UserViewModel]], List[dict]],
+            create_email: Callable[[dict], dict],
+            on_result: Callable[[DeliveryResultModel], None] = None
+    ) -> Tuple[int, List[DeliveryResultModel]]:
+        """Fetch, render and send the reports of the users
+
+        Params
+        ------
+        users: Iterable[UserViewModel]
+            The users who allowed automatic monthly reports
+        fetch_batch: Callable[[List[UserViewModel]], List[dict]]
+            Fetches the report data of a batch of users, with the keys `user`, `ledger` and `data`.
+            Users without data in the period are left out.
+        create_email: Callable[[dict], dict]
+            Creates the keyword arguments of `send_email` from the report data and its `filepath`
+        on_result: Callable[[DeliveryResultModel], None]
+            Called from the stage threads as soon as the report of a user is sent or has failed
+
+        Returns
+        -------
+        Tuple[int, List[DeliveryResultModel]]
+            The number of users, and the delivery result of each user with data in the period
+        """
+        self._on_result = on_result
+
+        render_queue = queue.Queue(maxsize=self.queue_size)
+        delivery_queue = queue.Queue(maxsize=self.queue_size)
+        workers = self.dispatcher.max_workers
+
+        delivery_threads = self.dispatcher.start(delivery_queue, self._on_delivered, workers)
+        render_thread = threading.Thread(
+            target=self._render,
+            args=(render_queue, delivery_queue, workers, create_email),
+            daemon=True
+        )
+        render_thread.start()
+
+        user_count = 0
+        try:
+            for batch in self._batches(users):
+                user_count += len(batch)
+                for d in fetch_batch(batch):
+                    render_queue.put(d)
+        finally:
+            # Let the stages finish the reports in flight, even if the fetch stage failed
+            render_queue.put(None)
+            render_thread.join()
+            for thread in delivery_threads:
+                thread.join()
+
+        return user_count, self._results
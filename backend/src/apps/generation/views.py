@@ -1,23 +1,54 @@
+import io
 import os
-import logging
+import re
+import time
 import shutil
+import asyncio
+from typing import BinaryIO
+from functools import partial
 from datetime import datetime
 from calendar import month_name
-from concurrent.futures import ThreadPoolExecutor
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views import View
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
 from django.http.response import FileResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
 
 from . import apps
 from ..common.supabase import SupabaseUser
 from ..common.authentication import SupabaseAuthentication, AdminAuthentication
 from ..common.utils.logging import CommonLogger
-from .serializers import ReportRequestSerializer
+from ..common.utils.request import get_header
+from .models import ReportJob
+from .schemas import UserViewModel, LedgerModel
+from .serializers import (
+    ReportRequestSerializer,
+    RangeReportRequestSerializer,
+    TimeSeriesRequestSerializer,
+    BatchReportRequestSerializer,
+    ReportJobSerializer
+)
 from .utils.fetcher.fetcher import DataFetcher
+from .utils.fetcher.async_fetcher import AsyncDataFetcher
 from .utils.docgen.reportlab import ReportlabEngine
+from .utils.docgen.renderer import RENDERERS
+from .utils.docgen.range_summary import RangeSummary
 from .utils.delivery.gmail import GmailDeliveryEngine
+from .utils.delivery.dispatcher import DeliveryDispatcher
+from .utils.pipeline import ReportPipeline
+from .utils.jobs import ReportJobWorker
+from .utils.cache.report_cache import ReportCache
+from .utils.aggregates import AggregateStore
+from .utils.archive import ZipStream
 
 
 class RequiresUserView(APIView):
@@ -27,6 +58,8 @@ class RequiresUserView(APIView):
     fetcher = DataFetcher
     document_engine = ReportlabEngine
     delivery_engine = GmailDeliveryEngine
+    report_cache = ReportCache
+    aggregate_store = AggregateStore
 
     logger = CommonLogger
 
@@ -36,12 +69,168 @@ class RequiresAdminView(RequiresUserView):
     authentication_classes = [AdminAuthentication]
 
 
-class GenerateReportView(RequiresUserView):
+class AsyncRequiresUserView(View):
+    """An asynchronous counterpart of `RequiresUserView` for ASGI servers.
+
+    The request is wrapped in a DRF `Request` so the same authentication classes
+    and `request.data` parsing can be used. Authentication is run in a worker thread
+    since the authentication classes are blocking.
+    """
+
+    authentication_classes = [SupabaseAuthentication]
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+
+    fetcher = AsyncDataFetcher
+    document_engine = ReportlabEngine
+    delivery_engine = GmailDeliveryEngine
+    report_cache = ReportCache
+    aggregate_store = AggregateStore
+
+    logger = CommonLogger
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Same as DRF's views, the endpoints are authenticated by header instead of by session
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def _initialize_request(self, request: Request):
+        # Accessing the attributes runs the authenticators and the parsers
+        request.user
+        request.data
+
+    def _handle_exception(self, exc: APIException) -> JsonResponse:
+        status_code = exc.status_code
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            # None of the authentication classes define a WWW-Authenticate header,
+            # so DRF responds with 403 in this case
+            status_code = status.HTTP_403_FORBIDDEN
+
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return JsonResponse(data, status=status_code, safe=False)
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=[auth() for auth in self.authentication_classes]
+        )
+
+        try:
+            await sync_to_async(self._initialize_request, thread_sensitive=False)(request)
+        except APIException as exc:
+            return self._handle_exception(exc)
+
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncRequiresAdminView(AsyncRequiresUserView):
+
+    authentication_classes = [AdminAuthentication]
+
+
+class GenerateReportMixin:
+    """Shared steps of `GenerateReportView` and `AsyncGenerateReportView`"""
+
+    def _render_report(
+            self,
+            user: UserViewModel,
+            ledger_data: LedgerModel,
+            entry_data: list,
+            data: ReportRequestSerializer.ReportRequest,
+            period: datetime,
+            statistics: list = None,
+            etag: str = None
+    ) -> tuple[BinaryIO, bool]:
+        report_cache = self.report_cache()
+
+        # A report with an entity tag is rendered the same way for the same inputs
+        generated_on = report_cache.get_generated_on(etag) if etag is not None else None
+
+        # Serve an identical report from the cache when none of its inputs changed
+        cache_key = report_cache.make_key(user, ledger_data, period.month, period.year, data.locale, entry_data, generated_on)
+
+        content = report_cache.get(cache_key)
+        if content is not None:
+            self.logger.i(f"Served cached report for user: username={user.username}, ledger={ledger_data.name}, period={month_name[period.month]}-{period.year}")
+            return io.BytesIO(content), True
+
+        d_engine = self.document_engine()
+        d_engine.set_period(period.month, period.year)
+        d_engine.set_locale(data.locale.replace('-', '_'))
+        if generated_on is not None:
+            d_engine.set_deterministic(generated_on)
+
+        # Render straight into memory, the response closes the buffer once it is sent
+        buffer = d_engine.generate_pdf(user, ledger_data, entry_data, d_engine.get_buffer(), statistics)
+        report_cache.set(cache_key, buffer.read())
+        buffer.seek(0)
+
+        self.logger.i(f"Generated report for user: username={user.username}, ledger={ledger_data.name}, period={month_name[period.month]}-{period.year}")
+        return buffer, False
+
+    def _render_range_report(
+            self,
+            user: UserViewModel,
+            ledger_data: LedgerModel,
+            summary: RangeSummary,
+            data: RangeReportRequestSerializer.RangeReportRequest
+    ) -> BinaryIO:
+        d_engine = self.document_engine()
+        d_engine.set_period_range(data.start, data.end)
+        d_engine.set_locale(data.locale.replace('-', '_'))
+
+        buffer = d_engine.generate_range_pdf(user, ledger_data, summary, d_engine.get_buffer())
+
+        self.logger.i(f"Generated range report for user: username={user.username}, ledger={ledger_data.name}, period={month_name[data.start[0]]}-{data.start[1]} to {month_name[data.end[0]]}-{data.end[1]}")
+        return buffer
+
+    def _make_etag(
+            self,
+            user: UserViewModel,
+            ledger_data: LedgerModel,
+            data: ReportRequestSerializer.ReportRequest,
+            fingerprint: tuple[int, int | None]
+    ) -> str:
+        version = self.aggregate_store.get_version(ledger_data.id, data.month, data.year)
+
+        # An edited entry whose change was not reported by the webhook is only detected once the tag expires
+        expiry = None
+        if settings.AGGREGATE_STORE_MAX_AGE > 0:
+            expiry = int(time.time() // settings.AGGREGATE_STORE_MAX_AGE)
+
+        return self.report_cache.make_etag(user, ledger_data, data.month, data.year, data.locale, *fingerprint, version, expiry)
+
+    def _is_not_modified(self, request: Request, etag: str) -> bool:
+        header = get_header(request, "If-None-Match")
+        if not header:
+            return False
+
+        # If-None-Match uses the weak comparison
+        etags = parse_etags(header)
+        return "*" in etags or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in etags}
+
+    def _set_etag_headers(self, response: HttpResponse, etag: str):
+        response["ETag"] = etag
+        # The report may be stored, but it is revalidated before it is reused
+        response["Cache-Control"] = "private, no-cache"
+
+    def _set_report_headers(self, response: HttpResponse, cache_hit: bool | None):
+        response["Content-Disposition"] = "inline; filename=report.pdf"
+        # Range reports are not cached
+        if cache_hit is not None:
+            response["X-Report-Cache"] = "HIT" if cache_hit else "MISS"
+
+
+class GenerateReportView(GenerateReportMixin, RequiresUserView):
 
     def post(self, request: Request):
         """Generate a monthly report for the given user
         based on the given ledger and period.
 
+        The response has an `ETag` that identifies the report's inputs. A request whose
+        `If-None-Match` header matches it is answered with 304 before the entries are
+        fetched or the document is rendered, and the same inputs render the same report.
+
         Method
         ------
         POST
@@ -50,6 +239,7 @@ class GenerateReportView(RequiresUserView):
         -------
         - Header
             - `Authentication` (Required): The token which identifies the user
+            - `If-None-Match` (Optional): The `ETag` of a report that was received before
         - Body (Content-Type: `application/json`)
             - `month: int` - the month of the report period. Value must be an integer between 1 and 12
             - `year: int` - the year of the report period
@@ -62,17 +252,28 @@ class GenerateReportView(RequiresUserView):
             - code: 200
             - content-type: `application/pdf`
             - body: *the PDF document of the monthly report*
+        - Not modified
+            - code: 304
+            - body: *empty, the report of the `If-None-Match` header is still current*
         - Authentication failed
             - code: 400
             - content-type: `application/json`
             - body:
                 - `error: str | list[str]`
         """
+        return self._generate(request, request.data)
 
+    def get(self, request: Request):
+        """Same as `post`, with the fields of the body passed as query parameters,
+        so browsers can cache the report and revalidate it with `If-None-Match`.
+        """
+        return self._generate(request, request.query_params)
+
+    def _generate(self, request: Request, payload):
         supabaseUser: SupabaseUser = request.user
 
         # Get the user and their associated data
-        payload_serializer = ReportRequestSerializer(data=request.data)
+        payload_serializer = ReportRequestSerializer(data=payload)
         if not payload_serializer.is_valid():
             return Response({'error': payload_serializer.errors}, status=400)
 
@@ -92,44 +293,124 @@ class GenerateReportView(RequiresUserView):
         
         self.logger.d(f"Fetched ledger: {ledger_data.name}.")
 
-        entry_data = fetcher.get_period_data(user.id, ledger_data, period.month, period.year)
+        fingerprint = fetcher.get_period_fingerprint(user.id, ledger_data, period.month, period.year)
+        etag = self._make_etag(user, ledger_data, data, fingerprint)
+        if self._is_not_modified(request, etag):
+            response = Response(status=304)
+            self._set_etag_headers(response, etag)
+            return response
+
+        if fingerprint[0] < 1:
+            return Response({'error': "No transaction records available for the given period and ledger."}, status=400)
+
+        entry_data = fetcher.get_period_data(user.id, ledger_data, period.month, period.year, fetcher.ENTRY_TABLE_COLUMNS)
         if (len(entry_data) < 1):
             return Response({'error': "No transaction records available for the given period and ledger."}, status=400)
 
         self.logger.d(f"Fetched {len(entry_data)} entry data.")
 
-        d_engine = self.document_engine()
-        d_engine.set_period(period.month, period.year)
-        d_engine.set_locale(data.locale.replace('-', '_'))
+        statistics = None
+        if settings.REPORT_SERVER_AGGREGATION:
+            statistics = fetcher.get_period_statistics(user.id, ledger_data, period.month, period.year)
 
-        filepath = d_engine.get_filepath(user)
-        
-        if len(os.listdir(os.path.dirname(filepath))) > 10:
-            shutil.rmtree(os.path.dirname(filepath))
-            logging.warning("Cleared out the PDF storage directory")
+        buffer, cache_hit = self._render_report(user, ledger_data, entry_data, data, period, statistics, etag)
 
-        filepath = d_engine.generate_pdf(user, ledger_data, entry_data)
+        response = FileResponse(buffer, content_type="application/pdf")
+        self._set_report_headers(response, cache_hit)
+        self._set_etag_headers(response, etag)
 
-        response = FileResponse(open(filepath, 'rb'), content_type="application/pdf")
-        response["Content-Disposition"] = "inline; filename=report.pdf"
+        return response
+
+
+class AsyncGenerateReportView(GenerateReportMixin, AsyncRequiresUserView):
+
+    async def post(self, request: Request):
+        """Asynchronous variant of `GenerateReportView.post` for ASGI servers.
+        The request and response are the same.
+
+        The user and the ledger are fetched concurrently, and the document is
+        rendered in a worker thread so the event loop keeps serving other requests.
+        """
+        return await self._generate(request, request.data)
+
+    async def get(self, request: Request):
+        """Asynchronous variant of `GenerateReportView.get`"""
+        return await self._generate(request, request.query_params)
+
+    async def _generate(self, request: Request, payload):
+        supabaseUser: SupabaseUser = request.user
+
+        # Get the user and their associated data
+        payload_serializer = ReportRequestSerializer(data=payload)
+        if not payload_serializer.is_valid():
+            return JsonResponse({'error': payload_serializer.errors}, status=400)
+
+        data = payload_serializer.create(payload_serializer.validated_data)
+        period = datetime(data.year, data.month, 1)
+
+        fetcher = self.fetcher()
+        user, ledger_data = await asyncio.gather(
+            fetcher.get_user(supabaseUser.id),
+            fetcher.get_ledger(supabaseUser.id, data.ledger_id)
+        )
+        if isinstance(user, str):
+            return JsonResponse({'error': user}, status=400)
+
+        self.logger.d(f"User: username={user.username}.")
+
+        if isinstance(ledger_data, str):
+            return JsonResponse({'error': ledger_data}, status=400)
+
+        self.logger.d(f"Fetched ledger: {ledger_data.name}.")
+
+        fingerprint = await fetcher.get_period_fingerprint(user.id, ledger_data, period.month, period.year)
+        etag = await sync_to_async(self._make_etag)(user, ledger_data, data, fingerprint)
+        if self._is_not_modified(request, etag):
+            response = HttpResponse(status=304)
+            self._set_etag_headers(response, etag)
+            return response
+
+        if fingerprint[0] < 1:
+            return JsonResponse({'error': "No transaction records available for the given period and ledger."}, status=400)
+
+        # The entries and their totals are fetched concurrently
+        queries = [fetcher.get_period_data(user.id, ledger_data, period.month, period.year, fetcher.ENTRY_TABLE_COLUMNS)]
+        if settings.REPORT_SERVER_AGGREGATION:
+            queries.append(fetcher.get_period_statistics(user.id, ledger_data, period.month, period.year))
+
+        entry_data, *statistics = await asyncio.gather(*queries)
+        if (len(entry_data) < 1):
+            return JsonResponse({'error': "No transaction records available for the given period and ledger."}, status=400)
+
+        self.logger.d(f"Fetched {len(entry_data)} entry data.")
+
+        buffer, cache_hit = await sync_to_async(self._render_report, thread_sensitive=False)(
+            user, ledger_data, entry_data, data, period, statistics[0] if statistics else None, etag
+        )
+
+        with buffer:
+            response = HttpResponse(buffer.read(), content_type="application/pdf")
+        self._set_report_headers(response, cache_hit)
+        self._set_etag_headers(response, etag)
 
-        self.logger.i(f"Generated report for user: username={user.username}, ledger={ledger_data.name}, period={month_name[period.month]}-{period.year}")
         return response
 
 
-class AutomatedMonthlyReportView(RequiresAdminView):
+class BatchReportView(RequiresUserView):
 
-    def _generate_report(self, period, user, ledger, data):
-        d_engine = self.document_engine((period.month, period.year))
-        return d_engine.generate_pdf(user, ledger, data)
+    batch_renderer = RENDERERS[settings.REPORT_BATCH_RENDER_BACKEND]
 
-    def _set_filepath(self, target, value):
-        target["filepath"] = value
+    LEDGERS_NOT_FOUND_MESSAGE = "Ledgers not found: {}."
 
     def post(self, request: Request):
-        """Request the app to generate monthly reports for
-        all users who allowed automatic monthly reports and
-        send them to their email.
+        """Generate the monthly reports of several ledgers and periods of the given user,
+        and send them back in a single ZIP archive.
+
+        The ledgers are fetched with one bulk query, and the entries of every ledger of
+        a period with another. The reports are rendered concurrently, and each one is
+        streamed in the archive as soon as it completes, so the archive is never held
+        in memory. Reports whose inputs did not change are served from the report cache.
+        Targets without entries, and reports that failed to render, are left out of the archive.
 
         Method
         ------
@@ -137,9 +418,346 @@ class AutomatedMonthlyReportView(RequiresAdminView):
 
         Request
         -------
-        Header
+        - Header
+            - `Authentication` (Required): The token which identifies the user
+        - Body (Content-Type: `application/json`)
+            - `targets: list` - the reports to generate, at most `REPORT_BATCH_MAX_TARGETS`
+                - `ledger_id: int` - the ledger id of the data
+                - `month: int` - the month of the report period. Value must be an integer between 1 and 12
+                - `year: int` - the year of the report period
+            - `locale: str` - the locale to use when generating the reports. Value must be in the format of <lang>-<region>. The default value is `"en-us"`
+
+        Response
+        --------
+        - Success
+            - code: 200
+            - content-type: `application/zip`
+            - body: *a ZIP archive with one PDF document per report, named `<ledger> (<ledger id>)/<year>-<month>.pdf`*
+        - Authentication failed
+            - code: 400
+            - content-type: `application/json`
+            - body:
+                - `error: str | list[str]`
+        """
+
+        supabaseUser: SupabaseUser = request.user
+
+        payload_serializer = BatchReportRequestSerializer(data=request.data)
+        if not payload_serializer.is_valid():
+            return Response({'error': payload_serializer.errors}, status=400)
+
+        data = payload_serializer.create(payload_serializer.validated_data)
+
+        fetcher = self.fetcher()
+        user = fetcher.get_user(supabaseUser.id)
+        if isinstance(user, str):
+            return Response({'error': user}, status=400)
+
+        self.logger.d(f"User: username={user.username}.")
+
+        ledgers = fetcher.get_ledgers_bulk((user.id, ledger_id) for ledger_id, _, _ in data.targets)
+        missing = sorted({ledger_id for ledger_id, _, _ in data.targets if (user.id, ledger_id) not in ledgers})
+        if missing:
+            return Response({'error': self.LEDGERS_NOT_FOUND_MESSAGE.format(", ".join(map(str, missing)))}, status=400)
+
+        reports = self._fetch_batch_data(fetcher, user, ledgers, data)
+        if len(reports) < 1:
+            return Response({'error': "No transaction records available for the given periods and ledgers."}, status=400)
+
+        self.logger.d(f"Fetched the data of {len(reports)} reports.")
+
+        response = StreamingHttpResponse(self._stream_reports(user, reports, data), content_type="application/zip")
+        response["Content-Disposition"] = "attachment; filename=reports.zip"
+
+        return response
+
+    def _fetch_batch_data(self, fetcher, user: UserViewModel, ledgers: dict, data) -> list:
+        # The ledgers of a period are fetched together, with a few bulk queries per period
+        periods = {}
+        for ledger_id, month, year in data.targets:
+            periods.setdefault((month, year), []).append(ledgers[(user.id, ledger_id)])
+
+        reports = {}
+        for (month, year), period_ledgers in periods.items():
+            targets = [(user.id, ledger) for ledger in period_ledgers]
+            entries = fetcher.get_period_data_bulk(targets, month, year, fetcher.ENTRY_TABLE_COLUMNS)
+
+            statistics = None
+            if settings.REPORT_SERVER_AGGREGATION:
+                statistics = fetcher.get_period_statistics_bulk(targets, month, year)
+
+            for ledger in period_ledgers:
+                if len(entries[(user.id, ledger.id)]) < 1:
+                    continue
+
+                d = {
+                    'user': user,
+                    'ledger': ledger,
+                    'data': entries[(user.id, ledger.id)],
+                    'period': (month, year),
+                    'locale': data.locale.replace('-', '_')
+                }
+                if statistics is not None:
+                    d['statistics'] = statistics[(user.id, ledger.id)]
+
+                reports[(ledger.id, month, year)] = d
+
+        # In the order of the request
+        return [reports[target] for target in data.targets if target in reports]
+
+    @staticmethod
+    def _archive_name(d: dict) -> str:
+        month, year = d['period']
+        ledger_name = re.sub(r'[\\/:*?"<>|]', "_", d['ledger'].name)
+
+        return f"{ledger_name} ({d['ledger'].id})/{year}-{month:02d} {month_name[month]}.pdf"
+
+    def _stream_reports(self, user: UserViewModel, reports: list, data):
+        archive = ZipStream()
+        report_cache = self.report_cache()
+
+        pending = []
+        for d in reports:
+            d['cache_key'] = report_cache.make_key(user, d['ledger'], *d['period'], data.locale, d['data'])
+
+            content = report_cache.get(d['cache_key'])
+            if content is None:
+                pending.append(d)
+                continue
+
+            yield from archive.write(self._archive_name(d), content)
+
+        renderer = self.batch_renderer(self.document_engine)
+        for d, filepath, error in renderer.render_iter(None, pending):
+            if error is not None:
+                continue
+
+            try:
+                with open(filepath, "rb") as document:
+                    content = document.read()
+            finally:
+                os.remove(filepath)
+
+            report_cache.set(d['cache_key'], content)
+            yield from archive.write(self._archive_name(d), content)
+
+        yield from archive.close()
+
+        self.logger.i(f"Generated batch of {len(reports)} reports for user: username={user.username}, cached={len(reports) - len(pending)}")
+
+
+class GenerateRangeReportView(GenerateReportMixin, RequiresUserView):
+
+    def post(self, request: Request):
+        """Generate a report over a range of months for the given user, with
+        the totals of each month, their trend and the category breakdown of the range.
+
+        The entries of the range are fetched with a single ranged query, page by page,
+        and aggregated as each page arrives instead of being kept in memory.
+
+        Method
+        ------
+        POST
+
+        Request
+        -------
+        - Header
+            - `Authentication` (Required): The token which identifies the user
+        - Body (Content-Type: `application/json`)
+            - `year: int` - the year of the report, for a report of the whole year
+            - `start_month: int`, `start_year: int` - the first month of the range, if `year` is not given
+            - `end_month: int`, `end_year: int` - the last month of the range, included, if `year` is not given
+            - `ledger_id: int` - the ledger id of the data
+            - `locale: str` - the locale to use when generating the report. Value must be in the format of <lang>-<region>. The default value is `"en-us"`
+
+        Response
+        --------
+        - Success
+            - code: 200
+            - content-type: `application/pdf`
+            - body: *the PDF document of the report*
+        - Authentication failed
+            - code: 400
+            - content-type: `application/json`
+            - body:
+                - `error: str | list[str]`
+        """
+
+        supabaseUser: SupabaseUser = request.user
+
+        payload_serializer = RangeReportRequestSerializer(data=request.data)
+        if not payload_serializer.is_valid():
+            return Response({'error': payload_serializer.errors}, status=400)
+
+        data = payload_serializer.create(payload_serializer.validated_data)
+
+        fetcher = self.fetcher()
+        user = fetcher.get_user(supabaseUser.id)
+        if isinstance(user, str):
+            return Response({'error': user}, status=400)
+
+        self.logger.d(f"User: username={user.username}.")
+
+        ledger_data = fetcher.get_ledger(user.id, data.ledger_id)
+        if isinstance(ledger_data, str):
+            return Response({'error': ledger_data}, status=400)
+
+        self.logger.d(f"Fetched ledger: {ledger_data.name}.")
+
+        summary = RangeSummary(data.start, data.end)
+        for page in fetcher.iter_range_data(user.id, ledger_data, data.start, data.end):
+            summary.add(page)
+
+        if summary.count < 1:
+            return Response({'error': "No transaction records available for the given period and ledger."}, status=400)
+
+        self.logger.d(f"Fetched {summary.count} entry data.")
+
+        buffer = self._render_range_report(user, ledger_data, summary, data)
+
+        response = FileResponse(buffer, content_type="application/pdf")
+        self._set_report_headers(response, None)
+
+        return response
+
+
+class AsyncGenerateRangeReportView(GenerateReportMixin, AsyncRequiresUserView):
+
+    async def post(self, request: Request):
+        """Asynchronous variant of `GenerateRangeReportView.post` for ASGI servers.
+        The request and response are the same.
+        """
+
+        supabaseUser: SupabaseUser = request.user
+
+        payload_serializer = RangeReportRequestSerializer(data=request.data)
+        if not payload_serializer.is_valid():
+            return JsonResponse({'error': payload_serializer.errors}, status=400)
+
+        data = payload_serializer.create(payload_serializer.validated_data)
+
+        fetcher = self.fetcher()
+        user, ledger_data = await asyncio.gather(
+            fetcher.get_user(supabaseUser.id),
+            fetcher.get_ledger(supabaseUser.id, data.ledger_id)
+        )
+        if isinstance(user, str):
+            return JsonResponse({'error': user}, status=400)
+
+        self.logger.d(f"User: username={user.username}.")
+
+        if isinstance(ledger_data, str):
+            return JsonResponse({'error': ledger_data}, status=400)
+
+        self.logger.d(f"Fetched ledger: {ledger_data.name}.")
+
+        summary = RangeSummary(data.start, data.end)
+        async for page in fetcher.iter_range_data(user.id, ledger_data, data.start, data.end):
+            summary.add(page)
+
+        if summary.count < 1:
+            return JsonResponse({'error': "No transaction records available for the given period and ledger."}, status=400)
+
+        self.logger.d(f"Fetched {summary.count} entry data.")
+
+        buffer = await sync_to_async(self._render_range_report, thread_sensitive=False)(user, ledger_data, summary, data)
+
+        with buffer:
+            response = HttpResponse(buffer.read(), content_type="application/pdf")
+        self._set_report_headers(response, None)
+
+        return response
+
+
+class LedgerTimeSeriesView(RequiresUserView):
+
+    def get(self, request: Request):
+        """Get the income and expense of a ledger over a range of months, by month or by week.
+
+        The totals are read from the local aggregate store, and only the months whose
+        entries changed since they were stored are fetched again, see `AggregateStore`.
+
+        Method
+        ------
+        GET
+
+        Request
+        -------
+        - Header
+            - `Authentication` (Required): The token which identifies the user
+        - Query parameters
+            - `ledger_id: int` - the ledger id of the data
+            - `year: int` - the year of the series, for the whole year
+            - `start_month: int`, `start_year: int` - the first month of the range, if `year` is not given
+            - `end_month: int`, `end_year: int` - the last month of the range, included, if `year` is not given
+            - `bucket: str` - either `"month"` or `"week"`. The default value is `"month"`
+
+        Response
+        --------
+        - Success
+            - code: 200
+            - content-type: `application/json`
+            - body:
+                - `data`
+                    - `ledger_id: int`
+                    - `currency: str` - the currency of the amounts
+                    - `bucket: str`
+                    - `series: list` - one item per bucket, in order
+                        - `start: str`, `end: str` - the ISO dates of the bucket, clipped to the range
+                        - `income: float`, `expense: float`, `net: float`
+                        - `income_categories: dict[str, float]`, `expense_categories: dict[str, float]`
+        - Authentication failed
+            - code: 400
+            - content-type: `application/json`
+            - body:
+                - `error: str | list[str]`
+        """
+
+        supabaseUser: SupabaseUser = request.user
+
+        payload_serializer = TimeSeriesRequestSerializer(data=request.query_params)
+        if not payload_serializer.is_valid():
+            return Response({'error': payload_serializer.errors}, status=400)
+
+        data = payload_serializer.create(payload_serializer.validated_data)
+
+        fetcher = self.fetcher()
+        ledger_data = fetcher.get_ledger(supabaseUser.id, data.ledger_id)
+        if isinstance(ledger_data, str):
+            return Response({'error': ledger_data}, status=400)
+
+        store = self.aggregate_store()
+        refreshed = store.refresh(fetcher, supabaseUser.id, ledger_data, data.start, data.end)
+        self.logger.d(f"Refreshed {refreshed} stale months of ledger: {ledger_data.name}.")
+
+        return Response({'data': {
+            'ledger_id': ledger_data.id,
+            'currency': ledger_data.currency_name,
+            'bucket': data.bucket,
+            'series': store.time_series(ledger_data.id, data.start, data.end, data.bucket),
+        }})
+
+
+class EntryChangesView(RequiresAdminView):
+
+    def post(self, request: Request):
+        """Receive the changes of the `entry` table from a Supabase database webhook,
+        and mark the months of the changed entries as stale in the aggregate store.
+
+        Method
+        ------
+        POST
+
+        Request
+        -------
+        - Header
             - `X-ADMIN-USERNAME` (Required): Admin username
             - `X-ADMIN-PASSWORD` (Required): Admin password
+        - Body (Content-Type: `application/json`)
+            - `type: str` - `INSERT`, `UPDATE` or `DELETE`
+            - `table: str` - `entry`
+            - `record: dict | None` - the entry after the change
+            - `old_record: dict | None` - the entry before the change
 
         Response
         --------
@@ -148,75 +766,212 @@ class AutomatedMonthlyReportView(RequiresAdminView):
             - content type: `application/json`
             - body:
                 - `data`
-                    - `period: str` - The month-year period of the current request
-                    - `users`
-                        - `count: int` - Total number of users who allowed automatic monthly report
-                        - `sent: int` - Number of reports actually sent
-        - Authentication failed
+                    - `invalidated: int` - the number of already tracked months that are now stale
+        - Invalid payload
             - code: `400`
             - content type: `application/json`
             - body:
-                - `error: str | list[str]`
+                - `error: str`
         """
+        if not isinstance(request.data, dict) or request.data.get("table") != "entry":
+            return Response({'error': "Expected a change of the entry table."}, status=400)
+
+        # An update that moved an entry to another month or ledger changes both months
+        months = set()
+        for record in (request.data.get("record"), request.data.get("old_record")):
+            if isinstance(record, dict) and record.get("ledger") is not None and record.get("date"):
+                months.add((record["ledger"], record["date"][:7]))
+
+        invalidated = sum(self.aggregate_store.mark_changed(ledger_id, month) for ledger_id, month in months)
+
+        return Response({'data': {'invalidated': invalidated}})
+
+
+class AutomatedMonthlyReportMixin:
+    """Shared steps of `AutomatedMonthlyReportView` and `AsyncAutomatedMonthlyReportView`"""
 
-        # Retrieve all users who allow monthly reports generation
-        allow_report_users = self.fetcher().get_allow_report_users()
-        self.logger.d(f"Fetched {len(allow_report_users)} users who allowed automatic monthly report")
+    renderer = RENDERERS[settings.REPORT_RENDER_BACKEND]
+    dispatcher = DeliveryDispatcher
+    pipeline = ReportPipeline
+    job_worker = ReportJobWorker
 
+    def _fetch_report_data(self, fetcher, period, users) -> list:
+        # Fetch every ledger and entry of the batch in a few bulk queries instead of two queries per user
+        ledgers = fetcher.get_ledgers_bulk((u.id, u.current_ledger) for u in users)
+        targets = [(u.id, ledgers[(u.id, u.current_ledger)]) for u in users if (u.id, u.current_ledger) in ledgers]
+        entries = fetcher.get_period_data_bulk(targets, period.month, period.year, fetcher.ENTRY_TABLE_COLUMNS)
+
+        statistics = None
+        if settings.REPORT_SERVER_AGGREGATION:
+            statistics = fetcher.get_period_statistics_bulk(targets, period.month, period.year)
+
+        return self._group_report_data(users, ledgers, entries, statistics)
+
+    def _run_pipeline(self, period, users, fetch_batch, on_result=None):
+        pipeline = self.pipeline(
+            self.renderer(self.document_engine),
+            self.dispatcher(self.delivery_engine),
+            (period.month, period.year)
+        )
+
+        return pipeline.run(users, fetch_batch, partial(self._create_report_email, period), on_result)
+
+    def _get_job_steps(self):
+        return self
+
+    def _enqueue_job(self, period) -> tuple[dict, bool]:
+        job, created = self.job_worker.enqueue(period.month, period.year)
+        if created:
+            self.logger.i(f"Queued report job {job.pk} for period {month_name[period.month]} {period.year}.")
+
+        # Also resumes a running job whose worker has died
+        if settings.REPORT_JOB_BACKGROUND_WORKER:
+            self.job_worker.ensure_started(self._get_job_steps())
+
+        return {'data': ReportJobSerializer(job).data}, created
+
+    def _group_report_data(self, allow_report_users, ledgers, entries, statistics=None) -> list:
         data = []
-        period = datetime.now()
 
         for u in allow_report_users:
-            fetcher = self.fetcher()
-            ledger_data = fetcher.get_ledger(u.id, u.current_ledger)
-            user_data = fetcher.get_period_data(u.id, ledger_data, period.month, period.year)
+            ledger_data = ledgers.get((u.id, u.current_ledger))
+            if ledger_data is None:
+                continue
 
+            user_data = entries[(u.id, ledger_data.id)]
             if len(user_data) < 1:
                 continue
 
-            data.append({'user': u, 'ledger': ledger_data, 'data': user_data})
-        
+            d = {'user': u, 'ledger': ledger_data, 'data': user_data}
+            if statistics is not None:
+                d['statistics'] = statistics[(u.id, ledger_data.id)]
+
+            data.append(d)
+
         self.logger.d(f"Fetched and processed {len(data)} data groups. {len(allow_report_users) - len(data)} users have no data in the current period.")
+        return data
 
-        # Generate monthly report
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            for i, d in enumerate(data):
-                # 1. Generate report with the document engine
-                # 2. Update the filepath to the document of the user
-                executor \
-                    .submit(self._generate_report, period, d['user'], d['ledger'], d['data']) \
-                    .add_done_callback(lambda future: self._set_filepath(data[i], future.result())) \
-
-
-        # Send the report by email
-        deliv_eng = self.delivery_engine()
-        for d in data:
-            deliv_eng.send_email(
-                f"Monthly Financial Report - {month_name[period.month]} {period.year}",
-                f"""
-                    <h2 style="padding-bottom: 1rem;">Hello {d['user'].username},</h2>
-                    <p>
-                        Your monthly financial report is ready.
-                        You will find attached to this email the report for the ledger <b>{ledger_data.name}</b> and period <b>{month_name[period.month]} {period.year}</b>
-                    </p>
-                    
-                    <p>Thank you for using FinTrack.</p>
-                """,
-                d['user'].email,
-                d['filepath'],
-                f"Monthly Financial Report - {ledger_data.name} ({month_name[period.month]} {period.year}).pdf"
-            )
-
-        self.logger.i(f"Report generated and sent for {len(data)}/{len(allow_report_users)} users.")
-        return Response({
-            'data': {
-                'period': f"{month_name[period.month]} {period.year}",
-                'users': {
-                    'count': len(allow_report_users),
-                    'sent': len(data)
-                }
-            }
-        })
+    def _create_report_email(self, period, d) -> dict:
+        return dict(
+            subject=f"Monthly Financial Report - {month_name[period.month]} {period.year}",
+            content=f"""
+                <h2 style="padding-bottom: 1rem;">Hello {d['user'].username},</h2>
+                <p>
+                    Your monthly financial report is ready.
+                    You will find attached to this email the report for the ledger <b>{d['ledger'].name}</b> and period <b>{month_name[period.month]} {period.year}</b>
+                </p>
+
+                <p>Thank you for using FinTrack.</p>
+            """,
+            to_address=d['user'].email,
+            attachment_filepath=d['filepath'],
+            attachment_filename=f"Monthly Financial Report - {d['ledger'].name} ({month_name[period.month]} {period.year}).pdf"
+        )
+
+
+class AutomatedMonthlyReportView(AutomatedMonthlyReportMixin, RequiresAdminView):
+
+    def post(self, request: Request):
+        """Request the app to generate monthly reports for
+        all users who allowed automatic monthly reports and
+        send them to their email.
+
+        The reports are generated by a background job. If a job of the current
+        period is already queued or running, that job is returned instead.
+
+        Method
+        ------
+        POST
+
+        Request
+        -------
+        Header
+            - `X-ADMIN-USERNAME` (Required): Admin username
+            - `X-ADMIN-PASSWORD` (Required): Admin password
+
+        Response
+        --------
+        - Success
+            - code: `202`
+            - content type: `application/json`
+            - body:
+                - `data` - The queued job, see `AutomatedMonthlyReportJobView`
+        - Authentication failed
+            - code: `400`
+            - content type: `application/json`
+            - body:
+                - `error: str | list[str]`
+        """
+        body, _ = self._enqueue_job(datetime.now())
+        return Response(body, status=status.HTTP_202_ACCEPTED)
+
+
+class AsyncAutomatedMonthlyReportView(AutomatedMonthlyReportMixin, AsyncRequiresAdminView):
+
+    def _get_job_steps(self):
+        # The job runs outside of the event loop, with the blocking fetcher
+        return AutomatedMonthlyReportView(document_engine=self.document_engine, delivery_engine=self.delivery_engine)
+
+    async def post(self, request: Request):
+        """Asynchronous variant of `AutomatedMonthlyReportView.post` for ASGI servers.
+        The request and response are the same.
+        """
+        body, _ = await sync_to_async(self._enqueue_job, thread_sensitive=False)(datetime.now())
+        return JsonResponse(body, status=status.HTTP_202_ACCEPTED)
+
+
+class AutomatedMonthlyReportJobView(RequiresAdminView):
+
+    JOB_NOT_FOUND_MESSAGE = "Report job not found."
+
+    def get(self, request: Request, job_id):
+        """Get the progress of an automated monthly report job
+
+        Method
+        ------
+        GET
+
+        Request
+        -------
+        Header
+            - `X-ADMIN-USERNAME` (Required): Admin username
+            - `X-ADMIN-PASSWORD` (Required): Admin password
+
+        Response
+        --------
+        - Success
+            - code: `200`
+            - content type: `application/json`
+            - body:
+                - `data`
+                    - `id: str` - The job id
+                    - `month: int`
+                    - `year: int`
+                    - `status: str` - `pending`, `running`, `completed` or `failed`
+                    - `user_count: int` - Total number of users who allowed automatic monthly report
+                    - `sent: int` - Number of reports sent so far
+                    - `failed: int` - Number of reports that failed to render or to send so far
+                    - `attempts: int` - Number of times the job was started or resumed
+                    - `error: str | None`
+                    - `created_at: str`
+                    - `started_at: str | None`
+                    - `finished_at: str | None`
+        - Job not found
+            - code: `404`
+            - content type: `application/json`
+            - body:
+                - `error: str`
+        - Authentication failed
+            - code: `400`
+            - content type: `application/json`
+            - body:
+                - `error: str | list[str]`
+        """
+        job = ReportJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({"error": self.JOB_NOT_FOUND_MESSAGE}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({'data': ReportJobSerializer(job).data})
 
 
 class ClearStorageView(RequiresUserView):
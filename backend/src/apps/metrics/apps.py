@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class MetricsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.metrics'
+
+    def ready(self):
+        # The durations of the report phases are measured once, by the timing spans
+        from ..common.utils.timing import Timing
+        from ..common.supabase import SupabaseClientProvider
+        from .metrics import observe_span, observe_connection_event
+
+        Timing.add_listener(observe_span)
+        SupabaseClientProvider.add_listener(observe_connection_event)
@@ -0,0 +1,153 @@
+import os
+from typing import Dict, Tuple
+
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+from prometheus_client.registry import Collector
+from prometheus_client.core import GaugeMetricFamily
+
+from ..generation import apps as generation_apps
+
+# In milliseconds to minutes, the spans range from a section of the document to a batch of queries
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUESTS = Counter(
+    "fintrack_http_requests",
+    "The number of HTTP requests, by route, method and status code",
+    ["route", "method", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "fintrack_http_request_duration_seconds",
+    "The time to respond to an HTTP request, by route and method",
+    ["route", "method"],
+    buckets=DURATION_BUCKETS
+)
+SPAN_DURATION = Histogram(
+    "fintrack_span_duration_seconds",
+    "The duration of each phase of the report generation: auth, fetch.*, render.* and delivery.*",
+    ["span"],
+    buckets=DURATION_BUCKETS
+)
+SPAN_ERRORS = Counter(
+    "fintrack_span_errors",
+    "The number of phases that ended with an exception, by span and exception",
+    ["span", "error"]
+)
+REPORT_SIZE = Histogram(
+    "fintrack_report_size_bytes",
+    "The size of the generated PDF documents",
+    buckets=(1e4, 2.5e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7)
+)
+EMAILS = Counter(
+    "fintrack_emails",
+    "The outcome of each attempt to send a report email: sent, retried or failed",
+    ["engine", "outcome"]
+)
+SUPABASE_CONNECTIONS = Counter(
+    "fintrack_supabase_connection_events",
+    "The requests sent to Supabase, and the connections, TLS handshakes and transport errors of the "
+    "connection pools. The share of reused connections is 1 - connections / requests.",
+    ["event"]
+)
+REPORT_JOBS = Counter(
+    "fintrack_report_jobs",
+    "The number of automated report jobs that finished, by status",
+    ["status"]
+)
+REPORT_JOB_DURATION = Histogram(
+    "fintrack_report_job_duration_seconds",
+    "The time to run an automated report job",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400)
+)
+
+
+def observe_span(name: str, duration: float, error: str | None):
+    SPAN_DURATION.labels(name).observe(duration)
+    if error is not None:
+        SPAN_ERRORS.labels(name, error).inc()
+
+
+def observe_connection_event(event: str):
+    SUPABASE_CONNECTIONS.labels(event).inc()
+
+
+class StorageCollector(Collector):
+    """Reports the size and the number of files of the directories where the
+    report documents are written. They are measured on each scrape.
+    """
+
+    def _directories(self) -> Dict[str, str]:
+        directories = {"reports": os.path.join(os.path.dirname(generation_apps.__file__), "storage")}
+
+        cache = settings.CACHES.get(settings.REPORT_CACHE_ALIAS, {})
+        if cache.get("BACKEND", "").endswith("FileBasedCache"):
+            directories["report_cache"] = str(cache["LOCATION"])
+
+        return directories
+
+    @staticmethod
+    def _usage(path: str) -> Tuple[int, int]:
+        size, count = 0, 0
+
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                    count += 1
+                except OSError:
+                    # The file was removed during the walk
+                    continue
+
+        return size, count
+
+    def _families(self) -> Tuple[GaugeMetricFamily, GaugeMetricFamily]:
+        return (
+            GaugeMetricFamily("fintrack_storage_bytes", "The total size of the files in each storage directory", labels=["directory"]),
+            GaugeMetricFamily("fintrack_storage_files", "The number of files in each storage directory", labels=["directory"]),
+        )
+
+    def describe(self):
+        return list(self._families())
+
+    def collect(self):
+        size, files = self._families()
+
+        for name, path in self._directories().items():
+            total, count = self._usage(path)
+            size.add_metric([name], total)
+            files.add_metric([name], count)
+
+        yield size
+        yield files
+
+
+def get_registry() -> CollectorRegistry:
+    """Get the registry to expose.
+
+    Under gunicorn, each worker process writes its samples to the files of
+    `PROMETHEUS_MULTIPROC_DIR` (see `gunicorn.conf.py`), and the samples of every
+    process are merged on each scrape. Otherwise, the samples of the current process
+    are exposed.
+
+    Params
+    ------
+    None
+
+    Returns
+    -------
+    CollectorRegistry
+        The registry with the report metrics and the storage usage
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(StorageCollector())
+
+    return registry
+
+
+# The storage is measured by the scraping process, so it is not part of the merged samples
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    REGISTRY.register(StorageCollector())
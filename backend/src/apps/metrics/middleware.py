@@ -0,0 +1,44 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import REQUESTS, REQUEST_DURATION
+
+
+class MetricsMiddleware:
+    """Counts the requests and measures their latency, labelled by the URL pattern
+    of the view instead of the path, so the number of series stays bounded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, start)
+
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, start)
+
+        return response
+
+    def _observe(self, request, response, start: float):
+        match = getattr(request, "resolver_match", None)
+        route = f"/{match.route}" if match is not None else "unmatched"
+
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        REQUEST_DURATION.labels(route, request.method).observe(time.perf_counter() - start)
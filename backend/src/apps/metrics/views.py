@@ -0,0 +1,41 @@
+import hmac
+
+from django.conf import settings
+from django.views import View
+from django.http import HttpRequest, HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from ..common.utils.request import get_header
+from .metrics import get_registry
+
+
+class MetricsView(View):
+
+    def get(self, request: HttpRequest):
+        """Expose the metrics of the service in the Prometheus text format
+
+        Request
+        -------
+        - Header
+            - `Authorization` (Required): `Bearer <METRICS_TOKEN>`
+
+        Response
+        --------
+        - Success:
+            - code: 200
+            - content-type: `text/plain; version=0.0.4`
+            - body: *the metrics, merged across the worker processes*
+        - `METRICS_TOKEN` is not set:
+            - code: 404
+        - Authentication failed:
+            - code: 401
+        """
+        token = settings.METRICS_TOKEN
+        if not token:
+            # The metrics are never served without a token
+            return HttpResponse(status=404)
+
+        if not hmac.compare_digest(get_header(request, "Authorization") or "", f"Bearer {token}"):
+            return HttpResponse(status=401)
+
+        return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -47,6 +47,7 @@ if DEBUG is True:
     os.unsetenv("GMAIL_PASSWORD")
     os.unsetenv("SUPABASE_URL")
     os.unsetenv("SUPABASE_KEY")
+    os.unsetenv("SUPABASE_JWT_SECRET")
     os.unsetenv("ADMIN_USERNAME")
     os.unsetenv("ADMIN_PASSWORD")
 
@@ -58,11 +59,41 @@ else:
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# Access tokens are verified locally with the JWT secret when it is set,
+# otherwise every token is verified by Supabase Auth
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWT_LEEWAY = int(os.getenv("SUPABASE_JWT_LEEWAY", 10))
+
+# Verified users are cached until their access token expires
+SUPABASE_AUTH_CACHE_ALIAS = "default"
+
+# The requests of every thread of a process to Supabase (auth and PostgREST) share one
+# pool of keep-alive connections. Idle connections are kept open for KEEPALIVE_EXPIRY
+# seconds, so bursts of requests reuse them instead of opening new TLS connections.
+# The pool waits up to POOL_TIMEOUT seconds for a free connection when all MAX_CONNECTIONS
+# are in use. HTTP/2 multiplexes the requests on fewer connections, and requires the `h2` package.
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", 20))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", 20))
+SUPABASE_POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", 60))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", 10))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", 5))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", 30))
+SUPABASE_CONNECT_RETRIES = int(os.getenv("SUPABASE_CONNECT_RETRIES", 1))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "false").lower() == "true"
+
 # Delivery credentials
 RESEND_KEY = os.getenv("RESEND_KEY")
 GMAIL_EMAIL = os.getenv("GMAIL_EMAIL")
 GMAIL_PASSWORD = os.getenv("GMAIL_PASSWORD")
 
+# A Gmail delivery session reuses its SMTP connection for up to this many emails
+GMAIL_SMTP_HOST = os.getenv("GMAIL_SMTP_HOST", "smtp.gmail.com")
+GMAIL_SMTP_PORT = int(os.getenv("GMAIL_SMTP_PORT", 465))
+GMAIL_SMTP_SSL = os.getenv("GMAIL_SMTP_SSL", "true").lower() == "true"
+GMAIL_SMTP_TIMEOUT = int(os.getenv("GMAIL_SMTP_TIMEOUT", 30))
+GMAIL_SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("GMAIL_SMTP_MAX_MESSAGES_PER_CONNECTION", 50))
+
 # Automation credentials
 ADMIN_USERNAME = make_password(os.getenv("ADMIN_USERNAME"))
 ADMIN_PASSWORD = make_password(os.getenv("ADMIN_PASSWORD"))
@@ -91,10 +122,13 @@ INSTALLED_APPS = [
     'rest_framework',
 
     'apps.ping.apps.PingConfig',
+    'apps.metrics.apps.MetricsConfig',
     'apps.generation.apps.GenerationConfig',
 ]
 
 MIDDLEWARE = [
+    'apps.common.middleware.ServerTimingMiddleware',
+    'apps.metrics.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -129,20 +163,160 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# The database file can be moved to a volume shared by the web and report job containers
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv("DATABASE_PATH", BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# Report rendering
+# The automated monthly reports are rendered on a pool of processes ("process")
+# or threads ("thread"). ReportLab's layout is CPU-bound, so only the process pool
+# scales with the number of cores.
+REPORT_RENDER_BACKEND = os.getenv("REPORT_RENDER_BACKEND", "process")
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", os.cpu_count() or 1))
+REPORT_RENDER_START_METHOD = os.getenv("REPORT_RENDER_START_METHOD", "spawn")
+
+# The batch report endpoint renders the reports of a request concurrently and streams them
+# back in a ZIP archive as each one completes. Its pool is started for every request, so the
+# thread pool is the default, which skips the startup of the worker processes.
+REPORT_BATCH_RENDER_BACKEND = os.getenv("REPORT_BATCH_RENDER_BACKEND", "thread")
+REPORT_BATCH_MAX_TARGETS = int(os.getenv("REPORT_BATCH_MAX_TARGETS", 36))
+
+# The reports are emailed by a pool of workers, each with its own SMTP session.
+# A failed email is retried with an exponential backoff (in seconds).
+REPORT_DELIVERY_WORKERS = int(os.getenv("REPORT_DELIVERY_WORKERS", 4))
+REPORT_DELIVERY_MAX_ATTEMPTS = int(os.getenv("REPORT_DELIVERY_MAX_ATTEMPTS", 3))
+REPORT_DELIVERY_BACKOFF = float(os.getenv("REPORT_DELIVERY_BACKOFF", 1))
+REPORT_DELIVERY_BACKOFF_MAX = float(os.getenv("REPORT_DELIVERY_BACKOFF_MAX", 30))
+
+# The automated job fetches the users' data in batches and streams it through the
+# render and delivery stages. At most REPORT_PIPELINE_QUEUE_SIZE reports wait
+# between two stages, which bounds the memory of the job.
+REPORT_PIPELINE_BATCH_SIZE = int(os.getenv("REPORT_PIPELINE_BATCH_SIZE", 100))
+REPORT_PIPELINE_QUEUE_SIZE = int(os.getenv("REPORT_PIPELINE_QUEUE_SIZE", 32))
+
+# The automated job is queued in the database and run by `python manage.py process_report_jobs`.
+# A background worker thread can run the jobs inside the web process instead, but every gunicorn
+# worker would then poll and write to the database, so it is off by default. A running job
+# whose heartbeat is older than the lease timeout (in seconds) is resumed by another worker.
+REPORT_JOB_BACKGROUND_WORKER = os.getenv("REPORT_JOB_BACKGROUND_WORKER", "false").lower() == "true"
+REPORT_JOB_LEASE_TIMEOUT = int(os.getenv("REPORT_JOB_LEASE_TIMEOUT", 120))
+REPORT_JOB_HEARTBEAT_INTERVAL = int(os.getenv("REPORT_JOB_HEARTBEAT_INTERVAL", 15))
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv("REPORT_JOB_MAX_ATTEMPTS", 3))
+
+# The entry rows fetched from Supabase are validated into `EntryModel`s by default.
+# When enabled, the rows are trusted to match the schema of the `entry` table and are
+# decoded into lightweight `EntryRecord`s without validation, which is much faster on large ledgers.
+FETCHER_TRUSTED_DECODING = os.getenv("FETCHER_TRUSTED_DECODING", "false").lower() == "true"
+
+# The per-category totals of a report are aggregated by Postgres instead of the server,
+# so only the totals are transferred for the statistics page. It requires PostgREST's
+# aggregate functions, which are disabled by default on Supabase
+# (`alter role authenticator set pgrst.db_aggregates_enabled = 'true'`).
+# If PostgREST rejects the aggregate, the server sums the entries instead.
+REPORT_SERVER_AGGREGATION = os.getenv("REPORT_SERVER_AGGREGATION", "false").lower() == "true"
+
+# The currency formatters of these locales (<lang>-<region>, comma separated) and currencies
+# are built at startup. Other locales are built on their first report. "all" warms every locale
+# accepted by the report request, which costs about a second and ~100 MB per process, as Babel
+# keeps the data of every loaded locale in memory.
+REPORT_FORMATTER_WARM_LOCALES = os.getenv("REPORT_FORMATTER_WARM_LOCALES", "en-us").split(",")
+REPORT_FORMATTER_WARM_CURRENCIES = os.getenv("REPORT_FORMATTER_WARM_CURRENCIES", "USD").split(",")
+
+# Ledgers with more entries than this are rendered in the large-ledger mode, where the
+# entry table is emitted as one fixed-height table per page, each with its page subtotal
+# and the running total, instead of a single table that ReportLab splits page by page.
+REPORT_LARGE_LEDGER_ENTRIES = int(os.getenv("REPORT_LARGE_LEDGER_ENTRIES", 2000))
+
+# The longest range of months, in months, that a single range report can span
+REPORT_RANGE_MAX_MONTHS = int(os.getenv("REPORT_RANGE_MAX_MONTHS", 24))
+
+# The per-day, per-category totals behind the time-series endpoint are stored by ledger month,
+# and a month is only recomputed once the entry webhook reports a change in it. Months older
+# than this many seconds are recomputed anyway, in case a change was missed. 0 disables the expiry.
+# The ETags of the monthly reports also change every AGGREGATE_STORE_MAX_AGE seconds, for the same reason.
+AGGREGATE_STORE_MAX_AGE = int(os.getenv("AGGREGATE_STORE_MAX_AGE", 3600))
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Generated report documents are shared across the worker processes through a
+# file-based cache in production. An in-memory cache is used in development.
+# The least recently used documents are evicted past REPORT_CACHE_MAX_ENTRIES documents
+# or REPORT_CACHE_MAX_BYTES. Their access order, the hit and miss counters and the
+# "Generated on" times of the documents are kept on the REPORT_CACHE_META_ALIAS cache,
+# and updated under the REPORT_CACHE_LOCK_FILE lock across the processes.
+REPORT_CACHE_ALIAS = "reports"
+REPORT_CACHE_META_ALIAS = "report-meta"
+REPORT_CACHE_LOCK_FILE = None
+REPORT_CACHE_TIMEOUT = int(os.getenv("REPORT_CACHE_TIMEOUT", 60 * 60 * 24))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", 256))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    REPORT_CACHE_ALIAS: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "reports",
+        "TIMEOUT": REPORT_CACHE_TIMEOUT,
+        "OPTIONS": {
+            # The documents are evicted by `ReportCache`, the backend only culls the ones it lost track of
+            "MAX_ENTRIES": REPORT_CACHE_MAX_ENTRIES * 2,
+        }
+    },
+    REPORT_CACHE_META_ALIAS: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "report-meta",
+        "TIMEOUT": None,
     }
 }
 
+if not DEBUG:
+    report_cache_location = Path(os.getenv("REPORT_CACHE_LOCATION", BASE_DIR / "cache" / "reports"))
+
+    CACHES[REPORT_CACHE_ALIAS] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": report_cache_location,
+        "TIMEOUT": REPORT_CACHE_TIMEOUT,
+        "OPTIONS": {
+            "MAX_ENTRIES": REPORT_CACHE_MAX_ENTRIES * 2,
+        }
+    }
+    CACHES[REPORT_CACHE_META_ALIAS] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": report_cache_location / "meta",
+        "TIMEOUT": None,
+    }
+    REPORT_CACHE_LOCK_FILE = str(report_cache_location / "meta" / "index.lock")
+
 STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"
     }
 }
 
+# The timing spans of the report generation (authentication, each Supabase query, each
+# section of the document, the layout and each email) are logged as JSON records on the
+# `timing` logger. Each request is logged at INFO with the total of each span, and each
+# span at DEBUG. If SERVER_TIMING_HEADER is true, the spans of a request are also sent
+# in its `Server-Timing` header. It exposes the internals of the service to any client,
+# so it is meant for profiling and is off by default.
+TIMING_LOG_LEVEL = os.getenv("TIMING_LOG_LEVEL", "INFO").upper()
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "false").lower() == "true"
+
+# The Prometheus metrics are served on /metrics/ only if METRICS_TOKEN is set, and the
+# scraper must send it as a bearer token. Under gunicorn, the samples of the worker processes are
+# merged through the files of PROMETHEUS_MULTIPROC_DIR, which is set by `gunicorn.conf.py`.
+# Processes outside of gunicorn, such as `process_report_jobs`, must be given the same
+# directory to be included.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -150,6 +324,9 @@ LOGGING = {
         "verbose": {
             "format": "[{asctime}][{levelname}] {message}",
             "style": "{"
+        },
+        "structured": {
+            "()": "apps.common.utils.logging.StructuredFormatter",
         }
     },
     "filters": {
@@ -166,6 +343,11 @@ LOGGING = {
             "formatter": "verbose",
             "class": "logging.StreamHandler",
             "stream": "ext://sys.stdout"
+        },
+        "timing_handler": {
+            "formatter": "structured",
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stdout"
         }
     },
     "loggers": {
@@ -174,6 +356,11 @@ LOGGING = {
             "level": "DEBUG",
             "propagate": False,
             "filters": ["require_debug_true"]
+        },
+        "timing": {
+            "handlers": ["timing_handler"],
+            "level": TIMING_LOG_LEVEL,
+            "propagate": False,
         }
     },
     "root": {
@@ -20,5 +20,6 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("ping/", include("apps.ping.urls")),
+    path("metrics/", include("apps.metrics.urls")),
     path("generation/", include("apps.generation.urls"))
 ]
@@ -0,0 +1,22 @@
+import os
+import glob
+import tempfile
+
+# Each worker process writes its metrics to this directory, and the /metrics/ view
+# merges them. It must be set before prometheus_client is imported by a worker.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "fintrack-metrics"))
+
+
+def on_starting(server):
+    # Drop the samples of a previous run of the server
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(directory, exist_ok=True)
+
+    for filename in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(filename)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)